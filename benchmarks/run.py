@@ -0,0 +1,222 @@
+import argparse
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from modules.demo_market_data import generate_market_data, market_names
+from modules.price_store import PriceStore
+
+# Timing harnesses for the batch engines behind the app, on synthetic data.
+# They are development tools, kept out of the Streamlit modules. Run them
+# from the repository root:
+#
+#   python -m benchmarks.run alerts --rules 1000000 --markets 3000
+#   python -m benchmarks.run anomalies --markets 3000 --days 365
+#   python -m benchmarks.run arbitrage --markets 3000
+#   python -m benchmarks.run irrigation --plots 50000
+#   python -m benchmarks.run sell --markets 50 --months 12
+#   python -m benchmarks.run sweep --price 2000
+#   python -m benchmarks.run weather-alerts --districts 700 --days 7
+
+
+def alerts(argv):
+    from modules.price_alerts import ALERT_KINDS, AlertIndex, latest_price_changes
+
+    parser = argparse.ArgumentParser(prog='alerts', description="Benchmark bulk price-alert evaluation on synthetic rules and prices.")
+    parser.add_argument('--rules', type=int, default=1_000_000)
+    parser.add_argument('--markets', type=int, default=3000)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args(argv)
+
+    store = PriceStore(generate_market_data(markets=market_names(args.markets), days=2, seed=args.seed))
+    batch = latest_price_changes(store)
+    rng = np.random.default_rng(args.seed)
+    pick = rng.integers(0, len(batch), args.rules)
+    kinds = rng.choice(ALERT_KINDS, args.rules)
+    price = batch['modal_price'].to_numpy()[pick]
+    rules = pd.DataFrame({
+        'rule_id': np.arange(1, args.rules + 1),
+        'crop': batch['crop'].astype(str).to_numpy()[pick],
+        'market': batch['market'].astype(str).to_numpy()[pick],
+        'kind': kinds,
+        'threshold': np.where(kinds == 'change', rng.uniform(1, 10, args.rules), price * rng.uniform(0.8, 1.2, args.rules)),
+        'contact': 'App Push',
+        'created_at': pd.Timestamp.now(),
+    })
+
+    start = time.perf_counter()
+    index = AlertIndex(rules)
+    built = time.perf_counter() - start
+    start = time.perf_counter()
+    fired = index.evaluate(batch)
+    elapsed = time.perf_counter() - start
+    print(f"Indexed {len(rules):,} rules in {built:.2f}s; evaluated {len(batch):,} prices "
+          f"in {elapsed:.3f}s, {len(fired):,} notifications")
+
+
+def anomalies(argv):
+    from modules.market_anomalies import detect_anomalies, newest_rows
+
+    parser = argparse.ArgumentParser(prog='anomalies', description="Run the price/arrival anomaly detector on synthetic national data.")
+    parser.add_argument('--markets', type=int, default=3000)
+    parser.add_argument('--days', type=int, default=365)
+    parser.add_argument('--out', default=None, help="Optional CSV path for the flagged events")
+    args = parser.parse_args(argv)
+
+    store = PriceStore(generate_market_data(markets=market_names(args.markets), days=args.days))
+    start = time.perf_counter()
+    events = detect_anomalies(store)
+    nightly = time.perf_counter() - start
+    start = time.perf_counter()
+    today = detect_anomalies(store, newest_rows(store))
+    daily = time.perf_counter() - start
+    print(f"Nightly: {len(store):,} observations scored in {nightly:.1f}s, {len(events):,} events")
+    print(f"Daily:   {store.series_count():,} new observations scored in {daily:.2f}s, {len(today):,} events")
+    if args.out:
+        events.to_csv(args.out, index=False, date_format='%Y-%m-%d')
+
+
+def arbitrage(argv):
+    from modules.market_arbitrage import best_destinations
+
+    parser = argparse.ArgumentParser(prog='arbitrage', description="Benchmark the all-crops market x market arbitrage engine.")
+    parser.add_argument('--markets', type=int, default=3000)
+    parser.add_argument('--transport-rate', type=float, default=3.0)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args(argv)
+
+    names = market_names(args.markets)
+    rng = np.random.default_rng(args.seed)
+    locations = pd.DataFrame({'latitude': rng.uniform(8, 32, len(names)),
+                              'longitude': rng.uniform(69, 92, len(names))}, index=pd.Index(names, name='market'))
+    store = PriceStore(generate_market_data(markets=names, days=1, seed=args.seed))
+
+    start = time.perf_counter()
+    best = best_destinations(store, transport_rate=args.transport_rate, locations=locations)
+    elapsed = time.perf_counter() - start
+    moved = (best['best_market'] != best['origin']).mean() * 100
+    print(f"{len(best):,} (crop, origin) pairs over {len(names):,} markets in {elapsed:.2f}s; "
+          f"{moved:.1f}% are better off moving the load")
+
+
+def irrigation(argv):
+    from modules.irrigation import CROP_KC, METHOD_EFFICIENCY, SOIL_FACTOR, irrigation_schedule
+    from modules.weather_alerts import load_weather_data
+    from modules.weather_store import location_index
+
+    parser = argparse.ArgumentParser(prog='irrigation', description="Time a nightly irrigation schedule for many plots.")
+    parser.add_argument('--plots', type=int, default=50_000)
+    parser.add_argument('--days', type=int, default=7)
+    parser.add_argument('--out', default=None, help="Optional CSV path for the schedule")
+    args = parser.parse_args(argv)
+
+    weather_df = load_weather_data()
+    rng = np.random.default_rng(0)
+    plots = pd.DataFrame({
+        'plot_id': np.arange(args.plots),
+        'location': rng.choice(list(location_index(weather_df)), args.plots),
+        'crop': rng.choice(list(CROP_KC), args.plots),
+        'stage': rng.choice(list(CROP_KC['Rice']), args.plots),
+        'soil': rng.choice(list(SOIL_FACTOR), args.plots),
+        'method': rng.choice(list(METHOD_EFFICIENCY), args.plots),
+        'area_acres': rng.uniform(0.5, 10, args.plots).round(1),
+    })
+    start = time.perf_counter()
+    schedule = irrigation_schedule(plots, weather_df, args.days)
+    elapsed = time.perf_counter() - start
+    print(f"{args.plots:,} plots: {len(schedule):,} plot-days scheduled in {elapsed:.2f}s, "
+          f"{schedule['volume_m3'].sum():,.0f} m³ total")
+    if args.out:
+        schedule.to_csv(args.out, index=False, date_format='%Y-%m-%d')
+
+
+def sell(argv):
+    from modules.sell_optimizer import DEFAULT_LEVELS, optimize_sell_schedule, price_scenarios
+
+    parser = argparse.ArgumentParser(prog='sell', description="Benchmark the hold-vs-sell dynamic program.")
+    parser.add_argument('--markets', type=int, default=50)
+    parser.add_argument('--months', type=int, default=12)
+    parser.add_argument('--quantity', type=float, default=100.0)
+    parser.add_argument('--levels', type=int, default=DEFAULT_LEVELS)
+    args = parser.parse_args(argv)
+
+    rng = np.random.default_rng(0)
+    paths = price_scenarios(rng.uniform(1500, 2500, args.markets), rng.uniform(-0.02, 0.04, args.markets),
+                            0.06, args.months)
+    start = time.perf_counter()
+    result = optimize_sell_schedule(paths, args.quantity, storage_rate=10.0, max_sell=args.quantity / 3,
+                                    price_impact=0.5, levels=args.levels)
+    elapsed = time.perf_counter() - start
+    uplift = (result['expected_revenue'] - result['sell_now_revenue']).mean()
+    print(f"Optimized {args.markets} markets x {args.months} months ({args.levels} inventory levels) "
+          f"in {elapsed * 1000:.1f} ms; mean uplift over selling now ₹{uplift:,.0f}")
+
+
+def sweep(argv):
+    from modules.profit_sweep import DEFAULT_STEPS, run_sweep, scenario_axis
+
+    parser = argparse.ArgumentParser(prog='sweep', description="Time a full profit scenario sweep.")
+    parser.add_argument('--price', type=float, default=2000)
+    parser.add_argument('--transport-rate', type=float, default=2.0)
+    args = parser.parse_args(argv)
+
+    axes = [
+        scenario_axis(0.7 * args.price, 1.3 * args.price, DEFAULT_STEPS['price']),
+        scenario_axis(10, 30, DEFAULT_STEPS['yield']),
+        scenario_axis(15000, 45000, DEFAULT_STEPS['cost']),
+        scenario_axis(0, 300, DEFAULT_STEPS['distance']),
+    ]
+    result = run_sweep(*axes, harvesting_cost=100, transport_rate=args.transport_rate, market_fee_pct=2)
+    print(f"{result['cells']:,} scenarios in {result['seconds'] * 1000:.0f} ms, "
+          f"{result['profitable_share']:.0%} profitable, median ₹{result['percentiles'][50]:,.0f}/acre")
+
+
+def weather_alerts(argv):
+    from modules.weather_rules import build_alert_table
+
+    parser = argparse.ArgumentParser(prog='weather-alerts', description="Time district-wide weather alert generation on synthetic data.")
+    parser.add_argument('--districts', type=int, default=700)
+    parser.add_argument('--days', type=int, default=7)
+    args = parser.parse_args(argv)
+
+    rng = np.random.default_rng(0)
+    n = args.districts * args.days
+    weather_df = pd.DataFrame({
+        'location': np.repeat([f'District {i}' for i in range(args.districts)], args.days),
+        'date': np.tile(pd.date_range('2025-06-01', periods=args.days).to_numpy(), args.districts),
+        'max_temp': rng.normal(32, 5, n).round(1),
+        'min_temp': rng.normal(18, 7, n).round(1),
+        'humidity': rng.uniform(15, 95, n).round(0),
+        'rainfall': np.where(rng.random(n) < 0.6, 0.0, rng.exponential(20, n)).round(1),
+        'wind_speed': rng.gamma(2, 6, n).round(1),
+    })
+    start = time.perf_counter()
+    table = build_alert_table(weather_df)
+    elapsed = time.perf_counter() - start
+    print(f"{args.districts:,} districts x {args.days} days: {len(table):,} alerts in {elapsed * 1000:.1f} ms")
+    print(table['title'].value_counts().to_string())
+
+
+BENCHMARKS = {
+    'alerts': alerts,
+    'anomalies': anomalies,
+    'arbitrage': arbitrage,
+    'irrigation': irrigation,
+    'sell': sell,
+    'sweep': sweep,
+    'weather-alerts': weather_alerts,
+}
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else list(argv)
+    if not argv or argv[0] not in BENCHMARKS:
+        print(f"usage: python -m benchmarks.run {{{','.join(BENCHMARKS)}}} [options]")
+        return 2
+    return BENCHMARKS[argv[0]](argv[1:])
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,97 @@
+import numpy as np
+import plotly.graph_objects as go
+
+# Server-side downsampling for long time-series charts.
+#
+# Plotly serializes every point into the page, so multi-year daily history
+# across several markets quickly reaches megabytes - painful on 2G/3G. Series
+# longer than MAX_POINTS are reduced before plotting, with either
+# Largest-Triangle-Three-Buckets (keeps the visual shape of lines) or min/max
+# bucketing (keeps every bucket's extremes, used for bars), and traces with
+# more than WEBGL_THRESHOLD raw points are drawn with Scattergl.
+
+MAX_POINTS = 500
+WEBGL_THRESHOLD = 1000
+
+
+def _numeric_x(x):
+    """x as float64 for area computations; positions if x is not numeric or datetime."""
+    x = np.asarray(x)
+    if np.issubdtype(x.dtype, np.datetime64):
+        return x.astype('datetime64[ns]').astype(np.int64).astype(np.float64)
+    if np.issubdtype(x.dtype, np.number):
+        return x.astype(np.float64)
+    return np.arange(len(x), dtype=np.float64)
+
+
+def lttb_indices(x, y, n_out):
+    """Indices of the n_out points Largest-Triangle-Three-Buckets keeps.
+
+    The first and last points are always kept; each bucket in between keeps
+    the point forming the largest triangle with the previously kept point and
+    the mean of the next bucket.
+    """
+    n = len(y)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    x = _numeric_x(x)
+    y = np.asarray(y, dtype=np.float64)
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)  # n_out - 2 inner buckets
+    keep = np.empty(n_out, dtype=np.int64)
+    keep[0], keep[-1] = 0, n - 1
+
+    for b in range(n_out - 2):
+        start, stop = edges[b], edges[b + 1]
+        if b + 2 < len(edges):
+            next_x, next_y = x[stop:edges[b + 2]].mean(), y[stop:edges[b + 2]].mean()
+        else:
+            next_x, next_y = x[-1], y[-1]
+        prev = keep[b]
+        area = np.abs((x[prev] - next_x) * (y[start:stop] - y[prev])
+                      - (x[prev] - x[start:stop]) * (next_y - y[prev]))
+        keep[b + 1] = start + int(np.argmax(area))
+    return keep
+
+
+def minmax_indices(y, n_out):
+    """Indices of each bucket's minimum and maximum, in order (about n_out points)."""
+    n = len(y)
+    if n_out >= n or n_out < 2:
+        return np.arange(n)
+    buckets = max(n_out // 2, 1)
+    width = -(-n // buckets)
+    padded = np.full(buckets * width, np.nan)
+    padded[:n] = y
+    blocks = padded.reshape(buckets, width)
+    filled = ~np.isnan(blocks).all(axis=1)
+    offsets = np.arange(buckets)[filled] * width
+    lo = offsets + np.nanargmin(blocks[filled], axis=1)
+    hi = offsets + np.nanargmax(blocks[filled], axis=1)
+    return np.unique(np.concatenate([lo, hi]))
+
+
+def downsample(x, y, max_points=MAX_POINTS, method='lttb'):
+    """(x, y) reduced to at most about max_points; NaN y values are dropped first."""
+    x = np.asarray(x)
+    y = np.asarray(y, dtype=np.float64)
+    valid = ~np.isnan(y)
+    if not valid.all():
+        x, y = x[valid], y[valid]
+    if len(y) <= max_points:
+        return x, y
+    keep = lttb_indices(x, y, max_points) if method == 'lttb' else minmax_indices(y, max_points)
+    return x[keep], y[keep]
+
+
+def scatter_trace(x, y, max_points=MAX_POINTS, **kwargs):
+    """A downsampled line trace, drawn with WebGL when the raw series is large."""
+    n_raw = len(y)
+    x, y = downsample(x, y, max_points, 'lttb')
+    trace = go.Scattergl if n_raw > WEBGL_THRESHOLD else go.Scatter
+    return trace(x=x, y=y, **kwargs)
+
+
+def bar_trace(x, y, max_points=MAX_POINTS, **kwargs):
+    """A bar trace keeping each bucket's extremes when the series is long."""
+    x, y = downsample(x, y, max_points, 'minmax')
+    return go.Bar(x=x, y=y, **kwargs)
@@ -0,0 +1,89 @@
+import os
+import re
+import time
+from pathlib import Path
+
+from modules.csv_ingest import ingest_csv
+from modules.data_registry import file_digest
+
+try:
+    import pyarrow.feather as feather
+except ImportError:  # pyarrow is optional; without it every load parses the CSV
+    feather = None
+
+# Typed Feather copies of data/*.csv live in data/.columnar/<stem>.<digest>.feather
+CACHE_DIR_NAME = '.columnar'
+
+
+def columnar_path(csv_path, digest):
+    """Location of the Feather copy of csv_path for a given source digest."""
+    csv_path = Path(csv_path)
+    return csv_path.parent / CACHE_DIR_NAME / f"{csv_path.stem}.{digest}.feather"
+
+
+def _project(df, columns):
+    if columns is None:
+        return df
+    return df[[c for c in columns if c in df.columns]]
+
+
+def _write_columnar(df, target, csv_path):
+    """Atomically write df to target and drop stale copies of the same source."""
+    target.parent.mkdir(parents=True, exist_ok=True)
+    tmp = target.with_name(target.name + f'.{os.getpid()}.tmp')
+    feather.write_feather(df.reset_index(drop=True), tmp, compression='uncompressed')
+    os.replace(tmp, target)
+    # Exactly <stem>.<hex digest>.feather: prices.2024.csv must not match prices.2025.csv's copies
+    stale = re.compile(re.escape(Path(csv_path).stem) + r'\.[0-9a-f]+\.feather')
+    for old in target.parent.glob('*.feather'):
+        if old != target and stale.fullmatch(old.name):
+            try:
+                old.unlink()
+            except OSError:
+                pass
+
+
+def load_table(csv_path, columns=None):
+    """Load a data/ CSV through its columnar cache; returns (df, stats).
+
+    On the first load for a given source digest the CSV is parsed once with
+    ingest_csv and written as an uncompressed Feather file. Later loads
+    memory-map that file and materialize only `columns` (all if None);
+    requested columns missing from the file are ignored. stats extends the
+    ingest_csv stats with 'format' ('feather' or 'csv') and 'cache_path'.
+    Without pyarrow this is equivalent to ingest_csv plus column projection.
+    """
+    csv_path = Path(csv_path)
+    if feather is None:
+        df, stats = ingest_csv(csv_path)
+        stats.update({'format': 'csv', 'cache_path': None})
+        return _project(df, columns), stats
+
+    digest = file_digest(csv_path)
+    target = columnar_path(csv_path, digest) if digest else None
+
+    if target is not None and target.exists():
+        start = time.perf_counter()
+        try:
+            # Uncompressed + memory_map is zero-copy: only the selected columns' pages are touched
+            table = feather.read_table(target, memory_map=True)
+            if columns is not None:
+                table = table.select([c for c in columns if c in table.column_names])
+            df = table.to_pandas()
+            stats = {'bytes_read': table.nbytes, 'parse_seconds': time.perf_counter() - start, 'delimiter': None,
+                     'sample': None, 'error': None, 'format': 'feather', 'cache_path': str(target)}
+            return df, stats
+        except Exception:
+            # Corrupt or incompatible cache file: fall through and rebuild it
+            pass
+
+    df, stats = ingest_csv(csv_path)
+    stats.update({'format': 'csv', 'cache_path': None})
+    if target is not None and not df.empty:
+        try:
+            _write_columnar(df, target, csv_path)
+            stats['cache_path'] = str(target)
+        except Exception as exc:
+            # Mixed-type object columns etc. cannot always be stored; keep the CSV result
+            stats['error'] = f"columnar cache not written: {exc}"
+    return _project(df, columns), stats
@@ -1,13 +1,19 @@
 import streamlit as st
 import pandas as pd
 from pathlib import Path
+from modules.data_registry import get_dataset
+from modules.columnar_cache import load_table
 from datetime import datetime, timedelta
 
 def load_community_alerts():
     """Load community alerts data"""
     data_path = Path(__file__).parent.parent / "data" / "community_alerts.csv"
+    return get_dataset('community_alerts', data_path, _read_community_alerts)
+
+def _read_community_alerts(data_path):
+    """Parse community_alerts.csv (or build sample data); cached by the dataset registry"""
     if data_path.exists():
-        return pd.read_csv(data_path)
+        return load_table(data_path)[0]
     else:
         # Sample community alerts data
         sample_data = [
@@ -575,6 +581,9 @@ def show_search_alerts(alerts_df):
 def show_community_analytics(alerts_df):
     """Show community analytics and insights"""
     
+    # Work on a private copy; the loaded frame is shared across sessions
+    alerts_df = alerts_df.copy()
+    
     st.markdown("### 📊 Community Analytics")
     
     # Overall statistics
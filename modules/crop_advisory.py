@@ -1,12 +1,18 @@
 import streamlit as st
 import pandas as pd
 from pathlib import Path
+from modules.data_registry import get_dataset
+from modules.columnar_cache import load_table
 
 def load_crop_data():
     """Load crop requirements data"""
     data_path = Path(__file__).parent.parent / "data" / "crop_requirements.csv"
+    return get_dataset('crop_requirements', data_path, _read_crop_data)
+
+def _read_crop_data(data_path):
+    """Parse crop_requirements.csv (or build sample data); cached by the dataset registry"""
     if data_path.exists():
-        return pd.read_csv(data_path)
+        return load_table(data_path)[0]
     else:
         # Sample data if file doesn't exist
         return pd.DataFrame({
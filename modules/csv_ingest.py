@@ -0,0 +1,104 @@
+import csv
+import io
+import time
+from pathlib import Path
+
+import pandas as pd
+
+# Bounded prefix used for dialect sniffing and the debug sample shown in the UI
+SNIFF_BYTES = 8192
+SAMPLE_BYTES = 2048
+CANDIDATE_DELIMITERS = [',', ';', '\t', '|']
+
+
+def _detect_delimiter(prefix_text):
+    """Pick the delimiter from a text prefix: csv.Sniffer first, header counts as fallback."""
+    try:
+        return csv.Sniffer().sniff(prefix_text, delimiters=''.join(CANDIDATE_DELIMITERS)).delimiter
+    except csv.Error:
+        pass
+    header = prefix_text.splitlines()[0] if prefix_text else ''
+    counts = {d: header.count(d) for d in CANDIDATE_DELIMITERS}
+    best = max(counts, key=counts.get)
+    return best if counts[best] > 0 else ','
+
+
+def ingest_csv(path, usecols=None, dtype=None):
+    """Read a delimited text file with a single pass over its bytes.
+
+    The delimiter is sniffed from the first SNIFF_BYTES, the file is parsed
+    once with that dialect, and the debug sample comes from the same prefix
+    buffer. Returns (df, stats); df is empty if the file is missing, empty or
+    unparseable. stats holds 'bytes_read', 'parse_seconds', 'delimiter',
+    'sample', 'error' and 'fallback_reason' (why the lenient python-engine
+    retry was needed, when it succeeded).
+    """
+    stats = {'bytes_read': 0, 'parse_seconds': 0.0, 'delimiter': None, 'sample': None, 'error': None,
+             'fallback_reason': None}
+    p = Path(path)
+    start = time.perf_counter()
+
+    try:
+        fh = open(p, 'rb')
+    except OSError as exc:
+        stats['error'] = str(exc)
+        return pd.DataFrame(), stats
+
+    with fh:
+        prefix = fh.read(SNIFF_BYTES)
+        if not prefix:
+            stats['error'] = 'empty file'
+            return pd.DataFrame(), stats
+
+        prefix_text = prefix.decode('utf-8', errors='replace')
+        stats['sample'] = prefix[:SAMPLE_BYTES].decode('utf-8', errors='replace')
+        delimiter = _detect_delimiter(prefix_text)
+        stats['delimiter'] = delimiter
+
+        if len(prefix) < SNIFF_BYTES:
+            # Whole file already in memory; parse the buffer instead of re-reading
+            source = io.BytesIO(prefix)
+        else:
+            fh.seek(0)
+            source = fh
+
+        try:
+            df = pd.read_csv(source, sep=delimiter, usecols=usecols, dtype=dtype, encoding_errors='replace')
+        except (pd.errors.EmptyDataError, pd.errors.ParserError, ValueError) as exc:
+            # Malformed rows for the detected dialect: one lenient retry with the python engine
+            source.seek(0)
+            try:
+                df = pd.read_csv(source, sep=None, engine='python', usecols=usecols, dtype=dtype, encoding_errors='replace')
+                stats['fallback_reason'] = str(exc)
+            except Exception as retry_exc:
+                stats['error'] = str(retry_exc)
+                df = pd.DataFrame()
+
+        stats['bytes_read'] = max(source.tell(), len(prefix))
+
+    stats['parse_seconds'] = time.perf_counter() - start
+    return df, stats
+
+
+def read_csv_chunks(path, chunk_rows=200_000):
+    """Stream a delimited file as DataFrame chunks using the sniffed dialect.
+
+    Memory stays bounded by chunk_rows regardless of file size; used for
+    incremental ingestion of large daily dumps.
+    """
+    with open(path, 'rb') as fh:
+        prefix = fh.read(SNIFF_BYTES)
+    delimiter = _detect_delimiter(prefix.decode('utf-8', errors='replace'))
+    return pd.read_csv(path, sep=delimiter, chunksize=chunk_rows, encoding_errors='replace')
+
+
+def format_ingest_stats(stats):
+    """One-line human readable summary of ingest_csv stats for debug panels."""
+    if not stats:
+        return 'n/a'
+    size_kb = stats.get('bytes_read', 0) / 1024
+    delim = repr(stats.get('delimiter')) if stats.get('delimiter') else 'n/a'
+    summary = f"{size_kb:,.1f} KB read, parsed in {stats.get('parse_seconds', 0.0) * 1000:.1f} ms (delimiter {delim})"
+    if stats.get('fallback_reason'):
+        summary += f"; lenient re-parse after: {stats['fallback_reason']}"
+    return summary
@@ -0,0 +1,103 @@
+import hashlib
+import threading
+from pathlib import Path
+
+# Process-wide dataset registry shared by every Streamlit session.
+# Each entry is keyed by name and remembers the (mtime, size) signature and
+# content digest of the file it was built from, so a dataset is parsed once
+# and rebuilt only when the file on disk actually changes.
+_registry = {}
+_registry_lock = threading.Lock()
+# Last digest computed per path, reused while the (mtime, size) signature holds
+_digest_memo = {}
+
+
+def file_signature(path):
+    """Return a cheap (mtime_ns, size) signature for path, or None if missing."""
+    try:
+        st_info = Path(path).stat()
+    except OSError:
+        return None
+    return (st_info.st_mtime_ns, st_info.st_size)
+
+
+def file_digest(path, chunk_size=1 << 20):
+    """Return a blake2b hex digest of the file contents, or None if unreadable.
+
+    The digest is memoized per path and only recomputed when the file's
+    (mtime, size) signature changes, so several layers can key on it cheaply.
+    """
+    key = str(path)
+    signature = file_signature(path)
+    if signature is None:
+        return None
+    memo = _digest_memo.get(key)
+    if memo and memo[0] == signature:
+        return memo[1]
+
+    digest = hashlib.blake2b(digest_size=16)
+    try:
+        with open(path, 'rb') as fh:
+            for chunk in iter(lambda: fh.read(chunk_size), b''):
+                digest.update(chunk)
+    except OSError:
+        return None
+    _digest_memo[key] = (signature, digest.hexdigest())
+    return digest.hexdigest()
+
+
+def _get_entry(name):
+    with _registry_lock:
+        # 'state' is one (signature, digest, value) tuple, replaced in a single
+        # assignment so lock-free readers never pair a new signature with an old value
+        entry = _registry.setdefault(name, {'lock': threading.Lock(), 'state': None})
+        return entry
+
+
+def get_dataset(name, path, builder, updater=None):
+    """Return the cached result of builder(path), rebuilding only when path changes.
+
+    The same object is returned to every caller until the file's mtime/size
+    changes and its content digest differs from the one it was built from, so
+    callers must treat the result as read-only and copy before mutating.
+    A missing file is cached too (signature None) so demo fallbacks are built once.
+    When the file changes and an updater is given, updater(path, old_value)
+    may return the new value derived from the cached one (e.g. by appending
+    only what was added); returning None falls back to builder(path).
+    """
+    entry = _get_entry(name)
+    signature = file_signature(path)
+
+    state = entry['state']
+    if state is not None and state[0] == signature:
+        return state[2]
+
+    with entry['lock']:
+        # Another session may have rebuilt while we waited for the lock
+        signature = file_signature(path)
+        state = entry['state']
+        if state is not None and state[0] == signature:
+            return state[2]
+
+        digest = file_digest(path) if signature is not None else None
+        if state is not None and digest is not None and digest == state[1]:
+            # Touched but unchanged (e.g. re-copied file): keep the parsed data
+            entry['state'] = (signature, digest, state[2])
+            return state[2]
+
+        value = None
+        if updater is not None and state is not None and state[0] is not None:
+            value = updater(path, state[2])
+        if value is None:
+            value = builder(path)
+        entry['state'] = (signature, digest, value)
+        return value
+
+
+def invalidate(name=None):
+    """Drop one cached dataset (or all of them) so the next access rebuilds it."""
+    with _registry_lock:
+        if name is None:
+            _registry.clear()
+        else:
+            _registry.pop(name, None)
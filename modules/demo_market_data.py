@@ -0,0 +1,142 @@
+import argparse
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+# Vectorized synthetic mandi price generator, used as the demo fallback of
+# market_price.load_market_data and for load testing. Every column is built as
+# a whole (crops x markets x days) array, so 10M rows take a few seconds:
+#
+#   python -m modules.demo_market_data --markets 3000 --days 365 --out /tmp/prices.csv
+
+DEFAULT_CROPS = ['Rice', 'Wheat', 'Cotton', 'Tomato', 'Onion', 'Potato', 'Maize', 'Soybean', 'Sugarcane', 'Chili']
+DEFAULT_MARKETS = ['Delhi', 'Mumbai', 'Bangalore', 'Chennai', 'Kolkata', 'Pune', 'Hyderabad', 'Ahmedabad']
+
+# Base prices (per quintal)
+BASE_PRICES = {
+    'Rice': 2000, 'Wheat': 2200, 'Cotton': 5500, 'Tomato': 1500,
+    'Onion': 800, 'Potato': 1200, 'Maize': 1800, 'Soybean': 4000,
+    'Sugarcane': 350, 'Chili': 8000
+}
+
+# Market-specific price variation
+MARKET_FACTORS = {
+    'Delhi': 1.05, 'Mumbai': 1.15, 'Bangalore': 1.08, 'Chennai': 1.02,
+    'Kolkata': 0.95, 'Pune': 1.12, 'Hyderabad': 1.00, 'Ahmedabad': 1.08
+}
+
+# Arrivals (quantity in quintals)
+BASE_ARRIVALS = {
+    'Rice': 500, 'Wheat': 800, 'Cotton': 200, 'Tomato': 300,
+    'Onion': 400, 'Potato': 600, 'Maize': 450, 'Soybean': 350,
+    'Sugarcane': 1000, 'Chili': 150
+}
+
+# Month (1-12) of the main harvest; arrivals peak and prices dip around it
+HARVEST_MONTH = {
+    'Rice': 11, 'Wheat': 4, 'Cotton': 12, 'Tomato': 2, 'Onion': 4,
+    'Potato': 2, 'Maize': 10, 'Soybean': 10, 'Sugarcane': 1, 'Chili': 2
+}
+
+
+def market_names(count):
+    """The default markets first, then generated 'Market NNNN' names up to count."""
+    names = DEFAULT_MARKETS[:count]
+    names += [f"Market {i:04d}" for i in range(len(names) + 1, count + 1)]
+    return names
+
+
+def generate_market_data(crops=None, markets=None, days=30, seed=42, end_date=None):
+    """Synthetic daily price series for every crop x market over `days` days.
+
+    Prices combine the crop's base price, a market factor, an annual
+    harvest-driven seasonal cycle, a short cycle and daily noise; arrivals
+    move opposite to the seasonal price, and FAQ/good/average grade shares
+    sum to roughly 100. Unknown crops/markets get seeded random bases.
+    end_date defaults to yesterday. Returns a DataFrame with date
+    (datetime64), crop/market (categorical) and the numeric price columns,
+    ordered by crop, market, date.
+    """
+    crops = list(crops) if crops is not None else list(DEFAULT_CROPS)
+    markets = list(markets) if markets is not None else list(DEFAULT_MARKETS)
+    rng = np.random.default_rng(seed)
+    n_c, n_m, n_d = len(crops), len(markets), int(days)
+    shape = (n_c, n_m, n_d)
+
+    end_date = pd.Timestamp(end_date if end_date is not None else datetime.now() - timedelta(days=1)).normalize()
+    dates = pd.date_range(end=end_date, periods=n_d, freq='D')
+
+    base = np.array([BASE_PRICES.get(c, 0) or rng.uniform(500, 6000) for c in crops], dtype=np.float32)
+    factor = np.array([MARKET_FACTORS.get(m, 0) or rng.uniform(0.9, 1.15) for m in markets], dtype=np.float32)
+    base_arrival = np.array([BASE_ARRIVALS.get(c, 0) or rng.uniform(100, 1000) for c in crops], dtype=np.float32)
+    harvest = np.array([HARVEST_MONTH.get(c, 0) or rng.integers(1, 13) for c in crops], dtype=np.float32)
+
+    # Annual cycle: lowest around harvest (day-of-year of mid harvest month), highest six months later
+    doy = dates.dayofyear.to_numpy().astype(np.float32)
+    harvest_doy = (harvest - 0.5) * 30.4
+    season = -np.cos(2 * np.pi * (doy[None, :] - harvest_doy[:, None]) / 365.0).astype(np.float32)  # (C, D)
+    short_cycle = (np.sin(np.arange(n_d, dtype=np.float32) * 0.2) * 0.1)[None, None, :]
+
+    def noise(sd):
+        return rng.standard_normal(shape, dtype=np.float32) * np.float32(sd)
+
+    seasonal_factor = 1 + short_cycle + 0.08 * season[:, None, :] + noise(0.05)
+    daily_variation = 1 + noise(0.03)
+    modal = base[:, None, None] * factor[None, :, None] * seasonal_factor * daily_variation
+    min_price = np.maximum(modal * (0.95 + noise(0.02)), 0)
+    max_price = modal * (1.05 + noise(0.02))
+
+    arrival_season = 1 - 0.3 * season[:, None, :]
+    arrival = np.maximum(50, base_arrival[:, None, None] * arrival_season * (0.8 + rng.random(shape, dtype=np.float32) * 0.4))
+
+    faq = 60 + noise(10)
+    good = 25 + noise(5)
+    average = np.maximum(0, 100 - faq - good)
+
+    return pd.DataFrame({
+        'date': np.tile(dates.to_numpy(), n_c * n_m),
+        'crop': pd.Categorical.from_codes(np.repeat(np.arange(n_c), n_m * n_d), categories=crops),
+        'market': pd.Categorical.from_codes(np.tile(np.repeat(np.arange(n_m), n_d), n_c), categories=markets),
+        'min_price': np.round(min_price, 2).ravel(),
+        'max_price': np.round(max_price, 2).ravel(),
+        'modal_price': np.round(modal, 2).ravel(),  # Most common price
+        'arrival_quantity': np.round(arrival, 0).ravel(),
+        'faq_percent': np.round(np.clip(faq, 0, 100), 1).ravel(),  # FAQ = Fair Average Quality
+        'good_percent': np.round(np.clip(good, 0, 100), 1).ravel(),
+        'average_percent': np.round(np.clip(average, 0, 100), 1).ravel()
+    })
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate synthetic mandi price data for demos and load tests.")
+    parser.add_argument('--crops', default=','.join(DEFAULT_CROPS), help="Comma-separated crop names")
+    parser.add_argument('--markets', default=str(len(DEFAULT_MARKETS)),
+                        help="Number of markets, or comma-separated market names")
+    parser.add_argument('--days', type=int, default=30)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--out', default=None, help="Output .csv, .feather or .parquet path (omit to only time generation)")
+    args = parser.parse_args(argv)
+
+    crops = [c.strip() for c in args.crops.split(',') if c.strip()]
+    markets = market_names(int(args.markets)) if args.markets.isdigit() else [m.strip() for m in args.markets.split(',') if m.strip()]
+
+    start = time.perf_counter()
+    df = generate_market_data(crops, markets, args.days, args.seed)
+    elapsed = time.perf_counter() - start
+    print(f"Generated {len(df):,} rows ({len(crops)} crops x {len(markets)} markets x {args.days} days) in {elapsed:.2f}s")
+
+    if args.out:
+        start = time.perf_counter()
+        if args.out.endswith('.feather'):
+            df.to_feather(args.out)
+        elif args.out.endswith('.parquet'):
+            df.to_parquet(args.out, index=False)
+        else:
+            df.to_csv(args.out, index=False, date_format='%Y-%m-%d')
+        print(f"Wrote {args.out} in {time.perf_counter() - start:.2f}s")
+
+
+if __name__ == '__main__':
+    main()
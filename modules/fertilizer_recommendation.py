@@ -1,13 +1,19 @@
 import streamlit as st
 import pandas as pd
 from pathlib import Path
+from modules.data_registry import get_dataset
+from modules.columnar_cache import load_table
 import plotly.graph_objects as go
 
 def load_soil_health_data():
     """Load soil health data"""
     data_path = Path(__file__).parent.parent / "data" / "soil_health.csv"
+    return get_dataset('soil_health', data_path, _read_soil_health_data)
+
+def _read_soil_health_data(data_path):
+    """Parse soil_health.csv (or build sample data); cached by the dataset registry"""
     if data_path.exists():
-        return pd.read_csv(data_path)
+        return load_table(data_path)[0]
     else:
         # Sample data if file doesn't exist
         return pd.DataFrame({
@@ -0,0 +1,194 @@
+import numpy as np
+import pandas as pd
+
+from modules.market_arbitrage import load_market_locations
+from modules.weather_store import location_index
+
+# Reference evapotranspiration (ET0) and batch irrigation scheduling.
+#
+# ET0 is computed for every location x day of the weather table as NumPy
+# arrays: FAO-56 Penman-Monteith when humidity and wind are available, with
+# solar radiation estimated from the temperature range (FAO-56 eq. 50), and
+# Hargreaves otherwise. Extraterrestrial radiation comes from latitude and
+# day of year (FAO-56 eq. 21). A plot's crop water use is ET0 x Kc (crop and
+# growth stage) x soil factor; effective rainfall is subtracted and the net
+# requirement is divided by the irrigation method's efficiency. Schedules for
+# any number of plots are one gather from the (locations x days) ET0 matrix,
+# so the cost is dominated by the plots x days output.
+
+DEFAULT_LATITUDE = 20.0        # central India, for locations without coordinates
+LOCATION_ALIASES = {'Bengaluru': 'Bangalore'}
+KRS = 0.16                     # Hargreaves radiation coefficient (interior locations)
+WIND_2M_FACTOR = 0.748         # 10 m wind -> 2 m wind (FAO-56 eq. 47)
+EFFECTIVE_RAIN_FRACTION = 0.8
+IRRIGATE_MM = 5.0              # gross requirement above which a full irrigation is scheduled
+MM_ACRE_M3 = 4.0469            # 1 mm over one acre, in cubic metres
+
+# Crop coefficients by growth stage (FAO-56 Table 12, initial / development / mid / late)
+CROP_KC = {
+    'Rice': {'Germination': 1.05, 'Vegetative': 1.10, 'Flowering': 1.20, 'Fruiting': 1.20, 'Maturity': 0.90},
+    'Wheat': {'Germination': 0.30, 'Vegetative': 0.75, 'Flowering': 1.15, 'Fruiting': 1.15, 'Maturity': 0.40},
+    'Cotton': {'Germination': 0.35, 'Vegetative': 0.75, 'Flowering': 1.15, 'Fruiting': 1.15, 'Maturity': 0.70},
+    'Vegetables': {'Germination': 0.70, 'Vegetative': 0.85, 'Flowering': 1.05, 'Fruiting': 1.05, 'Maturity': 0.95},
+    'Fruits': {'Germination': 0.60, 'Vegetative': 0.80, 'Flowering': 0.95, 'Fruiting': 0.95, 'Maturity': 0.75},
+}
+SOIL_FACTOR = {'Clay': 0.8, 'Loamy': 1.0, 'Sandy': 1.3, 'Black Cotton': 0.9}
+METHOD_EFFICIENCY = {'Flood': 0.60, 'Furrow': 0.70, 'Sprinkler': 0.75, 'Drip': 0.90}
+SCHEDULE_COLUMNS = ['plot_id', 'location', 'date', 'et0_mm', 'etc_mm', 'effective_rain_mm',
+                    'net_mm', 'gross_mm', 'volume_m3', 'action']
+ACTIONS = np.array(["✅ No irrigation needed", "🌿 Light watering", "💧 Irrigate"], dtype=object)
+
+
+def extraterrestrial_radiation(latitude, day_of_year):
+    """Ra (MJ/m²/day) from latitude (degrees) and day of year, FAO-56 eq. 21."""
+    phi = np.radians(latitude)
+    j = np.asarray(day_of_year, dtype=np.float64)
+    dr = 1 + 0.033 * np.cos(2 * np.pi * j / 365)
+    delta = 0.409 * np.sin(2 * np.pi * j / 365 - 1.39)
+    ws = np.arccos(np.clip(-np.tan(phi) * np.tan(delta), -1.0, 1.0))
+    return 24 * 60 / np.pi * 0.0820 * dr * (ws * np.sin(phi) * np.sin(delta) + np.cos(phi) * np.cos(delta) * np.sin(ws))
+
+
+def et0_hargreaves(tmax, tmin, ra):
+    """Hargreaves ET0 (mm/day) from daily max/min temperature and Ra (MJ/m²/day)."""
+    tmean = (tmax + tmin) / 2
+    return np.maximum(0.0023 * 0.408 * ra * (tmean + 17.8) * np.sqrt(np.maximum(tmax - tmin, 0.0)), 0.0)
+
+
+def et0_fao56(tmax, tmin, humidity, wind_kmh, ra, elevation=0.0):
+    """FAO-56 Penman-Monteith ET0 (mm/day) with Rs estimated from the temperature range.
+
+    humidity is mean relative humidity (%), wind_kmh the 10 m wind speed.
+    """
+    tmean = (tmax + tmin) / 2
+    u2 = wind_kmh / 3.6 * WIND_2M_FACTOR
+
+    def svp(t):
+        return 0.6108 * np.exp(17.27 * t / (t + 237.3))
+
+    es = (svp(tmax) + svp(tmin)) / 2
+    ea = es * np.clip(humidity, 0, 100) / 100
+    slope = 4098 * svp(tmean) / (tmean + 237.3) ** 2
+    gamma = 0.000665 * 101.3 * ((293 - 0.0065 * elevation) / 293) ** 5.26
+
+    rs = np.minimum(KRS * np.sqrt(np.maximum(tmax - tmin, 0.0)) * ra, (0.75 + 2e-5 * elevation) * ra)
+    rso = (0.75 + 2e-5 * elevation) * ra
+    rns = 0.77 * rs
+    sigma_t4 = 4.903e-9 * ((tmax + 273.16) ** 4 + (tmin + 273.16) ** 4) / 2
+    with np.errstate(divide='ignore', invalid='ignore'):
+        cloud = np.where(rso > 0, 1.35 * np.clip(rs / rso, 0, 1) - 0.35, 0.0)
+    rnl = sigma_t4 * (0.34 - 0.14 * np.sqrt(np.maximum(ea, 0.0))) * cloud
+    rn = rns - rnl
+
+    et0 = (0.408 * slope * rn + gamma * 900 / (tmean + 273) * u2 * (es - ea)) / (slope + gamma * (1 + 0.34 * u2))
+    return np.maximum(et0, 0.0)
+
+
+def location_latitudes(names):
+    """Latitude per location name: known market coordinates (or aliases), else DEFAULT_LATITUDE."""
+    known = load_market_locations()['latitude']
+    return np.array([known.get(LOCATION_ALIASES.get(name, name), DEFAULT_LATITUDE) for name in names], dtype=np.float64)
+
+
+def weather_matrices(weather_df, days=7):
+    """(locations, dates (L, D), fields dict of (L, D) arrays) of each location's first `days` rows, NaN-padded."""
+    index = location_index(weather_df)
+    names = list(index)
+    L = len(names)
+    rows = np.full((L, days), -1, dtype=np.int64)
+    all_rows = np.arange(len(weather_df))
+    for i, block in enumerate(index.values()):
+        positions = all_rows[block][:days]
+        rows[i, :len(positions)] = positions
+    present = rows >= 0
+    safe = np.where(present, rows, 0)
+
+    def take(field, fill=np.nan):
+        if field not in weather_df.columns:
+            return np.full((L, days), fill)
+        values = weather_df[field].to_numpy(dtype=np.float64, na_value=np.nan)
+        return np.where(present, values[safe], np.nan)
+
+    fields = {field: take(field) for field in ('max_temp', 'min_temp', 'humidity', 'wind_speed', 'rainfall')}
+    if 'latitude' in weather_df.columns:
+        fields['latitude'] = take('latitude')
+    dates = np.where(present, weather_df['date'].to_numpy()[safe], np.datetime64('NaT'))
+    return names, dates, fields
+
+
+def reference_et(weather_df, days=7, method='auto'):
+    """ET0 (mm/day) for every location x day; returns (locations, dates, et0) with et0 shaped (L, D).
+
+    method: 'fao56', 'hargreaves' or 'auto' (FAO-56 where humidity and wind are known).
+    """
+    names, dates, fields = weather_matrices(weather_df, days)
+    return names, dates, _reference_et(names, dates, fields, method)
+
+
+def _reference_et(names, dates, f, method):
+    latitude = f['latitude'] if 'latitude' in f else location_latitudes(names)[:, None]
+    latitude = np.where(np.isnan(latitude), DEFAULT_LATITUDE, latitude)
+    doy = pd.DatetimeIndex(dates.ravel()).dayofyear.to_numpy(dtype=np.float64, na_value=np.nan).reshape(dates.shape)
+    ra = extraterrestrial_radiation(latitude, doy)
+    hargreaves = et0_hargreaves(f['max_temp'], f['min_temp'], ra)
+    if method == 'hargreaves':
+        return hargreaves
+    fao = et0_fao56(f['max_temp'], f['min_temp'], f['humidity'], f['wind_speed'], ra)
+    if method == 'fao56':
+        return fao
+    return np.where(np.isnan(fao), hargreaves, fao)
+
+
+def _lookup(values, table, default):
+    """Map labels through a dict (unknown labels get default) via factorized codes."""
+    codes, labels = pd.factorize(pd.Series(values), use_na_sentinel=True)
+    mapped = np.array([table.get(label, default) for label in labels] + [default], dtype=np.float64)
+    return mapped[codes]
+
+
+def irrigation_schedule(plots, weather_df, days=7, method='auto'):
+    """Daily irrigation plan for many plots at once, in long form (SCHEDULE_COLUMNS).
+
+    plots needs location, crop, stage and soil columns; plot_id, method
+    (irrigation method, default Flood) and area_acres (default 1) are
+    optional. Plots at unknown locations get no rows.
+    """
+    names, dates, fields = weather_matrices(weather_df, days)
+    et0 = _reference_et(names, dates, fields, method)
+    rain = np.nan_to_num(fields['rainfall'])
+
+    plots = plots.reset_index(drop=True)
+    N = len(plots)
+    location_pos = pd.Index(names).get_indexer(plots['location'])
+    known = location_pos >= 0
+    plot_ids = plots['plot_id'].to_numpy() if 'plot_id' in plots.columns else np.arange(N)
+    kc_table = {(crop, stage): kc for crop, stages in CROP_KC.items() for stage, kc in stages.items()}
+    kc = _lookup(list(zip(plots['crop'], plots['stage'])), kc_table, 1.0)
+    soil = _lookup(plots['soil'], SOIL_FACTOR, 1.0)
+    efficiency = _lookup(plots['method'], METHOD_EFFICIENCY, METHOD_EFFICIENCY['Flood']) if 'method' in plots.columns \
+        else np.full(N, METHOD_EFFICIENCY['Flood'])
+    area = plots['area_acres'].to_numpy(dtype=np.float64) if 'area_acres' in plots.columns else np.ones(N)
+
+    loc = location_pos[known]
+    day_et0 = et0[loc]
+    etc = day_et0 * (kc * soil)[known, None]
+    effective_rain = EFFECTIVE_RAIN_FRACTION * rain[loc]
+    net = np.maximum(etc - effective_rain, 0.0)
+    gross = net / efficiency[known, None]
+    valid = ~np.isnan(etc)
+    action = ACTIONS[(gross > 0).astype(np.int64) + (gross > IRRIGATE_MM)]
+
+    D = et0.shape[1]
+    schedule = pd.DataFrame({
+        'plot_id': np.repeat(plot_ids[known], D),
+        'location': np.repeat(np.asarray(names, dtype=object)[loc], D),
+        'date': dates[loc].ravel(),
+        'et0_mm': day_et0.ravel(),
+        'etc_mm': etc.ravel(),
+        'effective_rain_mm': effective_rain.ravel(),
+        'net_mm': net.ravel(),
+        'gross_mm': gross.ravel(),
+        'volume_m3': (gross * area[known, None] * MM_ACRE_M3).ravel(),
+        'action': action.ravel(),
+    }, columns=SCHEDULE_COLUMNS)
+    return schedule[valid.ravel()].reset_index(drop=True)
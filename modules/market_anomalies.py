@@ -0,0 +1,128 @@
+import weakref
+
+import numpy as np
+import pandas as pd
+
+from modules.price_store import as_price_store
+
+# Robust anomaly detection for mandi prices and arrivals.
+#
+# Every observation is compared with the median of the WINDOW observations
+# before it in the same (crop, market) series, scaled by 1.4826 x MAD (the
+# median absolute deviation, a standard-deviation estimate that a single
+# spike cannot inflate). Rows are gathered into an (observations x WINDOW)
+# matrix of trailing values straight from the sorted PriceStore arrays, so a
+# chunk of a million observations is a few NumPy reductions. The nightly job
+# scores every row; the daily job scores only each series' newest rows, which
+# needs nothing but their trailing windows.
+
+WINDOW = 30
+MIN_HISTORY = 10
+Z_THRESHOLD = 3.5
+MIN_SCALE_FRACTION = 0.01  # scale floor as a fraction of the median, for flat series
+CHUNK_ROWS = 500_000
+EVENT_COLUMNS = ['crop', 'market', 'date', 'kind', 'value', 'median', 'robust_z']
+
+# field -> (kind when above, kind when below); None skips that direction
+CHECKS = {
+    'modal_price': ('price_spike', 'price_crash'),
+    'arrival_quantity': ('arrival_surge', None),
+}
+
+_latest_cache = weakref.WeakKeyDictionary()
+
+
+def _series_starts(store, rows):
+    """First row of the series each row belongs to."""
+    return store.starts[np.searchsorted(store.stops, rows, side='right')]
+
+
+def _median_rows(matrix):
+    """Row medians ignoring NaN (NaN sorts last, so each row's median sits at n // 2)."""
+    ordered = np.sort(matrix, axis=1)
+    n = (~np.isnan(matrix)).sum(axis=1)
+    lo = np.take_along_axis(ordered, np.maximum((n - 1) // 2, 0)[:, None], axis=1)[:, 0]
+    hi = np.take_along_axis(ordered, (n // 2)[:, None], axis=1)[:, 0]
+    return np.where(n > 0, (lo + hi) / 2, np.nan)
+
+
+def robust_scores(store, rows, field, window=WINDOW):
+    """(median, robust_z) of each row against its trailing `window` observations.
+
+    Rows with fewer than MIN_HISTORY earlier observations in their series get NaN,
+    as do rows whose trailing window is all zeros (zero MAD and zero median).
+    """
+    values = store.frame[field].to_numpy(dtype=np.float64)
+    median = np.full(len(rows), np.nan)
+    z = np.full(len(rows), np.nan)
+    lags = np.arange(1, window + 1)
+    for lo in range(0, len(rows), CHUNK_ROWS):
+        chunk = rows[lo:lo + CHUNK_ROWS]
+        starts = _series_starts(store, chunk)
+        idx = chunk[:, None] - lags[None, :]
+        inside = idx >= starts[:, None]
+        trailing = np.where(inside, values[np.maximum(idx, 0)], np.nan)
+        enough = inside.sum(axis=1) >= MIN_HISTORY
+        if not enough.any():
+            continue
+        trailing = trailing[enough]
+        med = _median_rows(trailing)
+        mad = _median_rows(np.abs(trailing - med[:, None]))
+        scale = np.maximum(1.4826 * mad, MIN_SCALE_FRACTION * np.abs(med))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            score = np.where(scale > 0, (values[chunk[enough]] - med) / scale, np.nan)
+        out = lo + np.flatnonzero(enough)
+        median[out] = med
+        z[out] = score
+    return median, z
+
+
+def detect_anomalies(store, rows=None, threshold=Z_THRESHOLD, window=WINDOW):
+    """Flag price spikes/crashes and arrival surges; rows defaults to every row.
+
+    Returns a DataFrame with EVENT_COLUMNS sorted by |robust_z| descending.
+    """
+    store = as_price_store(store)
+    rows = np.arange(len(store)) if rows is None else np.asarray(rows, dtype=np.int64)
+    events = []
+    for field, (above, below) in CHECKS.items():
+        if field not in store.frame.columns or not len(rows):
+            continue
+        median, z = robust_scores(store, rows, field, window)
+        for kind, hit in ((above, z > threshold), (below, z < -threshold)):
+            if kind is None or not hit.any():
+                continue
+            hit_rows = rows[hit]
+            events.append(pd.DataFrame({
+                'crop': store.labels('crop', hit_rows),
+                'market': store.labels('market', hit_rows),
+                'date': store.frame['date'].to_numpy()[hit_rows],
+                'kind': kind,
+                'value': store.frame[field].to_numpy(dtype=np.float64)[hit_rows],
+                'median': median[hit],
+                'robust_z': z[hit],
+            }))
+    if not events:
+        return pd.DataFrame(columns=EVENT_COLUMNS)
+    result = pd.concat(events, ignore_index=True)
+    return result.iloc[np.argsort(-result['robust_z'].abs().to_numpy(), kind='stable')].reset_index(drop=True)
+
+
+def newest_rows(store, days=1):
+    """Row numbers of the last `days` observations of every series."""
+    lengths = np.minimum(store.stops - store.starts, days)
+    offsets = np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+    return np.repeat(store.stops - lengths, lengths) + offsets
+
+
+def latest_anomalies(store, days=1):
+    """Anomalies among each series' newest `days` observations, cached per store.
+
+    This is the incremental daily run: cost depends on the number of series
+    and the window, not on how much history the store holds.
+    """
+    store = as_price_store(store)
+    per_store = _latest_cache.setdefault(store, {})
+    if days not in per_store:
+        per_store[days] = detect_anomalies(store, newest_rows(store, days))
+    return per_store[days]
@@ -0,0 +1,148 @@
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from modules.data_registry import get_dataset
+from modules.columnar_cache import load_table
+
+# Spatial arbitrage: where should a load of a crop be sold?
+#
+# For each crop, net[o, d] = price[d] - price[o] - transport_rate * km[o, d]
+# - storage cost, over every origin o and destination d market, from the
+# latest modal prices. The destination maximising net for an origin is the
+# best place to take a load from there; the origin itself (km = 0) is always
+# a candidate, so best_market == origin means "sell locally". Storage for the
+# hold period is only charged on routes that move the load, so selling
+# locally is the zero baseline and storage can tip the choice back to it.
+# Crops are processed in blocks so the (crops x markets x markets) work
+# stays within a bounded float32 buffer.
+
+# Approximate market locations (latitude, longitude); data/market_locations.csv
+# (market, latitude, longitude) adds or overrides entries.
+MARKET_COORDINATES = {
+    'Delhi': (28.61, 77.21), 'Mumbai': (19.08, 72.88), 'Bangalore': (12.97, 77.59),
+    'Chennai': (13.08, 80.27), 'Kolkata': (22.57, 88.36), 'Pune': (18.52, 73.86),
+    'Hyderabad': (17.39, 78.49), 'Ahmedabad': (23.02, 72.57)
+}
+ROAD_FACTOR = 1.3  # road distance / great-circle distance
+EARTH_RADIUS_KM = 6371.0
+BLOCK_ELEMENTS = 32_000_000  # float32 cells per crop block (~128 MB)
+BEST_COLUMNS = ['crop', 'origin', 'origin_price', 'best_market', 'best_price', 'distance_km',
+                'transport_cost', 'storage_cost', 'net_price', 'net_gain']
+
+
+def load_market_locations():
+    """Market coordinates as a frame indexed by market with latitude/longitude."""
+    data_path = Path(__file__).parent.parent / "data" / "market_locations.csv"
+    return get_dataset('market_locations', data_path, _read_market_locations)
+
+
+def _read_market_locations(data_path):
+    locations = pd.DataFrame.from_dict(MARKET_COORDINATES, orient='index', columns=['latitude', 'longitude'])
+    if data_path.exists():
+        extra = load_table(data_path)[0].set_index('market')[['latitude', 'longitude']]
+        locations = pd.concat([locations.drop(index=extra.index, errors='ignore'), extra])
+    return locations.rename_axis('market')
+
+
+def distance_matrix(latitude, longitude, road_factor=ROAD_FACTOR):
+    """Pairwise road-distance estimate (km) from haversine great-circle distance."""
+    lat = np.radians(np.asarray(latitude, dtype=np.float64))
+    lon = np.radians(np.asarray(longitude, dtype=np.float64))
+    dlat = lat[:, None] - lat[None, :]
+    dlon = lon[:, None] - lon[None, :]
+    a = np.sin(dlat / 2) ** 2 + np.cos(lat)[:, None] * np.cos(lat)[None, :] * np.sin(dlon / 2) ** 2
+    return (2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0, 1))) * road_factor).astype(np.float32)
+
+
+def latest_price_matrix(store, markets=None):
+    """(crops, markets, prices) with prices[c, m] the latest modal price (NaN if not traded)."""
+    crops = store.frame['crop'].cat.categories
+    all_markets = store.frame['market'].cat.categories
+    markets = all_markets if markets is None else pd.Index(markets)
+    market_pos = markets.get_indexer(all_markets[store.series_market_codes])
+    keep = market_pos >= 0
+    last = store.stops[keep] - 1
+    prices = np.full((len(crops), len(markets)), np.nan, dtype=np.float32)
+    prices[store.series_crop_codes[keep], market_pos[keep]] = store.frame['modal_price'].to_numpy()[last]
+    return crops, markets, prices
+
+
+def _store_inputs(store, locations, crop):
+    locations = load_market_locations() if locations is None else locations
+    traded = store.frame['market'].cat.categories
+    markets = locations.index.intersection(traded)
+    crops, markets, prices = latest_price_matrix(store, markets)
+    if crop is not None:
+        prices = prices[crops.get_indexer([crop])] if crop in crops else prices[:0]
+        crops = pd.Index([crop]) if crop in crops else crops[:0]
+    km = distance_matrix(locations.loc[markets, 'latitude'], locations.loc[markets, 'longitude'])
+    return crops, markets, prices, km
+
+
+def best_destinations_matrix(prices, km, transport_rate=3.0, storage_cost=0.0):
+    """Best destination per (crop, origin) from a price matrix and distance matrix.
+
+    prices is (C, M) with NaN where a crop is not traded, km is (M, M);
+    storage_cost is charged on every route except selling at the origin.
+    Returns (best (C, M) destination index, net gain (C, M) over selling at
+    the origin today); origins without a price get index -1 and NaN gain.
+    """
+    C, M = prices.shape
+    cost = km * np.float32(transport_rate) + np.float32(storage_cost) * (1 - np.eye(M, dtype=np.float32))
+    dest_value = np.where(np.isnan(prices), -np.inf, prices).astype(np.float32)
+    best = np.full((C, M), -1, dtype=np.int64)
+    gain = np.full((C, M), np.nan, dtype=np.float32)
+
+    block = max(1, BLOCK_ELEMENTS // max(M * M, 1))
+    for lo in range(0, C, block):
+        net = dest_value[lo:lo + block, None, :] - cost[None, :, :]  # (crops, origin, destination)
+        idx = np.argmax(net, axis=2)
+        best[lo:lo + block] = idx
+        gain[lo:lo + block] = np.take_along_axis(net, idx[..., None], axis=2)[..., 0] - prices[lo:lo + block]
+    missing = np.isnan(prices)
+    best[missing] = -1
+    gain[missing] = np.nan
+    return best, gain
+
+
+def best_destinations(store, crop=None, transport_rate=3.0, storage_rate=0.0, hold_months=0, locations=None):
+    """Where to sell from each market: one row per (crop, origin) with BEST_COLUMNS.
+
+    transport_rate is ₹/km/qt and storage_rate ₹/qt/month, charged for
+    hold_months on loads that are moved. crop=None covers every crop.
+    """
+    crops, markets, prices, km = _store_inputs(store, locations, crop)
+    storage_cost = storage_rate * hold_months
+    best, gain = best_destinations_matrix(prices, km, transport_rate, storage_cost)
+    c, o = np.nonzero(best >= 0)
+    d = best[c, o]
+    distance = km[o, d]
+    transport = distance * transport_rate
+    storage = np.where(d != o, float(storage_cost), 0.0)
+    return pd.DataFrame({
+        'crop': crops.to_numpy()[c],
+        'origin': markets.to_numpy()[o],
+        'origin_price': prices[c, o],
+        'best_market': markets.to_numpy()[d],
+        'best_price': prices[c, d],
+        'distance_km': distance,
+        'transport_cost': transport,
+        'storage_cost': storage,
+        'net_price': prices[c, d] - transport - storage,
+        'net_gain': gain[c, o],
+    }, columns=BEST_COLUMNS)
+
+
+def arbitrage_matrix(store, crop, transport_rate=3.0, storage_rate=0.0, hold_months=0, locations=None):
+    """Net gain (₹/qt) of moving a load of one crop from each origin (rows) to each destination (columns).
+
+    The diagonal (selling at the origin) is 0; storage is charged on the other routes.
+    """
+    crops, markets, prices, km = _store_inputs(store, locations, crop)
+    if not len(crops):
+        return pd.DataFrame()
+    p = prices[0]
+    net = p[None, :] - p[:, None] - km * transport_rate - storage_rate * hold_months * (1 - np.eye(len(p)))
+    return pd.DataFrame(net, index=pd.Index(markets, name='origin'), columns=pd.Index(markets, name='destination'))
@@ -4,140 +4,128 @@ import numpy as np
 from pathlib import Path
 import plotly.graph_objects as go
 import plotly.express as px
-from datetime import datetime, timedelta
-import csv
+from datetime import datetime
+from modules.data_registry import get_dataset, invalidate
+from modules.csv_ingest import format_ingest_stats
+from modules.columnar_cache import load_table
+from modules.price_store import PriceStore, as_price_store
+from modules.temporal import DATE_FORMAT, format_date, format_dates
+from modules.price_forecast import forecast_batch
+from modules.chart_downsample import scatter_trace
+from modules.market_arbitrage import arbitrage_matrix, best_destinations
+from modules.sell_optimizer import MAX_LEVELS as MAX_SELL_LEVELS, market_price_scenarios, optimize_sell_schedule, schedule_table
+from modules.rolling_stats import append_with_stats, rolling_stats_for
+from modules.market_anomalies import latest_anomalies
+from modules.seasonal_calendar import ALL_MARKETS, MIN_MONTHS, MONTH_NAMES, crop_calendar
+from modules.price_transmission import lead_lag_pairs, price_transmission
+from modules.quality_analytics import grade_mix_trend, quality_summary
+from modules.profit_sweep import DEFAULT_STEPS as SWEEP_STEPS, run_sweep, scenario_axis
+from modules.price_alerts import (ALERT_LABELS, DEFAULT_CHANGE_PERCENT, add_rule, deliver,
+                                  latest_price_changes, load_alert_index)
+from modules.demo_market_data import generate_market_data
+from modules.price_ingest import DEFAULT_STORE, MANIFEST_NAME, load_partitions, partition_parts, stored_crops
 
+# Columns create_price_chart needs, and with the quality grade table the period
+# views; period stores read only these columns from the partition files
+PRICE_CHART_COLUMNS = ['date', 'crop', 'market', 'modal_price']
+PERIOD_COLUMNS = PRICE_CHART_COLUMNS + ['arrival_quantity', 'faq_percent', 'good_percent', 'average_percent']
 
-def safe_read_csv(path):
-    p = Path(path)
-    if not p.exists() or p.stat().st_size == 0:
-        return pd.DataFrame()
+# Registry key -> partition parts its cached PriceStore was built from
+_store_parts = {}
+# (crop key, period length, columns) -> registry key of the period store currently cached
+_period_keys = {}
 
-    # Try sniffing delimiter
-    try:
-        sample = p.read_text(encoding='utf-8', errors='replace')[:8192]
-    except Exception:
-        sample = None
+# Storage cost ranges (₹/qt/month); planning uses the low end of the range
+STORAGE_RATES = {
+    'Farm Storage': (2, 5),
+    'Warehouse': (8, 15),
+    'Cold Storage': (25, 50),
+    'Silo Storage': (10, 20)
+}
 
-    delim = None
-    if sample:
-        try:
-            dialect = csv.Sniffer().sniff(sample, delimiters=[',', ';', '\t', '|'])
-            delim = dialect.delimiter
-        except Exception:
-            delim = None
-
-    candidates = ([delim] if delim else []) + [',', ';', '\t', '|']
-    tried = set()
-    for d in candidates:
-        if not d or d in tried:
-            continue
-        tried.add(d)
-        try:
-            df = pd.read_csv(p, sep=d)
-            if not df.empty and len(df.columns) > 0:
-                return df
-        except Exception:
-            continue
-
-    # final fallback
-    try:
-        return pd.read_csv(p, engine='python')
-    except Exception:
-        return pd.DataFrame()
 
 def load_market_data():
-    """Load market price data"""
+    """Load market price data (parsed once per file version, shared across sessions)"""
     data_path = Path(__file__).parent.parent / "data" / "market_prices.csv"
     global market_load_info
-    market_load_info = {'source': None, 'warning': None, 'columns': None, 'sample': None}
+    df, market_load_info = get_dataset('market_prices', data_path, _read_market_data)
+    return df
 
-    if data_path.exists():
-        try:
-            raw = data_path.read_text(encoding='utf-8', errors='replace')
-        except Exception:
-            raw = None
-
-        df = safe_read_csv(data_path)
-        if df is None or df.empty:
-            market_load_info.update({'source': 'demo_generated', 'warning': f'CSV at {data_path} missing/empty/malformed; generating demo data.', 'columns': [], 'sample': (raw[:2048] if raw else None)})
-        else:
-            market_load_info.update({'source': 'csv', 'warning': None, 'columns': df.columns.tolist(), 'sample': (raw[:2048] if raw else None)})
-            return df
-    # If we reached here, either data_path didn't exist OR CSV existed but was invalid/empty
-    # Generate sample market data
-    crops = ['Rice', 'Wheat', 'Cotton', 'Tomato', 'Onion', 'Potato', 'Maize', 'Soybean', 'Sugarcane', 'Chili']
-    markets = ['Delhi', 'Mumbai', 'Bangalore', 'Chennai', 'Kolkata', 'Pune', 'Hyderabad', 'Ahmedabad']
-    dates = [(datetime.now() - timedelta(days=i)) for i in range(30, 0, -1)]
-
-    np.random.seed(42)
-    market_data = []
-
-    # Base prices (per quintal)
-    base_prices = {
-        'Rice': 2000, 'Wheat': 2200, 'Cotton': 5500, 'Tomato': 1500,
-        'Onion': 800, 'Potato': 1200, 'Maize': 1800, 'Soybean': 4000,
-        'Sugarcane': 350, 'Chili': 8000
-    }
+def load_price_store(crop=None, start=None, end=None, columns=None):
+    """Typed, (crop, market, date)-sorted PriceStore built once per market data version
 
-    for crop in crops:
-        base_price = base_prices[crop]
+    When the partitioned store (modules/price_ingest.py) exists, only the
+    partitions of `crop` are loaded (all crops if None); otherwise the whole
+    market_prices.csv backs the store and `crop`, start and end are ignored.
+    After an ingest only the new parts are read and appended to the cached
+    store (rolling stats included) instead of reloading every partition.
+    start/end (inclusive) limit the load to the month= partitions of that
+    period and columns (e.g. PERIOD_COLUMNS) to those columns of each part;
+    such period stores are small and simply rebuilt after an ingest.
+    """
+    manifest_path = DEFAULT_STORE / MANIFEST_NAME
+    if manifest_path.exists():
+        key = 'market_partitions' if crop is None else f'market_partitions:{crop}'
+        if start is not None or end is not None:
+            return _load_period_store(key, manifest_path, crop, start, end, columns)
 
-        for market in markets:
-            # Market-specific price variation
-            market_factor = {
-                'Delhi': 1.05, 'Mumbai': 1.15, 'Bangalore': 1.08, 'Chennai': 1.02,
-                'Kolkata': 0.95, 'Pune': 1.12, 'Hyderabad': 1.00, 'Ahmedabad': 1.08
-            }[market]
+        def build(path):
+            parts = partition_parts(DEFAULT_STORE, crop)
+            store = PriceStore(load_partitions(DEFAULT_STORE, crop=crop))
+            _store_parts[key] = parts
+            return store
 
-            market_base = base_price * market_factor
+        def update(path, store):
+            loaded = _store_parts.get(key)
+            parts = partition_parts(DEFAULT_STORE, crop)
+            if loaded is None or not loaded <= parts:
+                return None  # parts were rewritten or removed: rebuild
+            new_rows = load_partitions(DEFAULT_STORE, crop=crop, exclude=loaded)
+            _store_parts[key] = parts
+            return append_with_stats(store, new_rows) if len(new_rows) else store
 
-            for i, date in enumerate(dates):
-                # Price trend with seasonal variation
-                trend = np.sin(i * 0.2) * 0.1 + np.random.normal(0, 0.05)
-                seasonal_factor = 1 + trend
-
-                # Daily price with random variation
-                daily_variation = np.random.normal(1, 0.03)
-
-                current_price = market_base * seasonal_factor * daily_variation
-
-                # Calculate min/max prices
-                min_price = current_price * (0.95 + np.random.normal(0, 0.02))
-                max_price = current_price * (1.05 + np.random.normal(0, 0.02))
-
-                # Arrivals (quantity in quintals)
-                base_arrival = {'Rice': 500, 'Wheat': 800, 'Cotton': 200, 'Tomato': 300,
-                              'Onion': 400, 'Potato': 600, 'Maize': 450, 'Soybean': 350,
-                              'Sugarcane': 1000, 'Chili': 150}[crop]
+        return get_dataset(key, manifest_path, build, update)
+    data_path = Path(__file__).parent.parent / "data" / "market_prices.csv"
+    return get_dataset('market_price_store', data_path, lambda path: PriceStore(load_market_data()))
 
-                arrival = max(50, base_arrival * (0.8 + np.random.random() * 0.4))
+def _load_period_store(crop_key, manifest_path, crop, start, end, columns=None):
+    """PriceStore of one crop's partitions within [start, end]; keeps one cached store per period length."""
+    projection = 'all' if columns is None else ','.join(columns)
+    key = f'{crop_key}:{format_date(start)}:{format_date(end)}:{projection}'
+    length = None if start is None or end is None else (pd.Timestamp(end) - pd.Timestamp(start)).days
+    previous = _period_keys.get((crop_key, length, projection))
+    if previous is not None and previous != key:
+        invalidate(previous)  # the period moved on after an ingest
+    _period_keys[(crop_key, length, projection)] = key
+    return get_dataset(key, manifest_path, lambda path: PriceStore(
+        load_partitions(DEFAULT_STORE, crop=crop, start=start, end=end, columns=columns)))
 
-                # Quality grade distribution
-                faq_percent = 60 + np.random.normal(0, 10)  # FAQ = Frequently Asked Quality
-                good_percent = 25 + np.random.normal(0, 5)
-                average_percent = max(0, 100 - faq_percent - good_percent)
+def list_price_crops():
+    """Crops available for analysis, without loading every partition"""
+    if (DEFAULT_STORE / MANIFEST_NAME).exists():
+        return stored_crops(DEFAULT_STORE)
+    return load_price_store().crops
 
-                market_data.append({
-                    'date': date.strftime('%Y-%m-%d'),
-                    'crop': crop,
-                    'market': market,
-                    'min_price': round(max(min_price, 0), 2),
-                    'max_price': round(max_price, 2),
-                    'modal_price': round(current_price, 2),  # Most common price
-                    'arrival_quantity': round(arrival, 0),
-                    'faq_percent': round(max(0, min(100, faq_percent)), 1),
-                    'good_percent': round(max(0, min(100, good_percent)), 1),
-                    'average_percent': round(max(0, min(100, average_percent)), 1)
-                })
+def _read_market_data(data_path):
+    """Parse market_prices.csv or generate demo data; returns (df, load_info)"""
+    market_load_info = {'source': None, 'warning': None, 'columns': None, 'sample': None, 'ingest': None}
 
-    return pd.DataFrame(market_data)
+    if data_path.exists():
+        df, ingest_stats = load_table(data_path)
+        market_load_info['ingest'] = ingest_stats
+        if df.empty:
+            market_load_info.update({'source': 'demo_generated', 'warning': f'CSV at {data_path} missing/empty/malformed; generating demo data.', 'columns': [], 'sample': ingest_stats['sample']})
+        else:
+            market_load_info.update({'source': 'csv', 'warning': None, 'columns': df.columns.tolist(), 'sample': ingest_stats['sample']})
+            return df, market_load_info
+    # If we reached here, either data_path didn't exist OR CSV existed but was invalid/empty
+    # Generate sample market data (one year x 10 crops x 8 markets, enough for the seasonal calendar)
+    demo_df = generate_market_data(days=365, seed=42)
+    return demo_df, market_load_info
 
-def calculate_price_trends(df, crop, market, days=7):
-    """Calculate price trends and statistics"""
-    filtered_data = df[(df['crop'] == crop) & (df['market'] == market)].copy()
-    filtered_data['date'] = pd.to_datetime(filtered_data['date'])
-    filtered_data = filtered_data.sort_values('date').tail(days)
+def calculate_price_trends(store, crop, market, days=7):
+    """Calculate price trends and statistics (store: PriceStore or market DataFrame)"""
+    filtered_data = as_price_store(store).series(crop, market, days)
     
     if len(filtered_data) < 2:
         return None
@@ -146,7 +134,7 @@ def calculate_price_trends(df, crop, market, days=7):
     previous_price = filtered_data.iloc[0]['modal_price']
     
     price_change = latest_price - previous_price
-    price_change_percent = (price_change / previous_price) * 100
+    price_change_percent = (price_change / previous_price) * 100 if previous_price > 0 else None
     
     avg_price = filtered_data['modal_price'].mean()
     price_volatility = filtered_data['modal_price'].std()
@@ -160,21 +148,21 @@ def calculate_price_trends(df, crop, market, days=7):
         'trend_data': filtered_data
     }
 
-def create_price_chart(df, crop, markets, days=30):
-    """Create price trend chart"""
+def create_price_chart(store, crop, markets, days=30):
+    """Create price trend chart (store: PriceStore or market DataFrame)"""
     fig = go.Figure()
     
     colors = px.colors.qualitative.Set1
+    store = as_price_store(store)
     
     for i, market in enumerate(markets):
-        market_data = df[(df['crop'] == crop) & (df['market'] == market)].copy()
-        market_data['date'] = pd.to_datetime(market_data['date'])
-        market_data = market_data.sort_values('date').tail(days)
+        market_data = store.series(crop, market, days)
         
         if not market_data.empty:
-            fig.add_trace(go.Scatter(
-                x=market_data['date'],
-                y=market_data['modal_price'],
+            # Long histories are downsampled (LTTB) so the payload stays bounded
+            fig.add_trace(scatter_trace(
+                market_data['date'].to_numpy(),
+                market_data['modal_price'].to_numpy(),
                 mode='lines+markers',
                 name=market,
                 line=dict(color=colors[i % len(colors)], width=2),
@@ -201,8 +189,7 @@ def run():
     st.markdown("## 📊 Market Prices & Trends")
     st.markdown("Track crop prices, analyze market trends, and make informed selling decisions.")
     
-    # Load market data
-    df = load_market_data()
+    crops = list_price_crops()
 
     # Show debug info if CSV had issues
     info = globals().get('market_load_info')
@@ -210,6 +197,8 @@ def run():
         st.warning(info.get('warning'))
         with st.expander("⚙️ Market data debug info"):
             st.write("Detected columns:", info.get('columns'))
+            if info.get('ingest'):
+                st.write("Ingest:", format_ingest_stats(info['ingest']))
             sample = info.get('sample')
             if sample:
                 st.markdown("**CSV sample (first 2KB):**")
@@ -221,12 +210,15 @@ def run():
     with col1:
         selected_crop = st.selectbox(
             "🌾 Select Crop:",
-            sorted(df['crop'].unique()),
+            crops,
             help="Choose the crop to analyze"
         )
     
+    # Load market data for the crop (typed store: categorical crop/market, datetime64 dates, float32 prices)
+    store = load_price_store(selected_crop)
+    
     with col2:
-        available_markets = sorted(df[df['crop'] == selected_crop]['market'].unique())
+        available_markets = store.markets(selected_crop)
         selected_markets = st.multiselect(
             "🏪 Select Markets:",
             available_markets,
@@ -244,6 +236,12 @@ def run():
     
     days = int(time_period.split()[0])
     
+    # Period views (trend chart, quality grades) read only the month partitions
+    # of the period, and only PERIOD_COLUMNS of them
+    period_end = store.latest_rows(selected_crop)['date'].max()
+    period_store = store if pd.isna(period_end) else load_price_store(
+        selected_crop, period_end - pd.Timedelta(days=days - 1), period_end, PERIOD_COLUMNS)
+    
     if not selected_markets:
         st.warning("Please select at least one market to display data.")
         return
@@ -252,25 +250,30 @@ def run():
     st.markdown("---")
     st.markdown("### 💰 Current Market Prices")
     
+    # Rolling 7/15/30-day statistics, maintained incrementally per store
+    rolling = rolling_stats_for(store).frame(selected_crop, selected_markets)
+    week_trends = rolling.set_index('market')['change_7'].dropna()
+    
+    # Current prices come from the materialized latest-observation snapshot
+    latest_rows = store.latest_rows(selected_crop, selected_markets)
+    
     current_data = []
-    for market in selected_markets:
-        latest_data = df[(df['crop'] == selected_crop) & (df['market'] == market)]
-        if not latest_data.empty:
-            latest_row = latest_data.loc[latest_data['date'].idxmax()]
-            
-            # Calculate trend
-            trend_info = calculate_price_trends(df, selected_crop, market, 7)
-            trend_arrow = "📈" if trend_info and trend_info['price_change_percent'] > 0 else "📉" if trend_info and trend_info['price_change_percent'] < 0 else "➡️"
-            trend_text = f"{trend_info['price_change_percent']:.1f}%" if trend_info else "N/A"
-            
-            current_data.append({
-                'Market': market,
-                'Current Price': f"₹{latest_row['modal_price']:.0f}",
-                'Min-Max': f"₹{latest_row['min_price']:.0f} - ₹{latest_row['max_price']:.0f}",
-                'Arrivals': f"{latest_row['arrival_quantity']:.0f} qt",
-                '7-Day Trend': f"{trend_arrow} {trend_text}",
-                'Date': latest_row['date']
-            })
+    for _, latest_row in latest_rows.iterrows():
+        market = latest_row['market']
+        
+        # Calculate trend
+        trend_pct = week_trends.get(market)
+        trend_arrow = "📈" if trend_pct is not None and trend_pct > 0 else "📉" if trend_pct is not None and trend_pct < 0 else "➡️"
+        trend_text = f"{trend_pct:.1f}%" if trend_pct is not None else "N/A"
+        
+        current_data.append({
+            'Market': market,
+            'Current Price': f"₹{latest_row['modal_price']:.0f}",
+            'Min-Max': f"₹{latest_row['min_price']:.0f} - ₹{latest_row['max_price']:.0f}",
+            'Arrivals': f"{latest_row['arrival_quantity']:.0f} qt",
+            '7-Day Trend': f"{trend_arrow} {trend_text}",
+            'Date': format_date(latest_row['date'])
+        })
     
     if current_data:
         current_df = pd.DataFrame(current_data)
@@ -281,7 +284,7 @@ def run():
         st.markdown("---")
         st.markdown("### 📈 Price Trend Analysis")
         
-        fig = create_price_chart(df, selected_crop, selected_markets, days)
+        fig = create_price_chart(period_store, selected_crop, selected_markets, days)
         st.plotly_chart(fig, use_container_width=True)
         
         # Key insights
@@ -291,11 +294,7 @@ def run():
             st.markdown("#### 🎯 Market Insights")
             
             # Find highest and lowest price markets
-            current_prices = {}
-            for market in selected_markets:
-                latest_data = df[(df['crop'] == selected_crop) & (df['market'] == market)]
-                if not latest_data.empty:
-                    current_prices[market] = latest_data.loc[latest_data['date'].idxmax()]['modal_price']
+            current_prices = dict(zip(latest_rows['market'], latest_rows['modal_price']))
             
             if current_prices:
                 highest_market = max(current_prices, key=current_prices.get)
@@ -311,15 +310,11 @@ def run():
         with col2:
             st.markdown("#### 📊 Trading Recommendations")
             
-            # Calculate overall trend
-            all_trends = []
-            for market in selected_markets:
-                trend_info = calculate_price_trends(df, selected_crop, market, days)
-                if trend_info:
-                    all_trends.append(trend_info['price_change_percent'])
+            # Overall trend from the precomputed rolling statistics
+            all_trends = rolling[f'change_{days}'].dropna()
             
-            if all_trends:
-                avg_trend = np.mean(all_trends)
+            if not all_trends.empty:
+                avg_trend = all_trends.mean()
                 
                 if avg_trend > 5:
                     st.success("🚀 **Strong Uptrend** - Consider holding for better prices")
@@ -332,30 +327,106 @@ def run():
                 else:
                     st.error("📉 **Strong Downtrend** - Sell immediately if possible")
                 
-                volatility = np.std(all_trends)
+                # Rolling coefficient of variation (%) averaged over the selected markets
+                volatility = (rolling[f'std_{days}'] / rolling[f'mean_{days}'] * 100).mean()
                 if volatility > 5:
                     st.warning("⚠️ **High Volatility** - Monitor daily for best timing")
+                
+                avg_z = rolling[f'z_{days}'].mean()
+                if pd.notna(avg_z):
+                    st.caption(f"Current prices are {avg_z:+.1f}σ from their {days}-day average")
+    
+    # National overview: every crop x market in one batched pass; loads every crop, so only on request
+    with st.expander("🇮🇳 National Price Overview (all crops × all markets)"):
+        overview = None
+        if st.button("🇮🇳 Load National Overview"):
+            overview = rolling_stats_for(load_price_store()).frame().dropna(subset=[f'std_{days}'])
+        if overview is None:
+            st.caption("Compares every crop and market; loads the full price history of all crops.")
+        elif overview.empty:
+            st.info("Not enough history for a national overview.")
+        else:
+            overview = overview.sort_values(f'change_{days}', ascending=False)
+            st.dataframe(pd.DataFrame({
+                'Crop': overview['crop'],
+                'Market': overview['market'],
+                'Latest Price': overview['latest'].map(lambda v: f"₹{v:.0f}"),
+                f'{days}-Day Change': overview[f'change_{days}'].map(lambda v: 'N/A' if pd.isna(v) else f"{v:+.1f}%"),
+                'Average': overview[f'mean_{days}'].map(lambda v: f"₹{v:.0f}"),
+                'Volatility': overview[f'std_{days}'].map(lambda v: f"₹{v:.0f}")
+            }), hide_index=True, use_container_width=True)
+    
+    # Lead/lag between markets from lagged correlation of daily returns (cached per crop)
+    with st.expander(f"🔗 Cross-Market Price Transmission ({selected_crop})"):
+        transmission = price_transmission(store, selected_crop)
+        if len(transmission['markets']) < 2 or np.isnan(transmission['best_corr']).all():
+            st.info("Not enough overlapping history between markets to estimate lead/lag.")
+        else:
+            lag_days = np.abs(transmission['best_lag']).astype(str)
+            lag_text = np.where(
+                transmission['best_lag'] > 0, np.char.add(np.char.add('leads by ', lag_days), ' day(s)'),
+                np.where(transmission['best_lag'] < 0, np.char.add(np.char.add('lags by ', lag_days), ' day(s)'), 'moves the same day')
+            )
+            fig_transmission = go.Figure(go.Heatmap(
+                z=transmission['best_corr'], x=transmission['markets'], y=transmission['markets'],
+                customdata=lag_text, colorscale='RdBu', zmid=0,
+                hovertemplate='%{y} → %{x}<br>Peak correlation: %{z:.2f}<br>%{y} %{customdata}<extra></extra>'
+            ))
+            fig_transmission.update_layout(title='Peak lagged correlation of daily price changes (row market vs column market)',
+                                           height=450)
+            st.plotly_chart(fig_transmission, use_container_width=True)
+            
+            pairs = lead_lag_pairs(transmission, selected_markets if len(selected_markets) > 1 else None)
+            pairs = pairs[pairs['lag_days'] > 0].head(10)
+            if not pairs.empty:
+                st.markdown("**Strongest lead/lag relationships**")
+                st.dataframe(pairs.rename(columns={
+                    'leader': 'Leader', 'follower': 'Follower', 'lag_days': 'Lag (days)',
+                    'peak_corr': 'Peak Corr', 'same_day_corr': 'Same-Day Corr'
+                }).round(2), hide_index=True, use_container_width=True)
+    
+    # Robust (median/MAD) anomalies among each series' newest observation; the
+    # selected crop by default, all crops (every partition) only on request
+    st.markdown("---")
+    st.markdown("### 🚨 Market Anomalies Today")
+    scan_all = st.button("🔍 Scan All Crops", help="Check every crop's markets, not just the selected crop")
+    anomalies = latest_anomalies(load_price_store() if scan_all else store)
+    if not anomalies.empty:
+        anomalies = anomalies[anomalies['date'] == anomalies['date'].max()]
+    if anomalies.empty:
+        st.success("✅ No unusual price or arrival movements in the latest data.")
+    else:
+        crop_first = anomalies['crop'] == selected_crop
+        anomalies = pd.concat([anomalies[crop_first], anomalies[~crop_first]])
+        anomaly_labels = {'price_spike': '📈 Price spike', 'price_crash': '📉 Price crash', 'arrival_surge': '🚚 Arrival surge'}
+        st.dataframe(pd.DataFrame({
+            'Crop': anomalies['crop'],
+            'Market': anomalies['market'],
+            'Event': anomalies['kind'].map(anomaly_labels),
+            'Value': anomalies['value'].map(lambda v: f"{v:,.0f}"),
+            '30-Day Median': anomalies['median'].map(lambda v: f"{v:,.0f}"),
+            'Robust Z': anomalies['robust_z'].round(1)
+        }).head(20), hide_index=True, use_container_width=True)
+        st.caption(f"{len(anomalies)} flagged observation(s) on {anomalies['date'].max():%Y-%m-%d}")
     
     # Market analysis by quality grades
     st.markdown("---")
     st.markdown("### 🏆 Quality Grade Analysis")
     
     if selected_markets:
-        quality_data = []
-        for market in selected_markets:
-            market_data = df[(df['crop'] == selected_crop) & (df['market'] == market)]
-            if not market_data.empty:
-                latest = market_data.loc[market_data['date'].idxmax()]
-                quality_data.append({
-                    'Market': market,
-                    'FAQ (%)': latest['faq_percent'],
-                    'Good (%)': latest['good_percent'], 
-                    'Average (%)': latest['average_percent'],
-                    'Quality Score': latest['faq_percent'] * 0.6 + latest['good_percent'] * 0.3 + latest['average_percent'] * 0.1
-                })
-        
-        if quality_data:
-            quality_df = pd.DataFrame(quality_data)
+        quality = quality_summary(period_store, selected_crop, selected_markets, days)
+        
+        if not quality.empty:
+            quality_df = pd.DataFrame({
+                'Market': quality['market'],
+                'FAQ (%)': quality['faq_percent'].round(1),
+                'Good (%)': quality['good_percent'].round(1),
+                'Average (%)': quality['average_percent'].round(1),
+                'Quality Score': quality['quality_score'].round(1),
+                'Avg Price (₹)': quality['avg_price'].round(0),
+                'Quality-Adj. Price (₹)': quality['quality_adjusted_price'].round(0),
+                'FAQ Trend (pts/30d)': quality['faq_trend'].round(1)
+            })
             
             col1, col2 = st.columns(2)
             
@@ -372,7 +443,7 @@ def run():
                 fig_quality.add_trace(go.Bar(name='Average', x=markets, y=quality_df['Average (%)']))
                 
                 fig_quality.update_layout(
-                    title='Quality Grade Distribution',
+                    title=f'Quality Grade Distribution (arrival-weighted, last {days} days)',
                     xaxis_title='Markets',
                     yaxis_title='Percentage (%)',
                     barmode='stack',
@@ -380,8 +451,19 @@ def run():
                 )
                 
                 st.plotly_chart(fig_quality, use_container_width=True)
-    
-    # Price forecasting (simple trend-based)
+            
+            st.caption("Quality-adjusted price rescales each market's average price to the crop's average "
+                       "grade mix, so markets can be compared for the same quality.")
+            
+            grade_trend = grade_mix_trend(store, selected_crop, selected_markets, days=90)
+            if not grade_trend.empty:
+                fig_grade_trend = px.line(grade_trend, x='period', y='faq_percent', color='market',
+                                          title='FAQ Share Trend (weekly, last 90 days)',
+                                          labels={'period': 'Week', 'faq_percent': 'FAQ (%)', 'market': 'Market'})
+                fig_grade_trend.update_layout(height=300)
+                st.plotly_chart(fig_grade_trend, use_container_width=True)
+    
+    # Price forecasting (batch models, backtest-selected per series)
     st.markdown("---")
     st.markdown("### 🔮 Price Forecast")
     
@@ -394,44 +476,27 @@ def run():
     if st.button("📊 Generate 7-Day Price Forecast"):
         
         # Get historical data for the selected market
-        historical_data = df[(df['crop'] == selected_crop) & (df['market'] == forecast_market)].copy()
-        historical_data['date'] = pd.to_datetime(historical_data['date'])
-        historical_data = historical_data.sort_values('date').tail(30)
+        historical_data = store.series(selected_crop, forecast_market, 30)
         
         if len(historical_data) > 10:
             
-            # Simple linear regression for trend
-            x = np.arange(len(historical_data))
-            y = historical_data['modal_price'].values
-            
-            # Calculate trend
-            z = np.polyfit(x, y, 1)
-            trend_slope = z[0]
-            
-            # Generate forecast
-            last_price = y[-1]
-            forecast_dates = [(datetime.now() + timedelta(days=i)) for i in range(1, 8)]
-            forecast_prices = []
+            # Fitted once per crop for every market of the store, then cached
+            forecast_level = 0.8
+            forecast = forecast_batch(store, selected_crop, [forecast_market], horizon=7, level=forecast_level)
             
-            for i in range(7):
-                # Simple trend continuation with some randomness
-                forecasted_price = last_price + (trend_slope * (i + 1))
-                # Add some uncertainty
-                uncertainty = abs(forecasted_price * 0.02)  # 2% uncertainty
-                forecast_prices.append({
-                    'Date': forecast_dates[i].strftime('%Y-%m-%d'),
-                    'Predicted Price': f"₹{forecasted_price:.0f}",
-                    'Range': f"₹{forecasted_price-uncertainty:.0f} - ₹{forecasted_price+uncertainty:.0f}",
-                    'Confidence': '70%' if i < 3 else '50%' if i < 5 else '30%'
-                })
-            
-            forecast_df = pd.DataFrame(forecast_prices)
+            forecast_df = pd.DataFrame({
+                'Date': format_dates(forecast['date']),
+                'Predicted Price': forecast['forecast'].map(lambda p: f"₹{p:.0f}"),
+                'Range': [f"₹{lo:.0f} - ₹{hi:.0f}" for lo, hi in zip(forecast['lower'], forecast['upper'])],
+                'Model': forecast['model'].str.replace('_', ' ').str.title()
+            })
             
             col1, col2 = st.columns(2)
             
             with col1:
                 st.markdown(f"#### 📈 7-Day Forecast for {forecast_market}")
                 st.dataframe(forecast_df, hide_index=True, use_container_width=True)
+                st.caption(f"Range is a {forecast_level:.0%} interval from backtest errors of the selected model.")
             
             with col2:
                 st.markdown("#### ⚠️ Forecast Disclaimer")
@@ -467,51 +532,72 @@ def run():
     
     with col3:
         if st.button("🔔 Set Price Alert"):
-            st.success(f"✅ Alert set for {selected_crop} in {alert_market}!")
-            st.info(f"📱 You'll be notified via {contact_method} when price is {alert_type.lower()} ₹{target_price:.0f}/qt")
+            alert_kind = ALERT_LABELS[alert_type]
+            threshold = DEFAULT_CHANGE_PERCENT if alert_kind == 'change' else target_price
+            rule_id = add_rule(selected_crop, alert_market, alert_kind, threshold, contact_method)
+            st.success(f"✅ Alert #{rule_id} set for {selected_crop} in {alert_market}!")
+            if alert_kind == 'change':
+                st.info(f"📱 You'll be notified via {contact_method} when price changes by more than {threshold:.0f}%")
+            else:
+                st.info(f"📱 You'll be notified via {contact_method} when price is {alert_type.lower()} ₹{target_price:.0f}/qt")
+            
+            # Rules already satisfied by the latest prices fire right away
+            fired = load_alert_index().evaluate(latest_price_changes(store, selected_crop))
+            fired = fired[fired['rule_id'] == rule_id]
+            if deliver(fired):
+                st.warning(f"⚡ Condition already met: latest price ₹{fired['price'].iloc[0]:.0f}/qt")
+    
+    alert_rules = load_alert_index().rules
+    crop_rules = alert_rules[alert_rules['crop'] == selected_crop]
+    if not crop_rules.empty:
+        with st.expander(f"🔔 Active alerts for {selected_crop} ({len(crop_rules)})"):
+            st.dataframe(crop_rules[['rule_id', 'market', 'kind', 'threshold', 'contact']],
+                         hide_index=True, use_container_width=True)
     
     # Market calendar and seasonal trends
     st.markdown("---")
     st.markdown("### 📅 Seasonal Market Calendar")
     
-    # Sample seasonal data
-    seasonal_data = {
-        'Rice': {
-            'harvest_months': 'Oct-Dec, Apr-May',
-            'peak_price_months': 'Jul-Sep',
-            'festival_demand': 'Diwali, Pongal',
-            'export_season': 'Nov-Mar'
-        },
-        'Wheat': {
-            'harvest_months': 'Mar-May',
-            'peak_price_months': 'Aug-Oct', 
-            'festival_demand': 'Holi, Diwali',
-            'export_season': 'Apr-Aug'
-        },
-        'Cotton': {
-            'harvest_months': 'Oct-Feb',
-            'peak_price_months': 'Jun-Sep',
-            'festival_demand': 'Wedding season',
-            'export_season': 'Nov-Apr'
-        }
+    # Harvest and price seasons are derived from the price history (month-of-year
+    # indices, cached per store); festival demand is not in the data, so it stays curated
+    festival_demand = {
+        'Rice': 'Diwali, Pongal',
+        'Wheat': 'Holi, Diwali',
+        'Cotton': 'Wedding season'
     }
     
-    if selected_crop in seasonal_data:
-        crop_seasonal = seasonal_data[selected_crop]
-        
+    calendar_market = st.selectbox("📍 Calendar for:", [ALL_MARKETS] + selected_markets, key="calendar_market")
+    crop_seasonal = crop_calendar(store, selected_crop, calendar_market)
+    
+    if crop_seasonal is None:
+        st.info(f"Seasonal calendar needs at least {MIN_MONTHS} months of price history for {selected_crop}.")
+    else:
         col1, col2, col3, col4 = st.columns(4)
         
         with col1:
-            st.info(f"**Harvest Season**\n{crop_seasonal['harvest_months']}")
+            st.info(f"**Harvest Season**\n{crop_seasonal['high_arrival_months']}")
         
         with col2:
             st.success(f"**Peak Prices**\n{crop_seasonal['peak_price_months']}")
         
         with col3:
-            st.warning(f"**Festival Demand**\n{crop_seasonal['festival_demand']}")
+            st.error(f"**Lowest Prices**\n{crop_seasonal['low_price_months']}")
         
         with col4:
-            st.info(f"**Export Season**\n{crop_seasonal['export_season']}")
+            st.warning(f"**Festival Demand**\n{festival_demand.get(selected_crop, 'N/A')}")
+        
+        month_table = crop_seasonal['months']
+        fig_season = go.Figure()
+        fig_season.add_trace(go.Bar(x=MONTH_NAMES, y=month_table['price_index'], name='Price index'))
+        fig_season.add_trace(go.Scatter(x=MONTH_NAMES, y=month_table['arrival_index'], name='Arrivals index',
+                                        mode='lines+markers'))
+        fig_season.update_layout(
+            title=f'{selected_crop} Seasonality ({calendar_market}, 100 = average month)',
+            yaxis_title='Index', height=350
+        )
+        st.plotly_chart(fig_season, use_container_width=True)
+        st.caption(f"Based on {crop_seasonal['months_covered']} calendar months of history; "
+                   f"seasonal price swing {crop_seasonal['price_swing']:.0f} index points.")
     
     # Market intelligence and tips
     st.markdown("---")
@@ -704,22 +790,18 @@ def run():
     with col1:
         st.markdown("#### 📦 Storage Options")
         
-        storage_costs = {
-            'Farm Storage': '₹2-5/qt/month',
-            'Warehouse': '₹8-15/qt/month',
-            'Cold Storage': '₹25-50/qt/month',
-            'Silo Storage': '₹10-20/qt/month'
-        }
-        
-        storage_type = st.selectbox("Storage Type:", list(storage_costs.keys()))
+        storage_type = st.selectbox(
+            "Storage Type:", list(STORAGE_RATES.keys()),
+            format_func=lambda name: f"{name} (₹{STORAGE_RATES[name][0]}-{STORAGE_RATES[name][1]}/qt/month)"
+        )
+        storage_rate = float(STORAGE_RATES[storage_type][0])
         quantity = st.number_input("Quantity (quintals):", min_value=1, value=100, step=10)
         months = st.selectbox("Storage Duration:", [1, 2, 3, 6, 9, 12])
         
         if st.button("💰 Calculate Storage Cost"):
-            cost_per_qt = float(storage_costs[storage_type].split('₹')[1].split('/')[0].split('-')[0])
-            total_cost = cost_per_qt * quantity * months
+            total_cost = storage_rate * quantity * months
             st.metric("Total Storage Cost", f"₹{total_cost:,.0f}")
-            st.caption(f"₹{cost_per_qt}/qt/month × {quantity} qt × {months} months")
+            st.caption(f"₹{storage_rate:g}/qt/month × {quantity} qt × {months} months")
     
     with col2:
         st.markdown("#### 🚛 Transportation")
@@ -750,6 +832,72 @@ def run():
             transport_cost = distance * transport_rate * quantity
             st.metric("Transport Cost", f"₹{transport_cost:,.0f}")
     
+    # Spatial arbitrage: best market to take a load to from each origin
+    st.markdown("#### 🧭 Where Should I Sell?")
+    include_storage = st.checkbox("Include storage cost for the selected storage duration (loads that are moved)", value=False)
+    hold_months = months if include_storage else 0
+    
+    destinations = best_destinations(store, selected_crop, transport_rate, storage_rate, hold_months)
+    if destinations.empty:
+        st.info("Market locations are not available for this crop's markets.")
+    else:
+        destinations_view = destinations.assign(
+            **{'Action': np.where(destinations['best_market'] == destinations['origin'], 'Sell locally', 'Move load')}
+        )[['origin', 'origin_price', 'best_market', 'distance_km', 'net_price', 'net_gain', 'Action']]
+        st.dataframe(
+            destinations_view.rename(columns={
+                'origin': 'From', 'origin_price': 'Local Price (₹/qt)', 'best_market': 'Best Market',
+                'distance_km': 'Distance (km)', 'net_price': 'Net Price (₹/qt)', 'net_gain': 'Net Gain (₹/qt)'
+            }).round(0),
+            hide_index=True, use_container_width=True
+        )
+        
+        with st.expander("🗺️ Market × Market Net Gain (₹/qt)"):
+            matrix = arbitrage_matrix(store, selected_crop, transport_rate, storage_rate, hold_months)
+            fig_arbitrage = px.imshow(
+                matrix, color_continuous_scale='RdYlGn', color_continuous_midpoint=0,
+                labels=dict(x='Destination', y='Origin', color='₹/qt'), aspect='auto'
+            )
+            st.plotly_chart(fig_arbitrage, use_container_width=True)
+    
+    # Hold-vs-sell: optimal monthly sell schedule over the storage duration
+    st.markdown("#### ⏳ Hold or Sell?")
+    col1, col2 = st.columns(2)
+    with col1:
+        expected_change = st.slider("Expected price change (%/month):", -10.0, 10.0, 0.0, 0.5)
+    with col2:
+        max_sell = st.number_input("Max sale per month (quintals):", min_value=max(1, int(np.ceil(quantity / (MAX_SELL_LEVELS - 1)))),
+                                   value=int(quantity), step=10,
+                                   help=f"At least 1/{MAX_SELL_LEVELS - 1} of the lot, which keeps the plan fast to compute")
+    
+    plan_months = max(months, 2)
+    plan_markets, paths = market_price_scenarios(
+        store, selected_crop, selected_markets, months=plan_months, monthly_drift=expected_change / 100
+    )
+    if plan_markets:
+        plan = optimize_sell_schedule(paths, quantity, storage_rate, max_sell=max_sell)
+        low, high = np.percentile(plan['scenario_revenue'], [10, 90], axis=1)
+        plan_summary = pd.DataFrame({
+            'Market': plan_markets,
+            'Sell Now (₹)': plan['sell_now_revenue'],
+            'Planned (₹)': plan['expected_revenue'],
+            'Gain (₹)': plan['expected_revenue'] - plan['sell_now_revenue'],
+            'Storage Cost (₹)': plan['storage_cost'],
+            'Range P10–P90 (₹)': [f"₹{lo:,.0f} - ₹{hi:,.0f}" for lo, hi in zip(low, high)]
+        })
+        st.dataframe(plan_summary.round(0), hide_index=True, use_container_width=True)
+        st.caption("Sell Now sells as fast as the monthly limit allows, paying storage on what has to wait.")
+        
+        best = int(np.argmax(plan['expected_revenue']))
+        best_plan = schedule_table(plan, plan_markets)
+        best_plan = best_plan[best_plan['market'] == plan_markets[best]]
+        st.caption(f"Best plan: {plan_markets[best]} - quintals to sell each month")
+        st.dataframe(
+            best_plan.rename(columns={'month': 'Month', 'sell_qt': 'Sell (qt)', 'held_qt': 'Still Held (qt)'})
+            .drop(columns='market').round(1),
+            hide_index=True, use_container_width=True
+        )
+    
     # Profit calculator
     st.markdown("---")
     st.markdown("### 💰 Profit Calculator")
@@ -789,19 +937,77 @@ def run():
             else:
                 st.error("❌ Loss-making sale!")
     
+    # Scenario sweep: ~10^6 price x yield x cost x distance combinations, recomputed on every change
+    with st.expander("🔬 Scenario Sweep (price × yield × cost × distance)"):
+        sweep_col1, sweep_col2 = st.columns(2)
+        with sweep_col1:
+            price_range = st.slider("Selling Price Range (₹/qt):", 0.0, float(max(selling_price, 1.0) * 2),
+                                    (float(selling_price * 0.7), float(selling_price * 1.3)), 50.0)
+            yield_range = st.slider("Yield Range (qt/acre):", 1.0, 60.0, (10.0, 30.0), 1.0)
+        with sweep_col2:
+            default_cost = production_cost * 20
+            cost_range = st.slider("Cultivation Cost Range (₹/acre):", 0.0, float(max(default_cost, 1000.0) * 2),
+                                   (float(default_cost * 0.5), float(default_cost * 1.5)), 500.0)
+            distance_range = st.slider("Distance to Market Range (km):", 0, 500, (0, 300), 10)
+        sweep_area = st.number_input("Area (acres):", min_value=0.5, value=5.0, step=0.5)
+        
+        sweep = run_sweep(
+            scenario_axis(*price_range, SWEEP_STEPS['price']),
+            scenario_axis(*yield_range, SWEEP_STEPS['yield']),
+            scenario_axis(*cost_range, SWEEP_STEPS['cost']),
+            scenario_axis(*distance_range, SWEEP_STEPS['distance']),
+            harvesting_cost=harvesting_cost, transport_rate=transport_rate,
+            market_fee_pct=market_fee, area=sweep_area
+        )
+        
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            st.metric("Profitable Scenarios", f"{sweep['profitable_share']:.0%}")
+        with col2:
+            st.metric("Median Profit", f"₹{sweep['percentiles'][50]:,.0f}")
+        with col3:
+            st.metric("P10 / P90 Profit", f"₹{sweep['percentiles'][10]:,.0f} / ₹{sweep['percentiles'][90]:,.0f}")
+        
+        yields = scenario_axis(*yield_range, SWEEP_STEPS['yield'])
+        costs = scenario_axis(*cost_range, SWEEP_STEPS['cost'])
+        fig_breakeven = go.Figure(go.Heatmap(
+            z=sweep['breakeven_price'], x=costs, y=yields, colorscale='RdYlGn_r',
+            colorbar=dict(title='₹/qt'),
+            hovertemplate='Yield %{y:.1f} qt/acre<br>Cost ₹%{x:,.0f}/acre<br>Break-even ₹%{z:,.0f}/qt<extra></extra>'
+        ))
+        fig_breakeven.add_trace(go.Contour(
+            z=sweep['breakeven_price'], x=costs, y=yields, contours_coloring='none', showscale=False,
+            contours=dict(start=selling_price, end=selling_price, size=1, showlabels=True),
+            line=dict(color='black', dash='dash'), hoverinfo='skip'
+        ))
+        fig_breakeven.update_layout(
+            title=f"Break-even selling price at {sweep['distance']:.0f} km (dashed: your price ₹{selling_price:,.0f})",
+            xaxis_title='Cultivation Cost (₹/acre)', yaxis_title='Yield (qt/acre)', height=400
+        )
+        st.plotly_chart(fig_breakeven, use_container_width=True)
+        
+        by_price = sweep['by_price'].iloc[::max(1, SWEEP_STEPS['price'] // 10)]
+        st.markdown("**Profit percentiles by selling price** (over all yield, cost and distance scenarios)")
+        st.dataframe(pd.DataFrame({
+            'Price (₹/qt)': by_price['price'].round(0),
+            'P10 (₹)': by_price['P10'].round(0),
+            'P50 (₹)': by_price['P50'].round(0),
+            'P90 (₹)': by_price['P90'].round(0),
+            'Loss Probability': (by_price['loss_probability'] * 100).round(1).astype(str) + '%'
+        }), hide_index=True, use_container_width=True)
+        st.caption(f"{sweep['cells']:,} scenarios evaluated in {sweep['seconds'] * 1000:.0f} ms "
+                   f"at ₹{transport_rate}/km/qt transport.")
+    
     # Data export options
     st.markdown("---")
     if st.button("📥 Download Market Data"):
         # Filter data for selected crop and markets
-        export_data = df[
-            (df['crop'] == selected_crop) & 
-            (df['market'].isin(selected_markets))
-        ].copy()
-        
-        export_data['date'] = pd.to_datetime(export_data['date'])
-        export_data = export_data.sort_values(['market', 'date']).tail(days * len(selected_markets))
+        export_data = pd.concat(
+            [store.series(selected_crop, market, days) for market in selected_markets],
+            ignore_index=True
+        )
         
-        csv = export_data.to_csv(index=False)
+        csv = export_data.to_csv(index=False, date_format=DATE_FORMAT)
         st.download_button(
             label="💾 Download CSV",
             data=csv,
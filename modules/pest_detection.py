@@ -1,14 +1,20 @@
 import streamlit as st
 import pandas as pd
 from pathlib import Path
+from modules.data_registry import get_dataset
+from modules.columnar_cache import load_table
 import numpy as np
 from PIL import Image
 
 def load_pest_disease_data():
     """Load pest and disease data"""
     data_path = Path(__file__).parent.parent / "data" / "pest_disease_dataset.csv"
+    return get_dataset('pest_disease', data_path, _read_pest_disease_data)
+
+def _read_pest_disease_data(data_path):
+    """Parse pest_disease_dataset.csv (or build sample data); cached by the dataset registry"""
     if data_path.exists():
-        return pd.read_csv(data_path)
+        return load_table(data_path)[0]
     else:
         # Sample data if file doesn't exist
         return pd.DataFrame({
@@ -0,0 +1,258 @@
+import os
+import threading
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from modules.data_registry import get_dataset, invalidate
+from modules.price_analytics import select_series
+
+try:
+    import pyarrow.feather as feather
+except ImportError:  # without pyarrow the rule store is kept as CSV
+    feather = None
+
+# Persistent price-alert rules evaluated in bulk against incoming prices.
+#
+#   data/price_alerts/
+#       rules.feather       rule_id, crop, market, kind, threshold, contact, created_at
+#       outbox.jsonl        fired notifications waiting for a local sender
+#
+# Rules are compiled per kind into one array sorted by (crop x market key,
+# threshold). For an incoming price the rules that fire form a contiguous run
+# of that key's block, found with a single searchsorted over the whole batch,
+# so cost grows with batch size and fired rules, not with the rule count.
+
+DEFAULT_ALERT_DIR = Path(__file__).parent.parent / "data" / "price_alerts"
+RULES_NAME = 'rules.feather' if feather is not None else 'rules.csv'
+OUTBOX_NAME = 'outbox.jsonl'
+
+ALERT_KINDS = ['above', 'below', 'change']
+ALERT_LABELS = {'Price Above': 'above', 'Price Below': 'below', 'Price Change > 5%': 'change'}
+DEFAULT_CHANGE_PERCENT = 5.0
+RULE_COLUMNS = ['rule_id', 'crop', 'market', 'kind', 'threshold', 'contact', 'created_at']
+NOTIFICATION_COLUMNS = ['rule_id', 'crop', 'market', 'kind', 'threshold', 'date',
+                        'price', 'previous_price', 'change_percent', 'contact']
+
+_write_lock = threading.Lock()
+
+
+def empty_rules():
+    return pd.DataFrame({
+        'rule_id': pd.Series(dtype=np.int64),
+        'crop': pd.Series(dtype=object),
+        'market': pd.Series(dtype=object),
+        'kind': pd.Series(dtype=object),
+        'threshold': pd.Series(dtype=np.float64),
+        'contact': pd.Series(dtype=object),
+        'created_at': pd.Series(dtype='datetime64[ns]'),
+    })
+
+
+def rules_path(alert_dir=DEFAULT_ALERT_DIR):
+    return Path(alert_dir) / RULES_NAME
+
+
+def _registry_key(alert_dir):
+    return f"price_alert_rules:{Path(alert_dir).resolve()}"
+
+
+def read_rules(path):
+    """All stored rules (an empty frame if the store does not exist yet)."""
+    path = Path(path)
+    if not path.exists():
+        return empty_rules()
+    if path.suffix == '.feather':
+        return feather.read_table(path).to_pandas()
+    return pd.read_csv(path, parse_dates=['created_at'])
+
+
+def _write_rules(path, rules):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + f'.{os.getpid()}.tmp')
+    out = rules[RULE_COLUMNS].reset_index(drop=True)
+    if path.suffix == '.feather':
+        feather.write_feather(out, tmp, compression='uncompressed')
+    else:
+        out.to_csv(tmp, index=False)
+    os.replace(tmp, path)
+
+
+def add_rules(new_rules, alert_dir=DEFAULT_ALERT_DIR):
+    """Append rules (crop, market, kind, threshold[, contact]) and return them with rule ids.
+
+    kind is one of ALERT_KINDS; threshold is a price for 'above'/'below' and a
+    percent for 'change'. The file is rewritten atomically under a lock, so
+    concurrent sessions never lose each other's rules.
+    """
+    path = rules_path(alert_dir)
+    new = pd.DataFrame(new_rules).copy()
+    unknown = set(new['kind']) - set(ALERT_KINDS)
+    if unknown:
+        raise ValueError(f"Unknown alert kind(s): {sorted(unknown)}")
+    with _write_lock:
+        rules = read_rules(path)
+        first_id = int(rules['rule_id'].max()) + 1 if len(rules) else 1
+        new['rule_id'] = np.arange(first_id, first_id + len(new), dtype=np.int64)
+        new['threshold'] = new['threshold'].astype(np.float64)
+        if 'contact' not in new.columns:
+            new['contact'] = 'App Push'
+        new['created_at'] = pd.Timestamp(datetime.now()).floor('s')
+        rules = pd.concat([rules, new[RULE_COLUMNS]], ignore_index=True) if len(rules) else new[RULE_COLUMNS]
+        _write_rules(path, rules)
+    invalidate(_registry_key(alert_dir))
+    return new[RULE_COLUMNS]
+
+
+def add_rule(crop, market, kind, threshold, contact='App Push', alert_dir=DEFAULT_ALERT_DIR):
+    """Store a single rule; returns its rule_id."""
+    added = add_rules([{'crop': crop, 'market': market, 'kind': kind,
+                        'threshold': threshold, 'contact': contact}], alert_dir)
+    return int(added['rule_id'].iloc[0])
+
+
+class AlertIndex:
+    """Rules compiled into sorted threshold arrays for bulk evaluation.
+
+    Each kind keeps rule positions ordered by (key, threshold), where key is
+    crop code x market count + market code, plus a composite float
+    key * span + threshold so one searchsorted finds the firing run for a
+    whole batch of prices at once.
+    """
+
+    def __init__(self, rules):
+        self.rules = rules.reset_index(drop=True)
+        self.crop_labels = pd.Index(pd.unique(self.rules['crop'].astype(str)))
+        self.market_labels = pd.Index(pd.unique(self.rules['market'].astype(str)))
+        keys = self._keys(self.rules['crop'], self.rules['market'])
+        thresholds = self.rules['threshold'].to_numpy(dtype=np.float64)
+        kinds = self.rules['kind'].to_numpy()
+
+        self._offset = float(thresholds.min()) if len(thresholds) else 0.0
+        self._span = float(thresholds.max() - self._offset + 1) if len(thresholds) else 1.0
+        self.kinds = {}
+        for kind in ALERT_KINDS:
+            sel = np.flatnonzero(kinds == kind)
+            order = sel[np.lexsort((thresholds[sel], keys[sel]))]
+            sorted_keys = keys[order]
+            self.kinds[kind] = (order, sorted_keys, self._composite(sorted_keys, thresholds[order]))
+
+    def __len__(self):
+        return len(self.rules)
+
+    def _keys(self, crops, markets):
+        crop_codes = self.crop_labels.get_indexer(pd.Index(crops).astype(str))
+        market_codes = self.market_labels.get_indexer(pd.Index(markets).astype(str))
+        keys = crop_codes.astype(np.int64) * len(self.market_labels) + market_codes
+        return np.where((crop_codes < 0) | (market_codes < 0), -1, keys)
+
+    def _composite(self, keys, values):
+        return keys * self._span + (values - self._offset)
+
+    def _fired(self, kind, keys, values, fire_above):
+        """(batch row, rule position) pairs where threshold < value (fire_above) or > value."""
+        order, sorted_keys, composite = self.kinds[kind]
+        valid = (keys >= 0) & np.isfinite(values)
+        block_start = np.searchsorted(sorted_keys, keys, 'left')
+        block_stop = np.searchsorted(sorted_keys, keys, 'right')
+        probe = self._composite(keys, np.where(valid, values, 0.0))
+        if fire_above:
+            lo = block_start
+            hi = np.clip(np.searchsorted(composite, probe, 'left'), block_start, block_stop)
+        else:
+            lo = np.clip(np.searchsorted(composite, probe, 'right'), block_start, block_stop)
+            hi = block_stop
+        counts = np.where(valid, hi - lo, 0)
+        batch_rows = np.repeat(np.arange(len(keys)), counts)
+        offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        return batch_rows, order[np.repeat(lo, counts) + offsets]
+
+    def evaluate(self, batch):
+        """Notifications fired by a batch of prices.
+
+        batch needs crop, market and modal_price columns; date and
+        previous_price are optional ('change' rules need previous_price).
+        Returns a DataFrame with NOTIFICATION_COLUMNS, one row per fired rule
+        and batch row.
+        """
+        if not len(self) or batch.empty:
+            return pd.DataFrame(columns=NOTIFICATION_COLUMNS)
+        keys = self._keys(batch['crop'], batch['market'])
+        price = batch['modal_price'].to_numpy(dtype=np.float64)
+        previous = batch['previous_price'].to_numpy(dtype=np.float64) if 'previous_price' in batch else np.full(len(batch), np.nan)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            change = (price - previous) / previous * 100
+
+        hits = [self._fired('above', keys, price, True),
+                self._fired('below', keys, price, False),
+                self._fired('change', keys, np.abs(change), True)]
+        batch_rows = np.concatenate([h[0] for h in hits])
+        rule_pos = np.concatenate([h[1] for h in hits])
+
+        rules = self.rules.iloc[rule_pos]
+        dates = batch['date'].to_numpy()[batch_rows] if 'date' in batch else pd.NaT
+        return pd.DataFrame({
+            'rule_id': rules['rule_id'].to_numpy(),
+            'crop': rules['crop'].to_numpy(),
+            'market': rules['market'].to_numpy(),
+            'kind': rules['kind'].to_numpy(),
+            'threshold': rules['threshold'].to_numpy(),
+            'date': dates,
+            'price': price[batch_rows],
+            'previous_price': previous[batch_rows],
+            'change_percent': change[batch_rows],
+            'contact': rules['contact'].to_numpy(),
+        }, columns=NOTIFICATION_COLUMNS)
+
+
+def load_alert_index(alert_dir=DEFAULT_ALERT_DIR):
+    """Compiled index of the stored rules, rebuilt only when the rule file changes."""
+    return get_dataset(_registry_key(alert_dir), rules_path(alert_dir), lambda path: AlertIndex(read_rules(path)))
+
+
+def latest_price_changes(store, crop=None):
+    """Latest modal price per series with the observation before it as previous_price."""
+    series_pos = select_series(store, crop)
+    last = store.stops[series_pos] - 1
+    has_previous = last > store.starts[series_pos]
+    modal = store.frame['modal_price'].to_numpy(dtype=np.float64)
+    return pd.DataFrame({
+        'crop': store.labels('crop', last),
+        'market': store.labels('market', last),
+        'date': store.frame['date'].to_numpy()[last],
+        'modal_price': modal[last],
+        'previous_price': np.where(has_previous, modal[np.maximum(last - 1, 0)], np.nan),
+    })
+
+
+class JsonlAlertQueue:
+    """Appends notifications as JSON lines to an outbox file read by a local sender."""
+
+    def __init__(self, path=DEFAULT_ALERT_DIR / OUTBOX_NAME):
+        self.path = Path(path)
+
+    def put(self, notifications):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        lines = notifications.to_json(orient='records', lines=True, date_format='iso')
+        with _write_lock, open(self.path, 'a', encoding='utf-8') as fh:
+            fh.write(lines if lines.endswith('\n') else lines + '\n')
+
+
+_delivery_queue = None
+
+
+def get_delivery_queue():
+    global _delivery_queue
+    if _delivery_queue is None:
+        _delivery_queue = JsonlAlertQueue()
+    return _delivery_queue
+
+
+def deliver(notifications, delivery_queue=None):
+    """Hand fired notifications to the delivery queue; returns how many were queued."""
+    if notifications.empty:
+        return 0
+    (delivery_queue or get_delivery_queue()).put(notifications)
+    return len(notifications)
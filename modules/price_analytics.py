@@ -0,0 +1,37 @@
+import numpy as np
+
+
+def select_series(store, crop=None, markets=None):
+    """Positions (into store.starts/stops) of the series matching crop and markets.
+
+    crop=None selects every crop and markets=None every market.
+    """
+    mask = np.ones(store.series_count(), dtype=bool)
+    if crop is not None:
+        crop_labels = store.frame['crop'].cat.categories
+        if crop not in crop_labels:
+            return np.empty(0, dtype=np.int64)
+        mask &= store.series_crop_codes == crop_labels.get_loc(crop)
+    if markets is not None:
+        market_labels = store.frame['market'].cat.categories
+        wanted = [market_labels.get_loc(m) for m in markets if m in market_labels]
+        mask &= np.isin(store.series_market_codes, wanted)
+    return np.flatnonzero(mask)
+
+
+def window_rows(store, series_pos, days=None):
+    """Row numbers of the last `days` rows of each selected series, plus group ids.
+
+    Returns (rows, group, lengths): rows are concatenated in series order,
+    group[i] is the position in series_pos that rows[i] belongs to.
+    """
+    stops = store.stops[series_pos]
+    starts = store.starts[series_pos]
+    if days is not None:
+        starts = np.maximum(starts, stops - days)
+    lengths = stops - starts
+    group = np.repeat(np.arange(len(series_pos)), lengths)
+    offsets = np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+    rows = np.repeat(starts, lengths) + offsets
+    return rows, group, lengths
+
@@ -0,0 +1,309 @@
+import argparse
+import time
+import warnings
+import weakref
+
+import numpy as np
+import pandas as pd
+
+from modules.demo_market_data import generate_market_data, market_names
+from modules.price_analytics import select_series, window_rows
+from modules.price_store import PriceStore, as_price_store
+
+# Batch price forecasting over every (crop, market) series at once.
+#
+# Each model is evaluated on a (series x window) matrix of trailing modal
+# prices, vectorized across series, so fitting thousands of series costs a
+# handful of NumPy passes. Prediction intervals are empirical: quantiles of
+# the h-step actual / forecast ratio from a rolling-origin backtest of the
+# same model (non-positive forecasts excluded). Accuracy and per-series model
+# choice use the absolute percentage error against the actual price (MAPE),
+# skipping non-positive actuals, so a forecast near zero cannot blow it up.
+# Fits are cached per PriceStore object, and a new store (new data) starts
+# with an empty cache.
+#
+#   python -m modules.price_forecast --markets 3000 --days 120   # backtest benchmark
+
+MODELS = ['seasonal_naive', 'holt', 'linear_trend']
+HOLT_ALPHAS = np.array([0.1, 0.3, 0.5, 0.7, 0.9])
+HOLT_BETAS = np.array([0.01, 0.1, 0.3])
+
+_fit_cache = weakref.WeakKeyDictionary()
+
+
+def series_matrix(store, series_pos, window):
+    """Trailing `window` modal prices per series as an (S, window) float64 matrix.
+
+    Shorter series are left-padded with NaN so the last column is always the
+    latest observation.
+    """
+    rows, group, lengths = window_rows(store, series_pos, window)
+    matrix = np.full((len(series_pos), window), np.nan)
+    col = window - np.repeat(lengths, lengths) + (np.arange(len(rows)) - np.repeat(np.cumsum(lengths) - lengths, lengths))
+    matrix[group, col] = store.frame['modal_price'].to_numpy(dtype=np.float64)[rows]
+    return matrix
+
+
+def _last_valid(Y):
+    """Last non-NaN value of every row (NaN if the row is empty)."""
+    valid = ~np.isnan(Y)
+    idx = Y.shape[1] - 1 - np.argmax(valid[:, ::-1], axis=1)
+    out = Y[np.arange(len(Y)), idx]
+    out[~valid.any(axis=1)] = np.nan
+    return out
+
+
+def forecast_seasonal_naive(Y, horizon, season=7):
+    """Repeat the last observed season; falls back to the last value where missing."""
+    W = Y.shape[1]
+    steps = np.arange(horizon)
+    cols = W - season + (steps % season)
+    fc = Y[:, np.clip(cols, 0, W - 1)] if W >= season else np.full((len(Y), horizon), np.nan)
+    fallback = _last_valid(Y)[:, None]
+    return np.where(np.isnan(fc), fallback, fc)
+
+
+def forecast_holt(Y, horizon):
+    """Holt's linear exponential smoothing with a per-series (alpha, beta) grid search.
+
+    All grid points and series are updated together, one time step at a
+    time; the pair with the lowest in-sample one-step SSE is kept per series.
+    Returns (forecast (S, horizon), alpha (S,), beta (S,)).
+    """
+    alpha = np.repeat(HOLT_ALPHAS, len(HOLT_BETAS))[:, None]
+    beta = np.tile(HOLT_BETAS, len(HOLT_ALPHAS))[:, None]
+    G, S = len(alpha), len(Y)
+    level = np.full((G, S), np.nan)
+    trend = np.zeros((G, S))
+    sse = np.zeros((G, S))
+
+    for t in range(Y.shape[1]):
+        y = np.broadcast_to(Y[:, t], (G, S))
+        valid = ~np.isnan(y)
+        init = valid & np.isnan(level)
+        pred = level + trend
+        err = np.where(valid & ~init, y - pred, 0.0)
+        sse += err * err
+        new_level = alpha * y + (1 - alpha) * pred
+        new_trend = beta * (new_level - level) + (1 - beta) * trend
+        update = valid & ~init
+        level = np.where(init, y, np.where(update, new_level, level))
+        trend = np.where(init, 0.0, np.where(update, new_trend, trend))
+
+    best = np.argmin(sse, axis=0)
+    cols = np.arange(S)
+    steps = np.arange(1, horizon + 1)
+    fc = level[best, cols][:, None] + trend[best, cols][:, None] * steps[None, :]
+    return fc, alpha[best, 0], beta[best, 0]
+
+
+def forecast_linear_trend(Y, horizon):
+    """Least-squares line through each row's observed points, extrapolated.
+
+    Returns (forecast (S, horizon), slope (S,), intercept (S,)).
+    """
+    W = Y.shape[1]
+    x = np.arange(W, dtype=np.float64)[None, :]
+    w = ~np.isnan(Y)
+    y = np.where(w, Y, 0.0)
+    n = w.sum(axis=1)
+    sx = (w * x).sum(axis=1)
+    sy = y.sum(axis=1)
+    sxx = (w * x * x).sum(axis=1)
+    sxy = (y * x).sum(axis=1)
+    denom = n * sxx - sx * sx
+    with np.errstate(divide='ignore', invalid='ignore'):
+        slope = np.where(denom > 0, (n * sxy - sx * sy) / denom, 0.0)
+        intercept = (sy - slope * sx) / n
+    steps = np.arange(W, W + horizon, dtype=np.float64)
+    return intercept[:, None] + slope[:, None] * steps[None, :], slope, intercept
+
+
+def _forecast_all(Y, horizon, season):
+    """Point forecasts of every model as an (S, len(MODELS), horizon) array plus fitted params."""
+    holt_fc, alpha, beta = forecast_holt(Y, horizon)
+    lin_fc, slope, intercept = forecast_linear_trend(Y, horizon)
+    fc = np.stack([forecast_seasonal_naive(Y, horizon, season), holt_fc, lin_fc], axis=1)
+    return fc, {'holt_alpha': alpha, 'holt_beta': beta, 'trend_slope': slope, 'trend_intercept': intercept}
+
+
+def _rolling_origin_backtest(Y, horizon, origins, season):
+    """Backtest forecasts from the last `origins` cut points, newest origin first.
+
+    Returns (actuals, forecasts), both (origin, S, model, horizon).
+    """
+    W = Y.shape[1]
+    actuals, forecasts = [], []
+    for k in range(origins):
+        cut = W - horizon - k
+        if cut < max(season, 3):
+            break
+        fc, _ = _forecast_all(Y[:, :cut], horizon, season)
+        actuals.append(np.broadcast_to(Y[:, cut:cut + horizon][:, None, :], fc.shape))
+        forecasts.append(fc)
+    if not actuals:
+        empty = np.full((0, len(Y), len(MODELS), horizon), np.nan)
+        return empty, empty
+    return np.stack(actuals), np.stack(forecasts)
+
+
+def _percentage_errors(actuals, forecasts):
+    """|actual - forecast| / actual; NaN where the actual price is not positive."""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(actuals > 0, np.abs(actuals - forecasts) / actuals, np.nan)
+
+
+def _ratio_errors(actuals, forecasts):
+    """actual / forecast - 1, so actual = forecast * (1 + error); NaN for non-positive forecasts."""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(forecasts > 0, actuals / forecasts - 1, np.nan)
+
+
+def _nanmean(values, axis):
+    finite = np.isfinite(values)
+    count = finite.sum(axis=axis)
+    total = np.where(finite, values, 0.0).sum(axis=axis)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(count > 0, total / count, np.nan)
+
+
+def _error_quantiles(errors, level):
+    """Lower/upper ratio-error quantiles per (model, step), pooled over origins and series."""
+    tail = (1 - level) / 2
+    if not np.isfinite(errors).any():
+        zeros = np.zeros(errors.shape[2:])
+        return zeros, zeros
+    errors = np.where(np.isfinite(errors), errors, np.nan)
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)  # all-NaN steps yield NaN, mapped to 0 below
+        lower = np.nanquantile(errors, tail, axis=(0, 1))
+        upper = np.nanquantile(errors, 1 - tail, axis=(0, 1))
+    return np.nan_to_num(lower), np.nan_to_num(upper)
+
+
+def fit_forecasts(store, crop=None, horizon=7, window=60, season=7, origins=8, level=0.8):
+    """Fit every model for all series of a crop (all crops if None), cached per store.
+
+    The model used per series ('auto') is the one with the lowest backtest
+    mean absolute percentage error (against the actual price). Interval
+    quantiles are pooled per model and step across series and backtest origins.
+    """
+    store = as_price_store(store)
+    key = (crop, horizon, window, season, origins, level)
+    per_store = _fit_cache.setdefault(store, {})
+    if key in per_store:
+        return per_store[key]
+
+    start = time.perf_counter()
+    series_pos = select_series(store, crop)
+    Y = series_matrix(store, series_pos, window)
+    point, params = _forecast_all(Y, horizon, season)
+    actuals, forecasts = _rolling_origin_backtest(Y, horizon, origins, season)
+    mape = _nanmean(_percentage_errors(actuals, forecasts), axis=(0, 3))
+    best_model = np.argmin(np.where(np.isnan(mape), np.inf, mape), axis=1)
+    lower_q, upper_q = _error_quantiles(_ratio_errors(actuals, forecasts), level)
+
+    fit = {
+        'series_pos': series_pos,
+        'point': point,
+        'params': params,
+        'mape': mape,
+        'best_model': best_model,
+        'lower_q': lower_q,
+        'upper_q': upper_q,
+        'level': level,
+        'fit_seconds': time.perf_counter() - start,
+    }
+    per_store[key] = fit
+    return fit
+
+
+def forecast_batch(store, crop=None, markets=None, horizon=7, model='auto', level=0.8, window=60):
+    """Tidy forecast table for many series: one row per (crop, market, step).
+
+    model is 'auto' (per-series best by backtest) or one of MODELS. Columns:
+    crop, market, step, date, forecast, lower, upper, model.
+    """
+    store = as_price_store(store)
+    fit = fit_forecasts(store, crop, horizon, window, level=level)
+    pos = fit['series_pos']
+    take = np.ones(len(pos), dtype=bool)
+    if markets is not None:
+        take = np.isin(pos, select_series(store, crop, markets))
+
+    rows = np.flatnonzero(take)
+    model_idx = fit['best_model'][rows] if model == 'auto' else np.full(len(rows), MODELS.index(model))
+    point = fit['point'][rows, model_idx, :]
+    lower = point * (1 + fit['lower_q'][model_idx, :])
+    upper = point * (1 + fit['upper_q'][model_idx, :])
+
+    stop_rows = store.stops[pos[rows]] - 1
+    last_dates = store.frame['date'].to_numpy()[stop_rows]
+    steps = np.arange(1, horizon + 1)
+    return pd.DataFrame({
+        'crop': np.repeat(store.labels('crop', stop_rows), horizon),
+        'market': np.repeat(store.labels('market', stop_rows), horizon),
+        'step': np.tile(steps, len(rows)),
+        'date': (np.repeat(last_dates, horizon) + np.tile(steps, len(rows)).astype('timedelta64[D]')),
+        'forecast': point.ravel(),
+        'lower': np.minimum(lower, upper).ravel(),
+        'upper': np.maximum(lower, upper).ravel(),
+        'model': np.repeat(np.array(MODELS)[model_idx], horizon),
+    })
+
+
+def backtest_forecasts(store, crop=None, horizon=7, window=60, season=7, origins=8, level=0.8):
+    """Rolling-origin accuracy and throughput of every model.
+
+    Fits on data up to each of the last `origins` cut points and scores the
+    next `horizon` days. Interval coverage at `level` is measured on the
+    newest origin with quantiles taken from the older ones. MAPE is relative
+    to the actual price and skips non-positive actuals. Returns one row
+    per model with MAE, MAPE (%), coverage (%), series count, fit seconds and
+    series fits per second.
+    """
+    store = as_price_store(store)
+    series_pos = select_series(store, crop)
+    Y = series_matrix(store, series_pos, window)
+
+    start = time.perf_counter()
+    actuals, forecasts = _rolling_origin_backtest(Y, horizon, origins, season)
+    elapsed = time.perf_counter() - start
+    n_fits = len(actuals) * len(series_pos)
+
+    abs_error = np.abs(actuals - forecasts)
+    ape = _percentage_errors(actuals, forecasts)
+    errors = _ratio_errors(actuals, forecasts)
+    lower_q, upper_q = _error_quantiles(errors[1:], level)
+
+    results = []
+    for m, name in enumerate(MODELS):
+        newest = errors[:1, :, m, :]
+        finite = np.isfinite(newest)
+        covered = (newest >= lower_q[m]) & (newest <= upper_q[m])
+        results.append({
+            'model': name,
+            'MAE': float(_nanmean(abs_error[:, :, m, :], axis=None)),
+            'MAPE (%)': float(_nanmean(ape[:, :, m, :], axis=None) * 100),
+            'coverage (%)': float(covered[finite].mean() * 100) if len(errors) > 1 and finite.any() else np.nan,
+            'series': len(series_pos),
+            'fit_seconds': elapsed,
+            'series_per_second': n_fits / elapsed if elapsed > 0 else np.nan,
+        })
+    return pd.DataFrame(results)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Backtest the batch price forecasting models on synthetic data.")
+    parser.add_argument('--markets', type=int, default=500)
+    parser.add_argument('--days', type=int, default=120)
+    parser.add_argument('--horizon', type=int, default=7)
+    parser.add_argument('--origins', type=int, default=8)
+    args = parser.parse_args(argv)
+
+    store = PriceStore(generate_market_data(markets=market_names(args.markets), days=args.days))
+    print(backtest_forecasts(store, horizon=args.horizon, origins=args.origins).to_string(index=False))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,261 @@
+import argparse
+import hashlib
+import json
+import os
+import re
+import time
+from pathlib import Path
+
+import pandas as pd
+
+from modules.csv_ingest import read_csv_chunks
+from modules.price_alerts import DEFAULT_ALERT_DIR, deliver, latest_price_changes, load_alert_index
+from modules.price_store import PriceStore, compact_market_frame
+from modules.temporal import as_dates
+
+try:
+    import pyarrow.feather as feather
+except ImportError:  # without pyarrow partitions are stored as CSV parts
+    feather = None
+
+# Append-only, partitioned market price store:
+#
+#   data/market_store/
+#       _manifest.json                      partition -> crop, month, rows, parts
+#       crop=Rice-<hash>/month=2025-09/part-<ns>.feather
+#
+# Each ingest only reads the (date, market) keys of the partitions its rows
+# touch and appends one new part per partition, so a daily update costs
+# O(new rows + touched partitions), never O(history). Stored price-alert
+# rules (modules/price_alerts.py) are then evaluated against the new prices
+# and fired notifications are queued for delivery.
+# Usage: python -m modules.price_ingest data/incoming/2025-09-21.csv
+
+DEFAULT_STORE = Path(__file__).parent.parent / "data" / "market_store"
+MANIFEST_NAME = '_manifest.json'
+KEY_COLUMNS = ['date', 'crop', 'market']
+PART_SUFFIX = '.feather' if feather is not None else '.csv'
+
+
+def _slug(value):
+    return re.sub(r'[^A-Za-z0-9_-]+', '_', str(value)).strip('_') or 'unknown'
+
+
+def partition_id(crop, month):
+    """Partition path of a crop and month; the hash keeps crops with the same slug apart."""
+    tag = hashlib.blake2b(str(crop).encode('utf-8'), digest_size=4).hexdigest()
+    return f"crop={_slug(crop)}-{tag}/month={month}"
+
+
+def partition_dir(store_root, crop, month):
+    return Path(store_root) / partition_id(crop, month)
+
+
+def read_manifest(store_root=DEFAULT_STORE):
+    """Partition manifest of a store ({} if the store does not exist yet)."""
+    path = Path(store_root) / MANIFEST_NAME
+    try:
+        return json.loads(path.read_text(encoding='utf-8'))
+    except (OSError, ValueError):
+        return {}
+
+
+def _write_manifest(store_root, manifest):
+    path = Path(store_root) / MANIFEST_NAME
+    tmp = path.with_name(path.name + f'.{os.getpid()}.tmp')
+    tmp.write_text(json.dumps(manifest, indent=1, sort_keys=True), encoding='utf-8')
+    os.replace(tmp, path)
+
+
+def _read_part(path, columns=None):
+    if path.suffix == '.feather':
+        return feather.read_table(path, columns=columns, memory_map=True).to_pandas()
+    return pd.read_csv(path, usecols=columns, parse_dates=['date'] if columns is None or 'date' in columns else None)
+
+
+def _write_part(df, directory):
+    directory.mkdir(parents=True, exist_ok=True)
+    target = directory / f"part-{time.time_ns()}-{os.getpid()}{PART_SUFFIX}"
+    tmp = target.with_name(target.name + '.tmp')
+    out = df.reset_index(drop=True)
+    for col in ('crop', 'market'):
+        out[col] = out[col].astype(str)
+    if feather is not None:
+        feather.write_feather(out, tmp, compression='uncompressed')
+    else:
+        out.to_csv(tmp, index=False, date_format='%Y-%m-%d')
+    os.replace(tmp, target)
+    return target
+
+
+def _partition_keys(store_root, manifest_entry):
+    """(date, crop, market) keys already stored in one partition."""
+    directory = Path(store_root) / manifest_entry['path']
+    parts = [_read_part(directory / name, KEY_COLUMNS) for name in manifest_entry['parts']]
+    if not parts:
+        return pd.MultiIndex.from_arrays([[], [], []], names=KEY_COLUMNS)
+    keys = pd.concat(parts, ignore_index=True)
+    return _row_keys(keys)
+
+
+def _row_keys(rows):
+    return pd.MultiIndex.from_arrays(
+        [pd.to_datetime(rows['date']), rows['crop'].astype(str), rows['market'].astype(str)], names=KEY_COLUMNS)
+
+
+def ingest_price_file(path, store_root=DEFAULT_STORE, chunk_rows=200_000, alert_dir=DEFAULT_ALERT_DIR):
+    """Stream a daily price file into the partitioned store.
+
+    The file is read in chunks; each chunk is typed with compact_market_frame,
+    de-duplicated on (date, crop, market) against itself, earlier chunks and
+    the partitions it touches (the first row seen wins, so existing rows are
+    never replaced), and appended as one new
+    part per (crop, month). The stored alert rules of alert_dir are then
+    evaluated against the written prices (pass None to skip). Returns a
+    summary dict with rows read/written, duplicates skipped, touched
+    partitions, alerts queued and elapsed seconds.
+    """
+    start = time.perf_counter()
+    store_root = Path(store_root)
+    manifest = read_manifest(store_root)
+    known_keys = {}  # partition id -> MultiIndex of (date, crop, market), loaded lazily once per run
+    written = []
+    summary = {'rows_read': 0, 'rows_written': 0, 'duplicates': 0, 'partitions': set(), 'alerts': 0}
+
+    for chunk in read_csv_chunks(path, chunk_rows):
+        summary['rows_read'] += len(chunk)
+        rows = compact_market_frame(chunk).drop_duplicates(subset=KEY_COLUMNS, keep='first')
+        if rows.empty:
+            continue
+        months = rows['date'].dt.strftime('%Y-%m')
+
+        for (crop, month), group in rows.groupby([rows['crop'].astype(str), months], sort=False):
+            pid = partition_id(crop, month)
+            entry = manifest.setdefault(pid, {'crop': crop, 'month': month, 'path': pid, 'parts': [], 'rows': 0})
+            if pid not in known_keys:
+                known_keys[pid] = _partition_keys(store_root, entry)
+
+            keys = _row_keys(group)
+            fresh = ~keys.isin(known_keys[pid])
+            summary['duplicates'] += int((~fresh).sum())
+            if not fresh.any():
+                continue
+
+            new_rows = group[fresh]
+            part = _write_part(new_rows, partition_dir(store_root, crop, month))
+            entry['parts'].append(part.name)
+            entry['rows'] += len(new_rows)
+            known_keys[pid] = known_keys[pid].append(keys[fresh])
+            written.append(new_rows[KEY_COLUMNS])
+            summary['rows_written'] += len(new_rows)
+            summary['partitions'].add(pid)
+
+    if summary['rows_written']:
+        store_root.mkdir(parents=True, exist_ok=True)
+        _write_manifest(store_root, manifest)
+        if alert_dir is not None:
+            summary['alerts'] = evaluate_alerts(store_root, pd.concat(written, ignore_index=True), alert_dir)
+    summary['partitions'] = sorted(summary['partitions'])
+    summary['seconds'] = time.perf_counter() - start
+    return summary
+
+
+def alert_batch(store_root, written):
+    """Newest written price per series with the observation before it as previous_price.
+
+    written holds the (date, crop, market) keys of an ingest. Only series for
+    which a written row is now the newest stored observation are included, so
+    back-filled history does not fire alerts. The previous observation is
+    looked up from one month before the earliest written date onwards.
+    """
+    frames = []
+    for crop, rows in written.groupby(written['crop'].astype(str), sort=False):
+        since = rows['date'].min() - pd.DateOffset(months=1)
+        frames.append(load_partitions(store_root, crop=crop, start=since,
+                                      columns=['date', 'crop', 'market', 'modal_price']))
+    batch = latest_price_changes(PriceStore(pd.concat(frames, ignore_index=True)))
+    keys = pd.MultiIndex.from_arrays([written['crop'].astype(str), written['market'].astype(str), written['date']])
+    newest = pd.MultiIndex.from_arrays([batch['crop'].astype(str), batch['market'].astype(str), batch['date']])
+    return batch[newest.isin(keys)].reset_index(drop=True)
+
+
+def evaluate_alerts(store_root, written, alert_dir=DEFAULT_ALERT_DIR, delivery_queue=None):
+    """Evaluate the stored alert rules against an ingest's new prices; returns notifications queued."""
+    index = load_alert_index(alert_dir)
+    if not len(index):
+        return 0
+    return deliver(index.evaluate(alert_batch(store_root, written)), delivery_queue)
+
+
+def list_partitions(store_root=DEFAULT_STORE, crop=None, start=None, end=None):
+    """Manifest entries for a crop (all crops if None) overlapping [start, end] months."""
+    start_month = pd.Timestamp(start).strftime('%Y-%m') if start is not None else None
+    end_month = pd.Timestamp(end).strftime('%Y-%m') if end is not None else None
+    selected = []
+    for entry in read_manifest(store_root).values():
+        if crop is not None and entry['crop'] != crop:
+            continue
+        if start_month and entry['month'] < start_month:
+            continue
+        if end_month and entry['month'] > end_month:
+            continue
+        selected.append(entry)
+    return sorted(selected, key=lambda e: (e['crop'], e['month']))
+
+
+def partition_parts(store_root=DEFAULT_STORE, crop=None, start=None, end=None):
+    """Set of '<partition>/<part file>' names a crop and date range currently cover."""
+    return {f"{entry['path']}/{name}" for entry in list_partitions(store_root, crop, start, end) for name in entry['parts']}
+
+
+def load_partitions(store_root=DEFAULT_STORE, crop=None, start=None, end=None, columns=None, exclude=()):
+    """Load only the partitions a crop and date range need as one DataFrame.
+
+    Parts named in exclude (as returned by partition_parts) are skipped, so a
+    caller holding an earlier load can read just the parts appended since.
+    """
+    read_columns = columns
+    if columns is not None and 'date' not in columns and (start is not None or end is not None):
+        read_columns = list(columns) + ['date']
+    frames = []
+    for entry in list_partitions(store_root, crop, start, end):
+        directory = Path(store_root) / entry['path']
+        frames.extend(_read_part(directory / name, read_columns) for name in entry['parts']
+                      if f"{entry['path']}/{name}" not in exclude)
+    if not frames:
+        return pd.DataFrame(columns=columns or ['date', 'crop', 'market', 'modal_price'])
+    df = pd.concat(frames, ignore_index=True)
+    if start is not None or end is not None:
+        dates = as_dates(df['date'])
+        mask = pd.Series(True, index=df.index)
+        if start is not None:
+            mask &= dates >= pd.Timestamp(start)
+        if end is not None:
+            mask &= dates <= pd.Timestamp(end)
+        df = df[mask]
+    return df if columns is None else df[list(columns)]
+
+
+def stored_crops(store_root=DEFAULT_STORE):
+    """Crops present in the partitioned store."""
+    return sorted({entry['crop'] for entry in read_manifest(store_root).values()})
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Append daily mandi price files to the partitioned price store.")
+    parser.add_argument('files', nargs='+', help="CSV files to ingest, in date order")
+    parser.add_argument('--store', default=str(DEFAULT_STORE))
+    parser.add_argument('--chunk-rows', type=int, default=200_000)
+    parser.add_argument('--alerts', default=str(DEFAULT_ALERT_DIR), help="price alert rule directory")
+    parser.add_argument('--no-alerts', action='store_true', help="do not evaluate price alert rules")
+    args = parser.parse_args(argv)
+
+    for path in args.files:
+        summary = ingest_price_file(path, args.store, args.chunk_rows, None if args.no_alerts else args.alerts)
+        print(f"{path}: {summary['rows_written']:,}/{summary['rows_read']:,} rows written, "
+              f"{summary['duplicates']:,} duplicates skipped, {len(summary['partitions'])} partitions, "
+              f"{summary['alerts']:,} alerts queued in {summary['seconds']:.2f}s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,271 @@
+import numpy as np
+import pandas as pd
+
+from modules.temporal import as_dates, date_bounds
+
+# Compact in-memory layout for mandi price data.
+#
+#   column                      dtype            bytes/row
+#   date                        datetime64[ns]   8
+#   crop, market                category         2 + 2 (int16 codes up to 32,767 labels)
+#   min/max/modal_price         float32          12
+#   arrival_quantity            float32          4
+#   faq/good/average_percent    float32          12
+#                                                ---
+#                                                ~40 bytes/row  ->  ~40 MB per million rows
+#
+# The object-dtype frame produced by read_csv costs roughly 350-450 bytes/row
+# (Python str objects for crop, market and date), so five years of all-India
+# daily data (~3,000 markets x ~60 crops, tens of millions of rows) fits in a
+# single worker at ~1-2 GB instead of 10+ GB. Category label tables are shared,
+# so their cost is negligible.
+
+KEY_COLUMNS = ['crop', 'market']
+PRICE_COLUMNS = ['min_price', 'max_price', 'modal_price']
+FLOAT32_COLUMNS = PRICE_COLUMNS + ['arrival_quantity', 'faq_percent', 'good_percent', 'average_percent']
+
+
+def compact_market_frame(df):
+    """Return a typed copy of a raw market price frame.
+
+    Dates are parsed once to datetime64, crop/market become categoricals and
+    numeric columns float32. Rows without a parseable date, crop or market are
+    dropped and the result is sorted by (crop, market, date) so each series is
+    a contiguous, date-ordered block.
+    """
+    out = df.copy()
+    out['date'] = as_dates(out['date'])
+    out = out.dropna(subset=['date'] + KEY_COLUMNS)
+    for col in KEY_COLUMNS:
+        if isinstance(out[col].dtype, pd.CategoricalDtype):
+            out[col] = out[col].cat.remove_unused_categories()
+        else:
+            out[col] = out[col].astype(str).astype('category')
+    for col in FLOAT32_COLUMNS:
+        if col in out.columns:
+            out[col] = pd.to_numeric(out[col], errors='coerce').astype(np.float32)
+    out = out.sort_values(KEY_COLUMNS + ['date'], kind='stable')
+    return out.reset_index(drop=True)
+
+
+def build_latest_snapshot(frame):
+    """Latest observation per (crop, market) of a compact, sorted frame.
+
+    Returns a frame indexed by plain-string (crop, market) with the remaining
+    columns of each series' most recent row.
+    """
+    last_rows = frame.groupby(KEY_COLUMNS, observed=True, sort=False).tail(1)
+    return _key_indexed(last_rows)
+
+
+def update_latest_snapshot(latest, new_rows):
+    """Fold a batch of compact rows into a latest snapshot; O(len(new_rows)).
+
+    Only keys present in new_rows are touched, and a key is replaced only if
+    the incoming observation is at least as recent as the stored one. Returns
+    a new snapshot frame; the input snapshot is left unchanged so readers
+    holding it never see a half-applied update.
+    """
+    if new_rows.empty:
+        return latest
+    incoming = _key_indexed(new_rows.sort_values('date', kind='stable').groupby(KEY_COLUMNS, observed=True).tail(1))
+    current = latest.reindex(incoming.index)
+    newer = current['date'].isna().to_numpy() | (incoming['date'].to_numpy() >= current['date'].to_numpy())
+    incoming = incoming[newer]
+    if incoming.empty:
+        return latest
+    kept = latest.drop(index=incoming.index, errors='ignore')
+    return pd.concat([kept, incoming]).sort_index()
+
+
+def _key_indexed(rows):
+    keys = pd.MultiIndex.from_arrays(
+        [rows['crop'].astype(str).to_numpy(), rows['market'].astype(str).to_numpy()], names=KEY_COLUMNS
+    )
+    return rows.drop(columns=KEY_COLUMNS).set_index(keys)
+
+
+class PriceStore:
+    """Typed market price table shared read-only by every session.
+
+    Because the frame is sorted by (crop, market, date), every series is a
+    contiguous row range. The index built at load maps (crop, market) to that
+    range, so series lookups are a dict hit plus an iloc slice instead of a
+    boolean scan over the whole frame.
+    """
+
+    def __init__(self, df):
+        self.frame = compact_market_frame(df)
+        self._build_index()
+        self.latest = build_latest_snapshot(self.frame)
+
+    def _build_index(self):
+        n = len(self.frame)
+        crop_codes = self.frame['crop'].cat.codes.to_numpy().astype(np.int64)
+        market_codes = self.frame['market'].cat.codes.to_numpy().astype(np.int64)
+        series_key = crop_codes * (len(self.frame['market'].cat.categories) + 1) + market_codes
+        breaks = np.flatnonzero(np.diff(series_key)) + 1
+        # Row range [starts[i], stops[i]) of series i, plus its crop/market codes
+        self.starts = np.concatenate(([0], breaks)) if n else np.empty(0, dtype=np.int64)
+        self.stops = np.concatenate((breaks, [n])) if n else np.empty(0, dtype=np.int64)
+        self.series_crop_codes = crop_codes[self.starts]
+        self.series_market_codes = market_codes[self.starts]
+        # Gather labels per series with numpy first; indexing the category Index
+        # element by element costs microseconds per series
+        crop_labels = self.frame['crop'].cat.categories.to_numpy()[self.series_crop_codes]
+        market_labels = self.frame['market'].cat.categories.to_numpy()[self.series_market_codes]
+        self.index = dict(zip(
+            zip(crop_labels.tolist(), market_labels.tolist()),
+            zip(self.starts.tolist(), self.stops.tolist()),
+        ))
+
+    def __len__(self):
+        return len(self.frame)
+
+    def series(self, crop, market, days=None, start=None, end=None):
+        """Date-sorted rows for one (crop, market); the last `days` rows if given.
+
+        start/end (inclusive) restrict the dates with a searchsorted over the
+        series' block. Returns an empty frame for unknown pairs. The result is
+        a slice of the shared frame, so copy before mutating.
+        """
+        bounds = self.index.get((crop, market))
+        if bounds is None:
+            return self.frame.iloc[0:0]
+        first, stop = bounds
+        if start is not None or end is not None:
+            lo, hi = date_bounds(self.frame['date'].to_numpy()[first:stop], start, end)
+            first, stop = first + lo, first + hi
+        if days is not None:
+            first = max(first, stop - days)
+        return self.frame.iloc[first:stop]
+
+    def labels(self, column, rows):
+        """Crop or market labels of the given row numbers.
+
+        Goes through the category codes, so only the selected rows are turned
+        into strings rather than the whole column.
+        """
+        col = self.frame[column]
+        return col.cat.categories.to_numpy()[col.cat.codes.to_numpy()[rows]]
+
+    def latest_rows(self, crop, markets=None):
+        """Current (most recent) row per market for a crop, from the snapshot.
+
+        Rows follow the order of `markets` (all markets of the crop if None);
+        markets without data are skipped. Includes a 'market' column.
+        """
+        try:
+            crop_rows = self.latest.xs(crop, level='crop')
+        except KeyError:
+            return self.latest.iloc[0:0].droplevel('crop').rename_axis('market').reset_index()
+        if markets is not None:
+            crop_rows = crop_rows.reindex([m for m in markets if m in crop_rows.index])
+        return crop_rows.rename_axis('market').reset_index()
+
+    def appended(self, new_rows):
+        """Return a new PriceStore with new raw or compact price rows added.
+
+        The store is shared read-only, so it is never modified in place;
+        callers swap the returned store in. Unseen crops/markets are appended
+        to the category tables, so existing codes stay valid; only the new
+        rows are recoded and sorted, and their positions in the existing
+        series blocks are found by binary search. History is copied once
+        into the merged frame but never re-sorted or turned into strings.
+        The latest snapshot is updated from the new rows alone. Rows
+        repeating an existing (crop, market, date) replace it.
+        """
+        new = compact_market_frame(new_rows).drop_duplicates(subset=KEY_COLUMNS + ['date'], keep='last')
+        if new.empty:
+            return self
+        old = self.frame.copy(deep=False)
+        for col in KEY_COLUMNS:
+            categories = old[col].cat.categories
+            extra = new[col].cat.categories.difference(categories, sort=False)
+            if len(extra):
+                old[col] = old[col].cat.add_categories(extra)
+            new[col] = new[col].cat.set_categories(old[col].cat.categories)
+        if len(old):
+            new['date'] = new['date'].astype(old['date'].dtype)
+
+        crop_codes = new['crop'].cat.codes.to_numpy().astype(np.int64)
+        market_codes = new['market'].cat.codes.to_numpy().astype(np.int64)
+        new_dates = new['date'].to_numpy()
+        order = np.lexsort((new_dates, market_codes, crop_codes))
+        new = new.iloc[order].reset_index(drop=True)
+        width = len(old['market'].cat.categories) + 1
+        new_key = crop_codes[order] * width + market_codes[order]
+        new_dates = new_dates[order]
+
+        # Insertion point of each new row: its series block, then its date within the block
+        n, S = len(old), len(self.starts)
+        series_key = self.series_crop_codes.astype(np.int64) * width + self.series_market_codes
+        s = np.searchsorted(series_key, new_key)
+        exists = s < S
+        exists[exists] = series_key[s[exists]] == new_key[exists]
+        lo = np.where(s < S, self.starts[np.minimum(s, S - 1)] if S else 0, n).astype(np.int64)
+        hi = np.where(exists, self.stops[np.minimum(s, S - 1)] if S else 0, lo).astype(np.int64)
+        old_dates = old['date'].to_numpy()
+        pos = _block_searchsorted(old_dates, lo, hi, new_dates)
+        replaced = exists & (pos < hi)
+        replaced[replaced] = old_dates[pos[replaced]] == new_dates[replaced]
+
+        # Merged row order as positions into concat([old, new])
+        dropped = pos[replaced]
+        slots = pos - np.searchsorted(dropped, pos) + np.arange(len(new))
+        take = np.empty(n - len(dropped) + len(new), dtype=np.int64)
+        is_new = np.zeros(len(take), dtype=bool)
+        is_new[slots] = True
+        take[is_new] = n + np.arange(len(new))
+        keep_old = np.ones(n, dtype=bool)
+        keep_old[dropped] = False
+        take[~is_new] = np.flatnonzero(keep_old)
+
+        merged = pd.concat([old, new], ignore_index=True).take(take).reset_index(drop=True)
+        restore = {c: old[c].dtype for c in FLOAT32_COLUMNS if c in old.columns and merged[c].dtype != old[c].dtype}
+        store = PriceStore.__new__(PriceStore)
+        store.frame = merged.astype(restore) if restore else merged
+        store._build_index()
+        store.latest = update_latest_snapshot(self.latest, new)
+        return store
+
+    @property
+    def crops(self):
+        """Sorted crop names that have at least one observation."""
+        return sorted({crop for crop, _ in self.index})
+
+    def markets(self, crop):
+        """Sorted market names that report the given crop."""
+        return sorted(market for c, market in self.index if c == crop)
+
+    def series_count(self):
+        """Number of distinct (crop, market) series."""
+        return len(self.index)
+
+    def memory_usage(self):
+        """Actual resident bytes of the typed frame (deep, including category labels)."""
+        return int(self.frame.memory_usage(deep=True).sum())
+
+
+def as_price_store(data):
+    """Accept either a PriceStore or a raw/compact market DataFrame."""
+    if isinstance(data, PriceStore):
+        return data
+    return PriceStore(data)
+
+
+def _block_searchsorted(values, lo, hi, targets):
+    """Left insertion point of each target within its own sorted block values[lo:hi].
+
+    A vectorized binary search over all blocks at once: O(len(targets) x log(block)).
+    """
+    lo, hi = lo.copy(), hi.copy()
+    last = max(len(values) - 1, 0)
+    while True:
+        active = lo < hi
+        if not active.any():
+            return lo
+        mid = (lo + hi) // 2
+        below = active & (values[np.minimum(mid, last)] < targets)
+        lo = np.where(below, mid + 1, lo)
+        hi = np.where(active & ~below, mid, hi)
@@ -0,0 +1,161 @@
+import time
+import weakref
+
+import numpy as np
+import pandas as pd
+
+from modules.price_analytics import select_series, window_rows
+from modules.price_store import as_price_store
+
+# Cross-market price transmission: lagged correlation and lead/lag.
+#
+# Markets of a crop are aligned on a common daily grid (short gaps carried
+# forward) and turned into standardized daily log returns, with missing days
+# contributing zero. For every market pair, corr[i, j, k] = corr(r_i(t),
+# r_j(t + k)) over lags -max_lag..max_lag. Long lag windows use one FFT per
+# market, cross-correlating a block of i against every j at once as
+# irfft(conj(F_i) * F_j). For the usual short windows (up to FFT_MIN_LAG) one
+# matrix product per lag is cheaper, since only 2 * max_lag + 1 of the
+# T lags are needed. Overlap counts are cross-correlated the same way, so
+# gaps are normalized correctly. A peak at k > 0 means market i leads market j
+# by k days. Results are cached per (store, crop, window, max_lag).
+
+DEFAULT_MAX_LAG = 7
+DEFAULT_DAYS = 365
+MIN_OVERLAP = 20
+FILL_LIMIT = 3      # days a missing price is carried forward (weekly closures, holidays)
+FFT_MIN_LAG = 32    # from this many lags on, FFT beats one matrix product per lag
+BLOCK_ELEMENTS = 8_000_000  # complex cells per FFT block
+
+_cache = weakref.WeakKeyDictionary()
+
+
+def aligned_returns(store, crop, days=DEFAULT_DAYS):
+    """(markets, returns (M, T-1), valid (M, T-1)) of daily log returns on a shared date grid."""
+    store = as_price_store(store)
+    series_pos = select_series(store, crop)
+    rows, group, lengths = window_rows(store, series_pos, days)
+    markets = list(store.labels('market', store.starts[series_pos]))
+    if not len(rows):
+        return markets, np.zeros((len(markets), 0)), np.zeros((len(markets), 0), dtype=bool)
+
+    dates = store.frame['date'].to_numpy()[rows].astype('datetime64[D]')
+    first = dates.max() - np.timedelta64(days - 1, 'D') if days else dates.min()
+    keep = dates >= first
+    col = (dates[keep] - first).astype(np.int64)
+    T = int(col.max()) + 1
+    log_price = np.full((len(series_pos), T), np.nan)
+    log_price[group[keep], col] = np.log(store.frame['modal_price'].to_numpy(dtype=np.float64)[rows[keep]])
+    log_price = pd.DataFrame(log_price).ffill(axis=1, limit=FILL_LIMIT).to_numpy()
+
+    returns = np.diff(log_price, axis=1)
+    valid = ~np.isnan(returns)
+    n = np.maximum(valid.sum(axis=1, keepdims=True), 1)
+    mean = np.where(valid, returns, 0.0).sum(axis=1, keepdims=True) / n
+    centered = np.where(valid, returns - mean, 0.0)
+    std = np.sqrt((centered ** 2).sum(axis=1, keepdims=True) / n)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        standardized = np.where(std > 0, centered / std, 0.0)
+    return markets, standardized, valid
+
+
+def lagged_correlation(returns, valid, max_lag=DEFAULT_MAX_LAG):
+    """corr (M, M, 2 * max_lag + 1) of r_i(t) with r_j(t + lag), lag = -max_lag..max_lag."""
+    M, T = returns.shape
+    if M == 0 or T == 0:
+        return np.full((M, M, 2 * max_lag + 1), np.nan)
+    if max_lag < FFT_MIN_LAG:
+        cross, overlap = _lag_products(returns, valid, max_lag)
+    else:
+        cross, overlap = _fft_products(returns, valid, max_lag)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(overlap >= MIN_OVERLAP, np.clip(cross / overlap, -1.0, 1.0), np.nan)
+
+
+def _lag_products(returns, valid, max_lag):
+    """Lagged cross products and overlap counts with one matrix product per lag."""
+    M, T = returns.shape
+    mask = valid.astype(np.float64)
+    cross = np.zeros((M, M, 2 * max_lag + 1))
+    overlap = np.zeros((M, M, 2 * max_lag + 1))
+    for k in range(min(max_lag, T - 1) + 1):
+        c = returns[:, :T - k] @ returns[:, k:].T
+        n = mask[:, :T - k] @ mask[:, k:].T
+        cross[:, :, max_lag + k], overlap[:, :, max_lag + k] = c, n
+        cross[:, :, max_lag - k], overlap[:, :, max_lag - k] = c.T, n.T
+    return cross, overlap
+
+
+def _fft_products(returns, valid, max_lag):
+    """Lagged cross products and overlap counts via blocked FFT cross-correlation."""
+    M, T = returns.shape
+    nfft = 1 << int(np.ceil(np.log2(2 * T)))
+    F = np.fft.rfft(returns, n=nfft, axis=1)
+    V = np.fft.rfft(valid.astype(np.float64), n=nfft, axis=1)
+    # irfft output index k holds sum_t x_i(t) x_j(t + k); negative lags wrap to the end
+    take = np.r_[np.arange(nfft - max_lag, nfft), np.arange(0, max_lag + 1)]
+
+    cross = np.zeros((M, M, 2 * max_lag + 1))
+    overlap = np.zeros((M, M, 2 * max_lag + 1))
+    block = max(1, BLOCK_ELEMENTS // max(M * F.shape[1], 1))
+    for lo in range(0, M, block):
+        hi = min(M, lo + block)
+        cross[lo:hi] = np.fft.irfft(np.conj(F[lo:hi, None, :]) * F[None, :, :], n=nfft, axis=2)[:, :, take]
+        overlap[lo:hi] = np.rint(np.fft.irfft(np.conj(V[lo:hi, None, :]) * V[None, :, :], n=nfft, axis=2)[:, :, take])
+    return cross, overlap
+
+
+def price_transmission(store, crop, days=DEFAULT_DAYS, max_lag=DEFAULT_MAX_LAG):
+    """Contemporaneous and peak lagged correlations between all markets of a crop (cached).
+
+    Returns a dict with markets, lags, corr (M, M, lags), same_day (M, M),
+    best_lag (M, M) and best_corr (M, M); best_lag[i, j] > 0 means market i
+    leads market j.
+    """
+    store = as_price_store(store)
+    key = (crop, days, max_lag)
+    per_store = _cache.setdefault(store, {})
+    if key in per_store:
+        return per_store[key]
+
+    start = time.perf_counter()
+    markets, returns, valid = aligned_returns(store, crop, days)
+    corr = lagged_correlation(returns, valid, max_lag)
+    lags = np.arange(-max_lag, max_lag + 1)
+    finite = np.where(np.isnan(corr), -np.inf, corr)
+    peak = np.argmax(finite, axis=2)
+    best_corr = np.take_along_axis(corr, peak[..., None], axis=2)[..., 0]
+    result = {
+        'markets': markets,
+        'lags': lags,
+        'corr': corr,
+        'same_day': corr[:, :, max_lag],
+        'best_lag': np.where(np.isnan(best_corr), 0, lags[peak]),
+        'best_corr': best_corr,
+        'seconds': time.perf_counter() - start,
+    }
+    per_store[key] = result
+    return result
+
+
+def lead_lag_pairs(result, markets=None, min_corr=0.0):
+    """Tidy leader/follower table: one row per market pair with its peak lag and correlation."""
+    names = np.asarray(result['markets'], dtype=object)
+    i, j = np.triu_indices(len(names), k=1)
+    if markets is not None:
+        wanted = np.isin(names, list(markets))
+        pair = wanted[i] & wanted[j]
+        i, j = i[pair], j[pair]
+    lag = result['best_lag'][i, j]
+    corr = result['best_corr'][i, j]
+    leader = np.where(lag >= 0, names[i], names[j])
+    follower = np.where(lag >= 0, names[j], names[i])
+    table = pd.DataFrame({
+        'leader': leader,
+        'follower': follower,
+        'lag_days': np.abs(lag),
+        'peak_corr': corr,
+        'same_day_corr': result['same_day'][i, j],
+    })
+    table = table[table['peak_corr'] >= min_corr]
+    return table.sort_values('peak_corr', ascending=False).reset_index(drop=True)
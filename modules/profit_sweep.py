@@ -0,0 +1,87 @@
+import time
+
+import numpy as np
+import pandas as pd
+
+# Scenario sweep for the profit calculator.
+#
+# Profit per acre over a price x yield x cultivation cost x transport
+# distance grid, as one broadcast float32 expression (about 4 MB for a
+# million cells):
+#
+#   profit = yield * (price * (1 - fee) - harvesting - transport_rate * km) - cost_per_acre
+#
+# Break-even price and yield have closed forms, so the break-even surfaces
+# are computed directly on 2-D grids rather than searched for in the cube.
+
+DEFAULT_STEPS = {'price': 40, 'yield': 25, 'cost': 25, 'distance': 40}  # 10^6 cells
+PERCENTILES = [10, 25, 50, 75, 90]
+
+
+def scenario_axis(low, high, steps):
+    """Evenly spaced scenario values from low to high (float32)."""
+    return np.linspace(low, high, int(steps), dtype=np.float32)
+
+
+def profit_grid(prices, yields, costs, distances, harvesting_cost=0.0, transport_rate=0.0, market_fee_pct=0.0):
+    """Profit per acre (₹) for every price x yield x cost x distance, shape (P, Y, C, D).
+
+    prices in ₹/qt, yields in qt/acre, costs in ₹/acre (cultivation),
+    distances in km; harvesting_cost is ₹/qt and transport_rate ₹/km/qt.
+    """
+    p = np.asarray(prices, dtype=np.float32)[:, None, None, None]
+    y = np.asarray(yields, dtype=np.float32)[None, :, None, None]
+    c = np.asarray(costs, dtype=np.float32)[None, None, :, None]
+    d = np.asarray(distances, dtype=np.float32)[None, None, None, :]
+    margin = p * np.float32(1 - market_fee_pct / 100) - np.float32(harvesting_cost) - np.float32(transport_rate) * d
+    return y * margin - c
+
+
+def breakeven_price(yields, costs, distance, harvesting_cost=0.0, transport_rate=0.0, market_fee_pct=0.0):
+    """Selling price (₹/qt) at which profit is zero, over a yield x cost grid (Y, C)."""
+    y = np.asarray(yields, dtype=np.float64)[:, None]
+    c = np.asarray(costs, dtype=np.float64)[None, :]
+    return (c / y + harvesting_cost + transport_rate * distance) / (1 - market_fee_pct / 100)
+
+
+def breakeven_yield(prices, costs, distance, harvesting_cost=0.0, transport_rate=0.0, market_fee_pct=0.0):
+    """Yield (qt/acre) needed to break even over a price x cost grid (P, C); inf where every quintal loses money."""
+    p = np.asarray(prices, dtype=np.float64)[:, None]
+    c = np.asarray(costs, dtype=np.float64)[None, :]
+    margin = p * (1 - market_fee_pct / 100) - harvesting_cost - transport_rate * distance
+    with np.errstate(divide='ignore'):
+        return np.where(margin > 0, c / margin, np.inf)
+
+
+def percentile_table(grid, prices, percentiles=PERCENTILES):
+    """Profit percentiles and loss probability per price level, over all other scenario axes."""
+    flat = grid.reshape(len(prices), -1)
+    table = pd.DataFrame(np.percentile(flat, percentiles, axis=1).T,
+                         columns=[f'P{q}' for q in percentiles])
+    table.insert(0, 'price', np.asarray(prices))
+    table['loss_probability'] = (flat < 0).mean(axis=1)
+    return table
+
+
+def run_sweep(prices, yields, costs, distances, harvesting_cost=0.0, transport_rate=0.0, market_fee_pct=0.0,
+              area=1.0):
+    """Full sweep: profit grid, overall percentiles, per-price table and break-even surfaces.
+
+    Profits are scaled by area (acres). Break-even surfaces use the median
+    distance. Returns a dict; 'seconds' is the compute time.
+    """
+    start = time.perf_counter()
+    grid = profit_grid(prices, yields, costs, distances, harvesting_cost, transport_rate, market_fee_pct) * np.float32(area)
+    distance = float(np.median(distances))
+    result = {
+        'grid': grid,
+        'cells': grid.size,
+        'profitable_share': float((grid > 0).mean()),
+        'percentiles': dict(zip(PERCENTILES, np.percentile(grid, PERCENTILES))),
+        'by_price': percentile_table(grid, prices),
+        'breakeven_price': breakeven_price(yields, costs, distance, harvesting_cost, transport_rate, market_fee_pct),
+        'breakeven_yield': breakeven_yield(prices, costs, distance, harvesting_cost, transport_rate, market_fee_pct),
+        'distance': distance,
+    }
+    result['seconds'] = time.perf_counter() - start
+    return result
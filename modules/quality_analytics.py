@@ -0,0 +1,132 @@
+import weakref
+
+import numpy as np
+import pandas as pd
+
+from modules.price_analytics import select_series, window_rows
+from modules.price_store import as_price_store
+
+# Quality-grade analytics over a window of history.
+#
+# Grade shares (FAQ / good / average) of every selected series are averaged
+# over the window with arrivals as weights, so a big-arrival day counts for
+# more than a thin one. The quality score keeps the calculator's weighting
+# (FAQ 0.6, good 0.3, average 0.1). The quality-adjusted price rescales each
+# market's average price to the crop's average quality over the same window,
+# so markets can be compared net of what they are being offered. The grade
+# trend is the least-squares slope of the FAQ share, per 30 days. All of it is
+# a handful of bincounts over the window rows of every market of a crop, and
+# is cached per (store, crop, window); a market's figures are rows of that
+# table.
+
+GRADES = {'faq_percent': 'FAQ', 'good_percent': 'Good', 'average_percent': 'Average'}
+GRADE_WEIGHTS = {'faq_percent': 0.6, 'good_percent': 0.3, 'average_percent': 0.1}
+SUMMARY_COLUMNS = ['market', 'faq_percent', 'good_percent', 'average_percent', 'quality_score',
+                   'avg_price', 'quality_adjusted_price', 'faq_trend', 'observations']
+TREND_BIN_DAYS = 7
+
+_summary_cache = weakref.WeakKeyDictionary()
+
+
+def _weights(store, rows):
+    """Arrival weights of rows (1 where arrivals are missing or not recorded)."""
+    if 'arrival_quantity' not in store.frame.columns:
+        return np.ones(len(rows))
+    arrivals = store.frame['arrival_quantity'].to_numpy(dtype=np.float64)[rows]
+    return np.where(np.isnan(arrivals) | (arrivals <= 0), 1.0, arrivals)
+
+
+def quality_score(faq, good, average):
+    """Weighted grade score of grade shares in percent (FAQ 0.6, good 0.3, average 0.1)."""
+    return (faq * GRADE_WEIGHTS['faq_percent'] + good * GRADE_WEIGHTS['good_percent']
+            + average * GRADE_WEIGHTS['average_percent'])
+
+
+def build_quality_summary(store, crop, days=30):
+    """Arrival-weighted grade mix, quality score, quality-adjusted price and FAQ trend per market."""
+    store = as_price_store(store)
+    series_pos = select_series(store, crop)
+    rows, group, lengths = window_rows(store, series_pos, days)
+    if not len(rows) or any(field not in store.frame.columns for field in GRADES):
+        return pd.DataFrame(columns=SUMMARY_COLUMNS)
+
+    S = len(series_pos)
+    weight = _weights(store, rows)
+    total = np.bincount(group, weights=weight, minlength=S)
+    out = {'market': store.labels('market', store.starts[series_pos])}
+    with np.errstate(divide='ignore', invalid='ignore'):
+        for field in GRADES:
+            share = store.frame[field].to_numpy(dtype=np.float64)[rows]
+            ok = ~np.isnan(share)
+            out[field] = (np.bincount(group[ok], weights=(share * weight)[ok], minlength=S)
+                          / np.bincount(group[ok], weights=weight[ok], minlength=S))
+        price = store.frame['modal_price'].to_numpy(dtype=np.float64)[rows]
+        out['avg_price'] = np.bincount(group, weights=price * weight, minlength=S) / total
+        out['quality_score'] = quality_score(out['faq_percent'], out['good_percent'], out['average_percent'])
+        crop_score = np.sum(out['quality_score'] * total) / total.sum()
+        out['quality_adjusted_price'] = out['avg_price'] * crop_score / out['quality_score']
+
+        # Least-squares slope of the FAQ share against days since the window start
+        dates = store.frame['date'].to_numpy()[rows].astype('datetime64[D]').astype(np.int64)
+        x = (dates - dates.min()).astype(np.float64)
+        faq = store.frame['faq_percent'].to_numpy(dtype=np.float64)[rows]
+        n = np.maximum(lengths, 1)
+        mean_x = np.bincount(group, weights=x, minlength=S) / n
+        mean_y = np.bincount(group, weights=faq, minlength=S) / n
+        dx = x - mean_x[group]
+        cov = np.bincount(group, weights=dx * (faq - mean_y[group]), minlength=S)
+        var = np.bincount(group, weights=dx * dx, minlength=S)
+        out['faq_trend'] = np.where(var > 0, cov / var * 30, np.nan)
+    out['observations'] = lengths
+    return pd.DataFrame(out, columns=SUMMARY_COLUMNS)
+
+
+def quality_summary(store, crop, markets=None, days=30):
+    """Cached quality summary of a crop's markets over the last `days` observations.
+
+    The table covers every market of the crop and is built once per
+    (store, crop, days); markets only selects (and orders) its rows.
+    """
+    store = as_price_store(store)
+    per_store = _summary_cache.setdefault(store, {})
+    key = (crop, days)
+    if key not in per_store:
+        per_store[key] = build_quality_summary(store, crop, days)
+    table = per_store[key]
+    if markets is None:
+        return table
+    available = set(table['market'])
+    return table.set_index('market').loc[[m for m in markets if m in available]].reset_index()
+
+
+def grade_mix_trend(store, crop, markets=None, days=90, bin_days=TREND_BIN_DAYS):
+    """Arrival-weighted grade shares per market per `bin_days` bin, in long form for charting.
+
+    Columns: market, period (bin start date), then one column per grade.
+    """
+    store = as_price_store(store)
+    series_pos = select_series(store, crop, markets)
+    rows, group, _ = window_rows(store, series_pos, days)
+    if not len(rows):
+        return pd.DataFrame(columns=['market', 'period', *GRADES])
+
+    dates = store.frame['date'].to_numpy()[rows].astype('datetime64[D]')
+    first = dates.min()
+    period = (dates - first).astype(np.int64) // bin_days
+    P = int(period.max()) + 1
+    key = group * P + period
+    size = len(series_pos) * P
+    weight = _weights(store, rows)
+    total = np.bincount(key, weights=weight, minlength=size)
+    present = total > 0
+    out = {
+        'market': np.repeat(store.labels('market', store.starts[series_pos]), P)[present],
+        'period': np.tile(first + np.arange(P) * np.timedelta64(bin_days, 'D'), len(series_pos))[present],
+    }
+    for field in GRADES:
+        share = store.frame[field].to_numpy(dtype=np.float64)[rows]
+        ok = ~np.isnan(share)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            out[field] = (np.bincount(key[ok], weights=(share * weight)[ok], minlength=size)
+                          / np.bincount(key[ok], weights=weight[ok], minlength=size))[present]
+    return pd.DataFrame(out)
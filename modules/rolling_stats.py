@@ -0,0 +1,219 @@
+import threading
+import weakref
+
+import numpy as np
+import pandas as pd
+
+from modules.price_analytics import window_rows
+from modules.price_store import as_price_store
+from modules.temporal import as_dates
+
+# Rolling 7/15/30-day statistics for every (crop, market) series.
+#
+# Each series keeps a ring buffer of its last max(WINDOWS) observations per
+# field plus running sum, sum of squares and valid count per window. A new
+# observation adds itself and subtracts the value leaving each window, so an
+# update is O(1) per observation; history is only scanned once, when the
+# stats are first built for a store. Batches are applied one "day" at a time,
+# vectorized across every series that has an observation that day.
+
+WINDOWS = (7, 15, 30)
+FIELDS = ('modal_price', 'arrival_quantity')
+
+_stats_cache = weakref.WeakKeyDictionary()
+_stats_lock = threading.Lock()
+
+
+class RollingStats:
+    """Incrementally maintained rolling mean, std, z-score and change per series."""
+
+    def __init__(self, store):
+        store = as_price_store(store)
+        self.capacity = max(WINDOWS)
+        crop_labels = store.frame['crop'].cat.categories
+        market_labels = store.frame['market'].cat.categories
+        self.keys = list(zip(crop_labels[store.series_crop_codes], market_labels[store.series_market_codes]))
+        self.slot = {key: i for i, key in enumerate(self.keys)}
+        self.crop_of = np.asarray(crop_labels[store.series_crop_codes], dtype=object)
+        self.market_of = np.asarray(market_labels[store.series_market_codes], dtype=object)
+
+        S, F, W = len(self.keys), len(FIELDS), len(WINDOWS)
+        self.count = (store.stops - store.starts).astype(np.int64)
+        self.last_date = store.frame['date'].to_numpy()[store.stops - 1] if S else np.empty(0, dtype='datetime64[ns]')
+        self.buffer = np.zeros((F, S, self.capacity))
+        self.valid = np.zeros((F, S, self.capacity), dtype=bool)
+        self.sums = np.zeros((F, W, S))
+        self.sumsq = np.zeros((F, W, S))
+        self.n = np.zeros((F, W, S))
+
+        rows, group, lengths = window_rows(store, np.arange(S), self.capacity)
+        age = np.repeat(np.cumsum(lengths), lengths) - np.arange(len(rows))  # 1 = latest observation
+        slot_pos = (self.count[group] - age) % self.capacity
+        for f, field in enumerate(FIELDS):
+            values = store.frame[field].to_numpy(dtype=np.float64)[rows] if field in store.frame else np.full(len(rows), np.nan)
+            ok = ~np.isnan(values)
+            clean = np.where(ok, values, 0.0)
+            self.buffer[f, group, slot_pos] = clean
+            self.valid[f, group, slot_pos] = ok
+            for w, window in enumerate(WINDOWS):
+                inside = age <= window
+                self.sums[f, w] = np.bincount(group[inside], weights=clean[inside], minlength=S)
+                self.sumsq[f, w] = np.bincount(group[inside], weights=(clean * clean)[inside], minlength=S)
+                self.n[f, w] = np.bincount(group[inside], weights=ok[inside], minlength=S)
+
+    def __len__(self):
+        return len(self.keys)
+
+    def _grow(self, new_keys):
+        extra = len(new_keys)
+        for key in new_keys:
+            self.slot[key] = len(self.keys)
+            self.keys.append(key)
+        self.crop_of = np.concatenate([self.crop_of, np.array([k[0] for k in new_keys], dtype=object)])
+        self.market_of = np.concatenate([self.market_of, np.array([k[1] for k in new_keys], dtype=object)])
+        F, W = len(FIELDS), len(WINDOWS)
+        self.count = np.concatenate([self.count, np.zeros(extra, dtype=np.int64)])
+        self.last_date = np.concatenate([self.last_date, np.full(extra, np.datetime64('NaT'), dtype=self.last_date.dtype)])
+        self.buffer = np.concatenate([self.buffer, np.zeros((F, extra, self.capacity))], axis=1)
+        self.valid = np.concatenate([self.valid, np.zeros((F, extra, self.capacity), dtype=bool)], axis=1)
+        for name in ('sums', 'sumsq', 'n'):
+            setattr(self, name, np.concatenate([getattr(self, name), np.zeros((F, W, extra))], axis=2))
+
+    def _push(self, slots, values):
+        """Append one observation (F, len(slots)) to each of the given series."""
+        pos = self.count[slots] % self.capacity
+        ok = ~np.isnan(values)
+        clean = np.where(ok, values, 0.0)
+        for w, window in enumerate(WINDOWS):
+            leaving = (self.count[slots] - window) % self.capacity
+            full = self.count[slots] >= window
+            old = np.where(full, self.buffer[:, slots, leaving], 0.0)
+            old_ok = full & self.valid[:, slots, leaving]
+            self.sums[:, w, slots] += clean - old
+            self.sumsq[:, w, slots] += clean * clean - old * old
+            self.n[:, w, slots] += ok.astype(np.float64) - old_ok
+        self.buffer[:, slots, pos] = clean
+        self.valid[:, slots, pos] = ok
+        self.count[slots] += 1
+
+    def copy(self):
+        """Independent copy, so an update can be prepared while readers use this one."""
+        other = RollingStats.__new__(RollingStats)
+        other.__dict__.update({name: value.copy() if hasattr(value, 'copy') else value
+                               for name, value in self.__dict__.items()})
+        return other
+
+    def appends_only(self, new_rows):
+        """True if every row of new_rows is newer than its series' last observation."""
+        if new_rows.empty:
+            return True
+        keys = zip(new_rows['crop'].astype(str), new_rows['market'].astype(str))
+        slots = np.array([self.slot.get(k, -1) for k in keys], dtype=np.int64)
+        known = slots >= 0
+        dates = as_dates(new_rows['date']).to_numpy().astype(self.last_date.dtype)[known]
+        last = self.last_date[slots[known]]
+        return bool(np.all(np.isnat(last) | (dates > last)))
+
+    def update(self, new_rows):
+        """Fold new daily rows (crop, market, date and FIELDS) into the statistics.
+
+        Rows not newer than a series' last observation are skipped (a restated
+        history needs a rebuild, see appends_only). Of several rows for one
+        series and day the last wins, as in PriceStore.appended. Returns the
+        number of observations applied.
+        """
+        if new_rows.empty:
+            return 0
+        rows = new_rows.sort_values('date', kind='stable')
+        keys = list(zip(rows['crop'].astype(str), rows['market'].astype(str)))
+        with _stats_lock:
+            unseen = list(dict.fromkeys(k for k in keys if k not in self.slot))
+            if unseen:
+                self._grow(unseen)
+            slots = np.array([self.slot[k] for k in keys], dtype=np.int64)
+            dates = as_dates(rows['date']).to_numpy().astype(self.last_date.dtype)
+            values = np.stack([rows[field].to_numpy(dtype=np.float64) if field in rows else np.full(len(rows), np.nan)
+                               for field in FIELDS])
+
+            applied = 0
+            for day in np.unique(dates):
+                today = np.flatnonzero(dates == day)[::-1]
+                today = today[np.unique(slots[today], return_index=True)[1]]  # last observation per series per day
+                last = self.last_date[slots[today]]
+                fresh = today[np.isnat(last) | (last < day)]
+                if len(fresh):
+                    self._push(slots[fresh], values[:, fresh])
+                    self.last_date[slots[fresh]] = day
+                    applied += len(fresh)
+        return applied
+
+    def frame(self, crop=None, markets=None, field='modal_price'):
+        """Per-series latest value and rolling mean/std/z/change% for every window.
+
+        Columns: crop, market, latest, then mean_<w>, std_<w>, z_<w> and
+        change_<w> (percent change from the first value in the window; NaN
+        when that value is 0).
+        """
+        f = FIELDS.index(field)
+        take = np.ones(len(self.keys), dtype=bool) if crop is None else self.crop_of == crop
+        if markets is not None:
+            market_pos = pd.Index(list(markets)).get_indexer(self.market_of)
+            take &= market_pos >= 0
+        idx = np.flatnonzero(take)
+        if markets is not None and crop is not None:
+            idx = idx[np.argsort(market_pos[idx], kind='stable')]
+
+        latest_pos = (self.count[idx] - 1) % self.capacity
+        latest = np.where(self.valid[f, idx, latest_pos], self.buffer[f, idx, latest_pos], np.nan)
+        out = {
+            'crop': self.crop_of[idx],
+            'market': self.market_of[idx],
+            'latest': latest,
+        }
+        with np.errstate(divide='ignore', invalid='ignore'):
+            for w, window in enumerate(WINDOWS):
+                n = self.n[f, w, idx]
+                mean = self.sums[f, w, idx] / n
+                var = np.maximum(self.sumsq[f, w, idx] - n * mean * mean, 0.0) / (n - 1)
+                std = np.where(n >= 2, np.sqrt(var), np.nan)
+                first_pos = (self.count[idx] - np.minimum(self.count[idx], window)) % self.capacity
+                first = np.where(self.valid[f, idx, first_pos], self.buffer[f, idx, first_pos], np.nan)
+                out[f'mean_{window}'] = np.where(n > 0, mean, np.nan)
+                out[f'std_{window}'] = std
+                out[f'z_{window}'] = (latest - mean) / std
+                out[f'change_{window}'] = np.where(first != 0, (latest - first) / first * 100, np.nan)
+        return pd.DataFrame(out)
+
+
+def rolling_stats_for(store):
+    """RollingStats of a store, built once per store and then updated incrementally."""
+    store = as_price_store(store)
+    with _stats_lock:
+        stats = _stats_cache.get(store)
+    if stats is None:
+        stats = RollingStats(store)
+        with _stats_lock:
+            stats = _stats_cache.setdefault(store, stats)
+    return stats
+
+
+def append_with_stats(store, new_rows):
+    """store.appended(new_rows), carrying its rolling stats over instead of rebuilding them.
+
+    The stats update is O(new rows) and is applied to a copy, so sessions
+    still reading the old store's stats are unaffected. Back-filled or
+    restated rows (not newer than their series' last observation) cannot be
+    folded in; the new store's stats are then rebuilt on first use. The store
+    itself is extended by PriceStore.appended.
+    """
+    new_store = store.appended(new_rows)
+    if new_store is store:
+        return store
+    with _stats_lock:
+        stats = _stats_cache.get(store)
+    if stats is not None and stats.appends_only(new_rows):
+        stats = stats.copy()
+        if stats.update(new_rows) == len(new_store) - len(store):
+            with _stats_lock:
+                _stats_cache[new_store] = stats
+    return new_store
@@ -0,0 +1,138 @@
+import calendar
+import weakref
+
+import numpy as np
+import pandas as pd
+
+from modules.price_store import as_price_store
+
+# Seasonal market calendar derived from price history.
+#
+# One grouped aggregation (a bincount over crop x market x month-of-year)
+# gives the mean price and arrivals of every series in every calendar month.
+# Month indices are those means relative to the series' average month
+# (100 = average), so peak/trough price months and high-arrival (harvest)
+# months fall out directly. The crop-wide "All markets" rows come from the
+# same sums. The result is a few hundred thousand rows at national scale and
+# is cached per PriceStore, so rendering a crop's calendar is a lookup.
+
+ALL_MARKETS = 'All markets'
+MIN_MONTH_OBS = 5  # observations needed for a month to count
+MIN_MONTHS = 6     # months with data needed before peaks/troughs are reported
+TOP_MONTHS = 3
+MONTH_NAMES = list(calendar.month_abbr)[1:]
+TABLE_COLUMNS = ['crop', 'market', 'month', 'avg_price', 'price_index', 'avg_arrivals', 'arrival_index', 'observations']
+
+_table_cache = weakref.WeakKeyDictionary()
+
+
+def _month_index(sums, counts):
+    """Mean per month and its index vs. the average of covered months, for (groups, 12) sums."""
+    covered = counts >= MIN_MONTH_OBS
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mean = np.where(covered, sums / counts, np.nan)
+        base = np.where(covered, mean, 0.0).sum(axis=1, keepdims=True) / covered.sum(axis=1, keepdims=True)
+        index = mean / base * 100
+    return mean, index
+
+
+def build_seasonal_table(store):
+    """Month-of-year price and arrival indices for every (crop, market) and crop-wide."""
+    store = as_price_store(store)
+    frame = store.frame
+    crop_codes = frame['crop'].cat.codes.to_numpy().astype(np.int64)
+    market_codes = frame['market'].cat.codes.to_numpy().astype(np.int64)
+    months = frame['date'].dt.month.to_numpy().astype(np.int64) - 1
+    C, M = len(frame['crop'].cat.categories), len(frame['market'].cat.categories)
+
+    key = (crop_codes * M + market_codes) * 12 + months
+    size = C * M * 12
+    price = frame['modal_price'].to_numpy(dtype=np.float64)
+    arrivals = frame['arrival_quantity'].to_numpy(dtype=np.float64) if 'arrival_quantity' in frame else np.full(len(frame), np.nan)
+    price_ok, arrival_ok = ~np.isnan(price), ~np.isnan(arrivals)
+
+    def total(weights, ok):
+        return np.bincount(key[ok], weights=weights[ok], minlength=size).reshape(C, M, 12)
+
+    price_sum = total(price, price_ok)
+    price_n = np.bincount(key[price_ok], minlength=size).reshape(C, M, 12)
+    arrival_sum = total(arrivals, arrival_ok)
+    arrival_n = np.bincount(key[arrival_ok], minlength=size).reshape(C, M, 12)
+
+    # Crop-wide rows reuse the per-market sums
+    price_sum = np.concatenate([price_sum, price_sum.sum(axis=1, keepdims=True)], axis=1)
+    price_n = np.concatenate([price_n, price_n.sum(axis=1, keepdims=True)], axis=1)
+    arrival_sum = np.concatenate([arrival_sum, arrival_sum.sum(axis=1, keepdims=True)], axis=1)
+    arrival_n = np.concatenate([arrival_n, arrival_n.sum(axis=1, keepdims=True)], axis=1)
+
+    price_mean, price_index = _month_index(price_sum.reshape(-1, 12), price_n.reshape(-1, 12))
+    arrival_mean, arrival_index = _month_index(arrival_sum.reshape(-1, 12), arrival_n.reshape(-1, 12))
+
+    crops = frame['crop'].cat.categories.to_numpy()
+    markets = np.append(frame['market'].cat.categories.to_numpy().astype(object), ALL_MARKETS)
+    table = pd.DataFrame({
+        'crop': np.repeat(crops, (M + 1) * 12),
+        'market': np.tile(np.repeat(markets, 12), C),
+        'month': np.tile(np.arange(1, 13), C * (M + 1)),
+        'avg_price': price_mean.ravel(),
+        'price_index': price_index.ravel(),
+        'avg_arrivals': arrival_mean.ravel(),
+        'arrival_index': arrival_index.ravel(),
+        'observations': price_n.ravel(),
+    }, columns=TABLE_COLUMNS)
+    return table[table['observations'] > 0].reset_index(drop=True)
+
+
+def seasonal_table(store):
+    """Cached seasonal lookup table of a store (built on first use)."""
+    store = as_price_store(store)
+    table = _table_cache.get(store)
+    if table is None:
+        table = _table_cache.setdefault(store, build_seasonal_table(store))
+    return table
+
+
+def format_months(months):
+    """Month numbers as compact ranges, e.g. [7, 8, 9, 12] -> 'Jul-Sep, Dec'."""
+    months = sorted(set(int(m) for m in months))
+    if not months:
+        return 'N/A'
+    runs, start, prev = [], months[0], months[0]
+    for m in months[1:] + [None]:
+        if m is not None and m == prev + 1:
+            prev = m
+            continue
+        runs.append(MONTH_NAMES[start - 1] if start == prev else f"{MONTH_NAMES[start - 1]}-{MONTH_NAMES[prev - 1]}")
+        if m is not None:
+            start = prev = m
+    # Join Dec and Jan runs that wrap around the year
+    if len(runs) > 1 and months[0] == 1 and months[-1] == 12:
+        runs[0] = runs[-1].split('-')[0] + '-' + runs[0].split('-')[-1]
+        runs.pop()
+    return ', '.join(runs)
+
+
+def crop_calendar(store, crop, market=ALL_MARKETS):
+    """Peak/trough price months and high/low arrival months of a crop (optionally one market).
+
+    Returns None when the history covers fewer than MIN_MONTHS calendar
+    months. Otherwise a dict with peak_price_months, low_price_months,
+    high_arrival_months, low_arrival_months, months_covered and the 12-row
+    month table for charting.
+    """
+    table = seasonal_table(store)
+    rows = table[(table['crop'] == crop) & (table['market'] == market)]
+    rows = rows[rows['price_index'].notna()]
+    if len(rows) < MIN_MONTHS:
+        return None
+    by_price = rows.sort_values('price_index')
+    arrivals = rows[rows['arrival_index'].notna()].sort_values('arrival_index')
+    return {
+        'peak_price_months': format_months(by_price['month'].tail(TOP_MONTHS)),
+        'low_price_months': format_months(by_price['month'].head(TOP_MONTHS)),
+        'high_arrival_months': format_months(arrivals['month'].tail(TOP_MONTHS)),
+        'low_arrival_months': format_months(arrivals['month'].head(TOP_MONTHS)),
+        'price_swing': float(by_price['price_index'].max() - by_price['price_index'].min()),
+        'months_covered': len(rows),
+        'months': rows.set_index('month').reindex(range(1, 13)),
+    }
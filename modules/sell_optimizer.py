@@ -0,0 +1,159 @@
+import numpy as np
+import pandas as pd
+
+from modules.price_analytics import select_series, window_rows
+from modules.price_store import as_price_store
+
+# Hold-vs-sell optimizer: when to sell a stored lot, month by month.
+#
+# Inventory is discretized into `levels` steps of quantity / (levels - 1)
+# quintals. Backward dynamic programming over the horizon gives, for every
+# market and inventory level, how much to sell this month:
+#
+#   V[t, i] = max_j  revenue_t(j) - storage_rate * (i - j) + V[t + 1, i - j]
+#
+# where revenue_t(j) = q_j * (expected price_t - price_impact * q_j) and j is
+# limited by max_sell per month. Every market is solved at once as an
+# (markets x levels x sell steps) array per month, where sell steps only go
+# up to the monthly cap, so 12 months x 50 markets is a dozen small NumPy
+# passes and memory stays bounded by MAX_LEVELS. Stock still held after the last month is
+# worthless, so the optimal plan always clears it when capacity allows.
+# When max_sell is below one inventory step the grid is refined so that at
+# least one step fits under the cap. The sell-now baseline sells as fast as
+# max_sell allows (everything in month 0 when uncapped), paying storage on
+# whatever has to wait.
+
+DEFAULT_LEVELS = 51
+MAX_LEVELS = 201  # finest inventory grid a small max_sell may ask for
+DAYS_PER_MONTH = 30
+
+
+def optimize_sell_schedule(prices, quantity, storage_rate, max_sell=None, price_impact=0.0, levels=DEFAULT_LEVELS):
+    """Optimal monthly sell schedule for every market.
+
+    prices is (markets, months) expected ₹/qt, or (markets, scenarios, months)
+    price paths whose mean is optimized and whose spread is reported.
+    storage_rate is ₹/qt/month for stock carried into the next month;
+    max_sell caps quintals sold per month and price_impact (₹/qt per quintal
+    sold) lowers the price achieved on large sales. Returns a dict with
+    schedule (markets, months) in quintals, expected_revenue, storage_cost,
+    sell_now_revenue (selling as fast as max_sell allows) and
+    scenario_revenue (markets, scenarios). Raises ValueError for a
+    non-positive max_sell or one too small for the inventory grid.
+    """
+    scenarios = np.asarray(prices, dtype=np.float64)
+    if scenarios.ndim == 2:
+        scenarios = scenarios[:, None, :]
+    expected = scenarios.mean(axis=1)
+    M, T = expected.shape
+    L = int(levels)
+    if max_sell is not None:
+        if max_sell <= 0:
+            raise ValueError("max_sell must be positive")
+        # At least one inventory step must fit under the monthly cap
+        L = max(L, int(np.ceil(float(quantity) / max_sell - 1e-9)) + 1)
+        if L > MAX_LEVELS:
+            raise ValueError(f"max_sell={max_sell} is too small for quantity={quantity} "
+                             f"(needs more than {MAX_LEVELS} inventory levels)")
+    qty = np.linspace(0.0, float(quantity), L)
+
+    # Sell steps 0..K-1: every step under the monthly cap
+    K = L if max_sell is None else int(np.searchsorted(qty, max_sell + 1e-9, 'right'))
+    have = np.arange(L)[:, None]
+    sell = np.arange(K)[None, :]
+    left = np.clip(have - sell, 0, None)
+    feasible = sell <= have
+    carry_cost = storage_rate * qty[left]  # (have, sell)
+
+    value = np.zeros((M, L))  # stock left after the horizon is worth nothing
+    policy = np.zeros((T, M, L), dtype=np.int64)
+    for t in range(T - 1, -1, -1):
+        revenue = qty[None, :K] * (expected[:, t, None] - price_impact * qty[None, :K])  # (M, sell)
+        total = revenue[:, None, :] + value[:, left]  # (M, have, sell)
+        if t < T - 1:
+            total = total - carry_cost[None, :, :]
+        total = np.where(feasible[None, :, :], total, -np.inf)
+        policy[t] = np.argmax(total, axis=2)
+        value = np.take_along_axis(total, policy[t][:, :, None], axis=2)[:, :, 0]
+
+    schedule = np.zeros((M, T))
+    level = np.full(M, L - 1)
+    rows = np.arange(M)
+    for t in range(T):
+        j = policy[t, rows, level]
+        schedule[:, t] = qty[j]
+        level = level - j
+
+    held = float(quantity) - np.cumsum(schedule, axis=1)
+    storage_cost = storage_rate * held[:, :-1].sum(axis=1)
+    achieved = scenarios - price_impact * schedule[:, None, :]
+    scenario_revenue = (schedule[:, None, :] * achieved).sum(axis=2) - storage_cost[:, None]
+    return {
+        'quantity': float(quantity),
+        'schedule': schedule,
+        'expected_revenue': value[:, L - 1],
+        'storage_cost': storage_cost,
+        'sell_now_revenue': _sell_now_revenue(expected, quantity, storage_rate, max_sell, price_impact),
+        'scenario_revenue': scenario_revenue,
+    }
+
+
+def _sell_now_revenue(expected, quantity, storage_rate, max_sell=None, price_impact=0.0):
+    """Revenue per market from selling as fast as max_sell allows, net of storage on what waits."""
+    M, T = expected.shape
+    cap = float(quantity) if max_sell is None else min(float(max_sell), float(quantity))
+    sold_by = np.minimum(cap * np.arange(1, T + 1), float(quantity))
+    sales = np.diff(sold_by, prepend=0.0)  # same for every market
+    held = float(quantity) - sold_by
+    revenue = (sales[None, :] * (expected - price_impact * sales[None, :])).sum(axis=1)
+    return revenue - storage_rate * held[:-1].sum()
+
+
+def price_scenarios(latest_price, monthly_drift, monthly_volatility, months, n_scenarios=200, seed=0):
+    """Log-normal monthly price paths (markets, scenarios, months); month 0 is today's price."""
+    latest_price = np.asarray(latest_price, dtype=np.float64)
+    drift = np.broadcast_to(np.asarray(monthly_drift, dtype=np.float64), latest_price.shape)
+    vol = np.broadcast_to(np.asarray(monthly_volatility, dtype=np.float64), latest_price.shape)
+    rng = np.random.default_rng(seed)
+    shocks = rng.standard_normal((len(latest_price), n_scenarios, months - 1))
+    steps = (np.log1p(drift) - vol ** 2 / 2)[:, None, None] + vol[:, None, None] * shocks
+    log_path = np.concatenate([np.zeros((len(latest_price), n_scenarios, 1)), np.cumsum(steps, axis=2)], axis=2)
+    return latest_price[:, None, None] * np.exp(log_path)
+
+
+def market_price_scenarios(store, crop, markets=None, months=12, monthly_drift=None, history_days=60,
+                           n_scenarios=200, seed=0):
+    """Price paths per market from each series' latest price and recent daily log returns.
+
+    monthly_drift defaults to each market's own mean daily log return scaled
+    to a month. Returns (markets, scenarios (M, S, months)).
+    """
+    store = as_price_store(store)
+    series_pos = select_series(store, crop, markets)
+    rows, group, lengths = window_rows(store, series_pos, history_days)
+    log_price = np.log(store.frame['modal_price'].to_numpy(dtype=np.float64)[rows])
+    same = np.r_[False, group[1:] == group[:-1]]
+    returns = np.where(same, np.diff(log_price, prepend=np.nan), 0.0)
+    n = np.maximum(np.bincount(group, weights=same, minlength=len(series_pos)), 1)
+    mean = np.bincount(group, weights=returns, minlength=len(series_pos)) / n
+    var = np.bincount(group, weights=np.where(same, (returns - mean[group]) ** 2, 0.0), minlength=len(series_pos)) / n
+
+    latest = store.frame['modal_price'].to_numpy(dtype=np.float64)[store.stops[series_pos] - 1]
+    drift = np.expm1(mean * DAYS_PER_MONTH) if monthly_drift is None else monthly_drift
+    vol = np.sqrt(var * DAYS_PER_MONTH)
+    names = store.labels('market', store.stops[series_pos] - 1)
+    return list(names), price_scenarios(latest, drift, vol, months, n_scenarios, seed)
+
+
+def schedule_table(result, markets, start=None):
+    """Tidy plan: one row per (market, month) with quintals sold and still held."""
+    schedule = result['schedule']
+    M, T = schedule.shape
+    start = pd.Timestamp.now().normalize().replace(day=1) if start is None else pd.Timestamp(start)
+    months = pd.date_range(start, periods=T, freq='MS')
+    return pd.DataFrame({
+        'market': np.repeat(np.asarray(markets), T),
+        'month': np.tile(months.strftime('%b %Y'), M),
+        'sell_qt': schedule.ravel(),
+        'held_qt': (result['quantity'] - np.cumsum(schedule, axis=1)).ravel(),
+    })
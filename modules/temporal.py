@@ -0,0 +1,42 @@
+import numpy as np
+import pandas as pd
+
+# Shared date handling for the market and weather datasets.
+#
+# Dates are parsed once, at load, into day-resolution datetime64 and stay
+# that way through filters, joins and charts; they only become strings when
+# something is rendered (format_date / format_dates) or exported
+# (DATE_FORMAT as to_csv's date_format). Date ranges of sorted blocks are
+# found with searchsorted instead of comparing every row.
+
+DATE_FORMAT = '%Y-%m-%d'
+
+
+def as_dates(values):
+    """Day-resolution datetime64 values (unparseable entries become NaT).
+
+    Values that already are datetime64 are only normalized, never re-parsed.
+    """
+    if isinstance(values, (pd.Series, pd.Index)):
+        if not pd.api.types.is_datetime64_any_dtype(values.dtype):
+            values = pd.to_datetime(values, errors='coerce')
+        return values.dt.normalize() if isinstance(values, pd.Series) else values.normalize()
+    return pd.to_datetime(np.asarray(values), errors='coerce').normalize().to_numpy()
+
+
+def date_bounds(sorted_dates, start=None, end=None):
+    """(lo, hi) positions of the inclusive [start, end] range in ascending dates."""
+    sorted_dates = np.asarray(sorted_dates)
+    lo = 0 if start is None else int(np.searchsorted(sorted_dates, np.datetime64(pd.Timestamp(start)), 'left'))
+    hi = len(sorted_dates) if end is None else int(np.searchsorted(sorted_dates, np.datetime64(pd.Timestamp(end)), 'right'))
+    return lo, max(lo, hi)
+
+
+def format_date(value, fmt=DATE_FORMAT):
+    """A single date as text for display; NaT/None become 'N/A'."""
+    return 'N/A' if pd.isna(value) else pd.Timestamp(value).strftime(fmt)
+
+
+def format_dates(dates, fmt=DATE_FORMAT):
+    """Date column as an array of display strings (render time only)."""
+    return pd.DatetimeIndex(np.asarray(dates)).strftime(fmt).to_numpy()
@@ -3,150 +3,64 @@ import pandas as pd
 import numpy as np
 from pathlib import Path
 import plotly.graph_objects as go
-from datetime import datetime, timedelta
-import csv
-import io
-
-
-def safe_read_csv(path):
-    """Read CSV robustly: sniff delimiter, try fallbacks, and avoid raising on empty/malformed files.
-
-    Returns a DataFrame or an empty DataFrame on failure.
-    """
-    p = Path(path)
-    if not p.exists() or p.stat().st_size == 0:
-        return pd.DataFrame()
-
-    # Read sample for sniffing
-    try:
-        sample = p.read_text(encoding='utf-8', errors='replace')[:8192]
-    except Exception:
-        sample = None
-
-    delimiter = None
-    if sample:
-        try:
-            dialect = csv.Sniffer().sniff(sample, delimiters=[',', ';', '\t', '|'])
-            delimiter = dialect.delimiter
-        except Exception:
-            delimiter = None
-
-    tried = set()
-    candidates = ([delimiter] if delimiter else []) + [',', ';', '\t', '|']
-    for delim in candidates:
-        if not delim or delim in tried:
-            continue
-        tried.add(delim)
-        try:
-            df = pd.read_csv(p, sep=delim)
-            # If read yields multiple columns, assume success
-            if not df.empty and len(df.columns) > 0:
-                return df
-        except (pd.errors.EmptyDataError, pd.errors.ParserError):
-            continue
-        except Exception:
-            continue
-
-    # Last attempt with python engine
-    try:
-        df = pd.read_csv(p, engine='python')
-        return df
-    except Exception:
-        return pd.DataFrame()
+from datetime import datetime
+from modules.data_registry import get_dataset
+from modules.irrigation import METHOD_EFFICIENCY, irrigation_schedule, reference_et
+from modules.csv_ingest import format_ingest_stats
+from modules.columnar_cache import load_table
+from modules.chart_downsample import bar_trace, scatter_trace
+from modules.temporal import DATE_FORMAT, as_dates, format_date, format_dates
+from modules.weather_rules import RULES_BY_ID, weather_alert_table
+from modules.weather_schema import coerce_weather_dtypes, rename_map_for
+from modules.weather_store import location_frame, location_index, locations, sort_by_location
 
 
 def load_weather_data():
     """Load weather forecast data with normalization and demo fallback."""
     global weather_load_info
-    weather_load_info = {'source': None, 'warning': None, 'columns': None, 'sample': None, 'rename_map': None}
-
     data_path = Path(__file__).parent.parent / "data" / "weather_data.csv"
+    df, weather_load_info = get_dataset('weather_data', data_path, _build_weather_dataset)
+    return df
 
-    if data_path.exists():
-        try:
-            raw_text = data_path.read_text(encoding='utf-8', errors='replace')
-        except Exception:
-            raw_text = None
 
-        df = safe_read_csv(data_path)
-        if df is None or df.empty:
-            weather_load_info.update({'source': 'demo_generated', 'warning': f'CSV at {data_path} is missing/empty/malformed; generated demo data instead.', 'columns': [], 'sample': (raw_text[:2048] if raw_text else None), 'rename_map': {}})
-        else:
-            orig_columns = df.columns.tolist()
-            weather_load_info.update({'source': 'csv', 'warning': None, 'columns': orig_columns, 'sample': (raw_text[:2048] if raw_text else None)})
+def _build_weather_dataset(data_path):
+    """Load weather data and partition it by location once, at load time."""
+    df, load_info = _read_weather_data(data_path)
+    df = sort_by_location(df)
+    location_index(df)
+    return df, load_info
 
-            # Normalize common alternative column names
-            cols_lower = {c.lower(): c for c in df.columns}
 
-            def pick(variants):
-                for v in variants:
-                    if v in cols_lower:
-                        return cols_lower[v]
-                for v in variants:
-                    for low_c, orig in cols_lower.items():
-                        if v in low_c:
-                            return orig
-                return None
+def _read_weather_data(data_path):
+    """Parse and normalize weather_data.csv or generate demo data; returns (df, load_info)."""
+    weather_load_info = {'source': None, 'warning': None, 'columns': None, 'sample': None, 'rename_map': None, 'ingest': None}
 
-            rename_map = {}
-            # temperature
-            m = pick(['maxtemp_c', 'maxtemp', 'max_temp', 'max temp', 'temp_max', 'temperature_max'])
-            if m:
-                rename_map[m] = 'max_temp'
-            m = pick(['mintemp_c', 'mintemp', 'min_temp', 'min temp', 'temp_min', 'temperature_min'])
-            if m:
-                rename_map[m] = 'min_temp'
-            # rainfall
-            m = pick(['precip_mm', 'precipitation', 'rainfall', 'rain_mm', 'rain', 'rainfall_mm'])
-            if m:
-                rename_map[m] = 'rainfall'
-            # humidity
-            m = pick(['humidity', 'hum'])
-            if m:
-                rename_map[m] = 'humidity'
-            # wind
-            m = pick(['wind_kph', 'wind_km_h', 'wind_speed', 'wind', 'wind_speed_kmh', 'wind_kmh'])
-            if m:
-                rename_map[m] = 'wind_speed'
-            # uv, pressure, condition, location, date
-            m = pick(['uv', 'uv_index', 'uvindex'])
-            if m:
-                rename_map[m] = 'uv_index'
-            m = pick(['pressure', 'press'])
-            if m:
-                rename_map[m] = 'pressure'
-            m = pick(['weather_condition', 'condition', 'weather'])
-            if m:
-                rename_map[m] = 'condition'
-            m = pick(['location', 'city', 'place'])
-            if m:
-                rename_map[m] = 'location'
-            m = pick(['date', 'datetime', 'day'])
-            if m:
-                rename_map[m] = 'date'
+    if data_path.exists():
+        df, ingest_stats = load_table(data_path)
+        weather_load_info['ingest'] = ingest_stats
+        if df.empty:
+            weather_load_info.update({'source': 'demo_generated', 'warning': f'CSV at {data_path} is missing/empty/malformed; generated demo data instead.', 'columns': [], 'sample': ingest_stats['sample'], 'rename_map': {}})
+        else:
+            orig_columns = df.columns.tolist()
+            weather_load_info.update({'source': 'csv', 'warning': None, 'columns': orig_columns, 'sample': ingest_stats['sample']})
 
+            # Normalize vendor column names (resolved once per distinct header) and numeric dtypes
+            rename_map = rename_map_for(orig_columns, data_path.parent)
             if rename_map:
                 df = df.rename(columns=rename_map)
-
-            numeric_cols = ['max_temp', 'min_temp', 'rainfall', 'humidity', 'wind_speed', 'uv_index', 'pressure']
-            for c in numeric_cols:
-                if c in df.columns:
-                    df[c] = pd.to_numeric(df[c], errors='coerce')
+            df = coerce_weather_dtypes(df)
 
             if 'date' in df.columns:
-                try:
-                    df['date'] = pd.to_datetime(df['date']).dt.strftime('%Y-%m-%d')
-                except Exception:
-                    df['date'] = df['date'].astype(str)
+                df['date'] = as_dates(df['date'])
 
             if 'location' not in df.columns:
                 df['location'] = 'Unknown'
 
             weather_load_info['rename_map'] = rename_map
-            return df
+            return df, weather_load_info
 
     # Demo generation fallback
-    dates = [datetime.now() + timedelta(days=i) for i in range(10)]
+    dates = pd.date_range(pd.Timestamp.now().normalize(), periods=10, freq='D')
     np.random.seed(42)
     locations = ['Delhi', 'Mumbai', 'Bangalore', 'Chennai', 'Kolkata', 'Pune', 'Hyderabad', 'Ahmedabad']
     weather_data = []
@@ -176,7 +90,7 @@ def load_weather_data():
                 condition = "Clear"
             weather_data.append({
                 'location': location,
-                'date': date.strftime('%Y-%m-%d'),
+                'date': date,
                 'max_temp': round(max_temp, 1),
                 'min_temp': round(min_temp, 1),
                 'humidity': round(humidity, 0),
@@ -189,133 +103,44 @@ def load_weather_data():
 
     df_demo = pd.DataFrame(weather_data)
     weather_load_info.update({'source': 'demo_generated', 'warning': f'CSV missing or invalid at {data_path}; generated demo data.', 'columns': [], 'sample': None, 'rename_map': {}})
-    return df_demo
+    return df_demo, weather_load_info
 
-def generate_weather_alerts(weather_df, location):
-    """Generate weather-based agricultural alerts"""
-    alerts = []
-    location_data = weather_df[weather_df['location'] == location].head(7)  # Next 7 days
-    
-    for _, day in location_data.iterrows():
-        date = day['date']
-        
-        # Heavy rain alert
-        if day['rainfall'] > 50:
-            alerts.append({
-                'date': date,
-                'type': 'Critical',
-                'icon': '🌧️',
-                'title': 'Heavy Rainfall Alert',
-                'message': f"Expected rainfall: {day['rainfall']:.1f}mm. Protect crops from waterlogging.",
-                'recommendations': [
-                    "Ensure proper drainage in fields",
-                    "Postpone spraying operations",
-                    "Harvest mature crops if possible",
-                    "Cover harvested grain properly"
-                ]
-            })
-        
-        # High temperature alert
-        elif day['max_temp'] > 35:
-            alerts.append({
-                'date': date,
-                'type': 'Warning',
-                'icon': '🌡️',
-                'title': 'High Temperature Alert',
-                'message': f"Maximum temperature expected: {day['max_temp']:.1f}°C",
-                'recommendations': [
-                    "Increase irrigation frequency",
-                    "Provide shade to sensitive crops",
-                    "Avoid field operations during peak hours",
-                    "Monitor livestock for heat stress"
-                ]
-            })
-        
-        # Frost alert (low temperature)
-        elif day['min_temp'] < 5:
-            alerts.append({
-                'date': date,
-                'type': 'Critical',
-                'icon': '❄️',
-                'title': 'Frost Alert',
-                'message': f"Minimum temperature: {day['min_temp']:.1f}°C. Risk of frost damage.",
-                'recommendations': [
-                    "Cover sensitive plants",
-                    "Use smoke or water sprinklers",
-                    "Harvest tender vegetables",
-                    "Protect nursery plants"
-                ]
-            })
-        
-        # High wind alert
-        elif day['wind_speed'] > 25:
-            alerts.append({
-                'date': date,
-                'type': 'Warning',
-                'icon': '💨',
-                'title': 'Strong Wind Alert',
-                'message': f"Wind speed: {day['wind_speed']:.1f} km/h",
-                'recommendations': [
-                    "Secure greenhouse structures",
-                    "Postpone aerial spraying",
-                    "Support tall crops with stakes",
-                    "Check irrigation pipes"
-                ]
-            })
-        
-        # Dry spell alert
-        elif day['humidity'] < 30 and day['rainfall'] == 0:
-            alerts.append({
-                'date': date,
-                'type': 'Advisory',
-                'icon': '🏜️',
-                'title': 'Dry Weather Advisory',
-                'message': f"Low humidity: {day['humidity']:.0f}%",
-                'recommendations': [
-                    "Increase irrigation frequency",
-                    "Apply mulch to conserve moisture",
-                    "Monitor crop water stress",
-                    "Consider foliar feeding"
-                ]
-            })
-        
-        # Good weather for operations
-        elif 15 <= day['max_temp'] <= 30 and day['rainfall'] == 0 and day['wind_speed'] < 15:
-            alerts.append({
-                'date': date,
-                'type': 'Favorable',
-                'icon': '☀️',
-                'title': 'Favorable Weather',
-                'message': "Good conditions for field operations",
-                'recommendations': [
-                    "Ideal for spraying operations",
-                    "Good for harvesting",
-                    "Suitable for land preparation",
-                    "Perfect for sowing operations"
-                ]
-            })
-    
-    return alerts
+def generate_weather_alerts(weather_df, location, days=7):
+    """Generate weather-based agricultural alerts for a location's next `days` days"""
+    location_alerts = location_frame(weather_alert_table(weather_df), location)
+    location_alerts = location_alerts[location_alerts['day'] < days]
+    return [
+        {
+            'date': alert.date,
+            'type': alert.type,
+            'icon': alert.icon,
+            'title': alert.title,
+            'message': alert.message,
+            'recommendations': RULES_BY_ID[alert.rule]['recommendations']
+        }
+        for alert in location_alerts.itertuples(index=False)
+    ]
 
-def create_weather_chart(weather_df, location):
-    """Create weather forecast chart"""
-    location_data = weather_df[weather_df['location'] == location].head(7)
+def create_weather_chart(weather_df, location, days=7):
+    """Create weather forecast chart (days=None plots the full history, downsampled)"""
+    location_data = location_frame(weather_df, location, days)
+    dates = location_data['date'].to_numpy()
     
     fig = go.Figure()
     
     # Temperature traces
-    fig.add_trace(go.Scatter(
-        x=location_data['date'],
-        y=location_data['max_temp'],
+    fig.add_trace(scatter_trace(
+        dates,
+        location_data['max_temp'].to_numpy(),
         mode='lines+markers',
         name='Max Temperature',
         line=dict(color='red', width=2),
         marker=dict(size=6)
     ))
     
-    fig.add_trace(go.Scatter(
-        x=location_data['date'],
-        y=location_data['min_temp'],
+    fig.add_trace(scatter_trace(
+        dates,
+        location_data['min_temp'].to_numpy(),
         mode='lines+markers',
         name='Min Temperature',
         line=dict(color='blue', width=2),
@@ -323,9 +148,9 @@ def create_weather_chart(weather_df, location):
     ))
     
     # Rainfall bars
-    fig.add_trace(go.Bar(
-        x=location_data['date'],
-        y=location_data['rainfall'],
+    fig.add_trace(bar_trace(
+        dates,
+        location_data['rainfall'].to_numpy(),
         name='Rainfall (mm)',
         yaxis='y2',
         marker_color='lightblue',
@@ -333,7 +158,7 @@ def create_weather_chart(weather_df, location):
     ))
     
     fig.update_layout(
-        title=f'7-Day Weather Forecast - {location}',
+        title=f'{days}-Day Weather Forecast - {location}' if days is not None else f'Weather History - {location}',
         xaxis_title='Date',
         yaxis_title='Temperature (°C)',
         yaxis2=dict(
@@ -361,7 +186,7 @@ def run():
     with col1:
         selected_location = st.selectbox(
             "📍 Select Location:",
-            weather_df['location'].unique(),
+            locations(weather_df),
             help="Choose your nearest location"
         )
     
@@ -382,7 +207,7 @@ def run():
         )
     
     # Current weather summary
-    loc_df = weather_df[weather_df['location'] == selected_location]
+    loc_df = location_frame(weather_df, selected_location)
     if loc_df.empty:
         st.warning(f"No weather data available for '{selected_location}'.")
         return
@@ -448,6 +273,8 @@ def run():
         with st.expander("⚙️ Weather data debug info"):
             st.write("Detected columns:", info.get('columns'))
             st.write("Rename map:", info.get('rename_map'))
+            if info.get('ingest'):
+                st.write("Ingest:", format_ingest_stats(info['ingest']))
             sample = info.get('sample')
             if sample:
                 st.markdown("**CSV sample (first 2KB):**")
@@ -480,13 +307,13 @@ def run():
                     
                     with st.container():
                         if alert_color == 'error':
-                            st.error(f"{alert['icon']} **{alert['title']}** ({alert['date']})")
+                            st.error(f"{alert['icon']} **{alert['title']}** ({format_date(alert['date'])})")
                         elif alert_color == 'warning':
-                            st.warning(f"{alert['icon']} **{alert['title']}** ({alert['date']})")
+                            st.warning(f"{alert['icon']} **{alert['title']}** ({format_date(alert['date'])})")
                         elif alert_color == 'info':
-                            st.info(f"{alert['icon']} **{alert['title']}** ({alert['date']})")
+                            st.info(f"{alert['icon']} **{alert['title']}** ({format_date(alert['date'])})")
                         else:
-                            st.success(f"{alert['icon']} **{alert['title']}** ({alert['date']})")
+                            st.success(f"{alert['icon']} **{alert['title']}** ({format_date(alert['date'])})")
                         
                         st.write(alert['message'])
                         
@@ -503,7 +330,7 @@ def run():
     st.plotly_chart(fig, use_container_width=True)
     
     # Detailed forecast table
-    location_forecast = weather_df[weather_df['location'] == selected_location].head(forecast_days)
+    location_forecast = loc_df.head(forecast_days)
     
     st.markdown("### 📋 Detailed Forecast")
     
@@ -512,9 +339,14 @@ def run():
     display_forecast['Temperature'] = display_forecast.apply(lambda x: f"{x['max_temp']:.1f}°C / {x['min_temp']:.1f}°C", axis=1)
     display_forecast['Weather'] = display_forecast['condition'] + " " + display_forecast.apply(lambda x: f"({x['humidity']:.0f}% humidity)", axis=1)
     display_forecast['Rain/Wind'] = display_forecast.apply(lambda x: f"{x['rainfall']:.1f}mm / {x['wind_speed']:.1f}km/h", axis=1)
+    _, et0_dates, et0 = reference_et(location_forecast, days=len(location_forecast))
+    et0_by_date = pd.Series(et0[0], index=pd.DatetimeIndex(et0_dates[0]))
+    display_forecast['ET0'] = [f"{v:.1f} mm" if pd.notna(v) else "N/A"
+                               for v in et0_by_date.reindex(pd.DatetimeIndex(display_forecast['date'])).to_numpy()]
     
-    forecast_table = display_forecast[['date', 'Temperature', 'Weather', 'Rain/Wind']].copy()
-    forecast_table.columns = ['Date', 'Max/Min Temp', 'Condition', 'Rain/Wind']
+    display_forecast['date'] = format_dates(display_forecast['date'])
+    forecast_table = display_forecast[['date', 'Temperature', 'Weather', 'Rain/Wind', 'ET0']].copy()
+    forecast_table.columns = ['Date', 'Max/Min Temp', 'Condition', 'Rain/Wind', 'ET0']
     
     st.dataframe(forecast_table, hide_index=True, use_container_width=True)
     
@@ -529,7 +361,7 @@ def run():
         
         activities = []
         for _, day in location_forecast.head(7).iterrows():
-            date = day['date']
+            date = format_date(day['date'])
             
             if day['rainfall'] == 0 and 15 <= day['max_temp'] <= 30:
                 activities.append(f"**{date}**: ✅ Good for spraying, harvesting, land preparation")
@@ -733,48 +565,30 @@ def run():
     if st.button("📅 Generate Irrigation Schedule"):
         st.markdown("#### 📋 7-Day Irrigation Schedule")
         
-        irrigation_schedule = []
-        
-        # Water requirement factors
-        crop_water_need = {"Rice": 1.5, "Wheat": 1.0, "Cotton": 1.2, "Vegetables": 0.8, "Fruits": 1.1}
-        stage_factor = {"Germination": 0.7, "Vegetative": 1.0, "Flowering": 1.3, "Fruiting": 1.2, "Maturity": 0.6}
-        soil_factor = {"Clay": 0.8, "Loamy": 1.0, "Sandy": 1.3, "Black Cotton": 0.9}
-        
-        base_requirement = crop_water_need.get(crop_type_irrigation, 1.0) * stage_factor.get(growth_stage_irrigation, 1.0) * soil_factor.get(soil_type_irrigation, 1.0)
-        
-        for _, day in location_forecast.head(7).iterrows():
-            date = day['date']
-            rain = day['rainfall']
-            temp = day['max_temp']
-            humidity = day['humidity']
-            
-            # Calculate daily water requirement (simplified)
-            et_factor = 1 + (temp - 25) * 0.02 + (100 - humidity) * 0.005  # Evapotranspiration factor
-            daily_need = base_requirement * et_factor * 10  # mm per day
-            
-            # Adjust for rainfall
-            irrigation_need = max(0, daily_need - rain)
-            
-            if irrigation_need > 5:
-                status = "💧 Irrigate"
-                amount = f"{irrigation_need:.1f} mm"
-            elif irrigation_need > 0:
-                status = "🌿 Light watering"
-                amount = f"{irrigation_need:.1f} mm"
-            else:
-                status = "✅ No irrigation needed"
-                amount = "0 mm"
-            
-            irrigation_schedule.append({
-                'Date': date,
-                'Weather': day['condition'],
-                'Rainfall': f"{rain:.1f} mm",
-                'Irrigation Need': amount,
-                'Action': status
-            })
-        
-        schedule_df = pd.DataFrame(irrigation_schedule)
+        schedule_days = location_forecast.head(7)
+        plot = pd.DataFrame({
+            'location': [selected_location],
+            'crop': [crop_type_irrigation],
+            'stage': [growth_stage_irrigation],
+            'soil': [soil_type_irrigation],
+            'method': [irrigation_method]
+        })
+        schedule = irrigation_schedule(plot, weather_df, days=len(schedule_days))
+        
+        day_weather = schedule_days.drop_duplicates('date').set_index('date').reindex(schedule['date'])
+        
+        schedule_df = pd.DataFrame({
+            'Date': format_dates(schedule['date']),
+            'Weather': day_weather['condition'].to_numpy() if 'condition' in day_weather else 'N/A',
+            'Rainfall': [f"{rain:.1f} mm" for rain in day_weather['rainfall']],
+            'ET0': [f"{et0:.1f} mm" for et0 in schedule['et0_mm']],
+            'Irrigation Need': [f"{need:.1f} mm" if need > 0 else "0 mm" for need in schedule['gross_mm']],
+            'Action': schedule['action'].to_numpy()
+        })
         st.dataframe(schedule_df, hide_index=True, use_container_width=True)
+        st.caption(f"ET0 from FAO-56 Penman-Monteith (Hargreaves when humidity/wind are missing) × crop coefficient "
+                   f"× soil factor, less 80% of rainfall; includes {METHOD_EFFICIENCY.get(irrigation_method, 0.6):.0%} "
+                   f"{irrigation_method.lower()} irrigation efficiency.")
         
         # Water conservation tips
         st.markdown("#### 💡 Water Conservation Tips")
@@ -858,7 +672,7 @@ def run():
     # Download weather data option
     st.markdown("---")
     if st.button("📥 Download Weather Data (CSV)"):
-        csv = location_forecast.to_csv(index=False)
+        csv = location_forecast.to_csv(index=False, date_format=DATE_FORMAT)
         st.download_button(
             label="💾 Download Forecast Data",
             data=csv,
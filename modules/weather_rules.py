@@ -0,0 +1,185 @@
+import weakref
+
+import numpy as np
+import pandas as pd
+
+# Declarative weather alert rules, evaluated as NumPy masks.
+#
+# A rule is a list of (field, operator, threshold) clauses that must all hold,
+# plus its severity, icon, title, message template and recommendations. Every
+# clause becomes one vectorized comparison over the whole weather table (all
+# locations x days), so a rule set costs a few array operations however many
+# districts there are, and a day can raise several alerts (a hot, windy day
+# gets both). Rules marked 'fallback' only fire on days no other rule fired.
+# The tidy alerts table is cached per weather dataset object; the data
+# registry hands out a new object whenever the file changes.
+
+OPERATORS = {
+    '>': np.greater,
+    '>=': np.greater_equal,
+    '<': np.less,
+    '<=': np.less_equal,
+    '==': np.equal,
+}
+SEVERITIES = ['Critical', 'Warning', 'Advisory', 'Favorable']
+ALERT_COLUMNS = ['location', 'date', 'day', 'rule', 'type', 'icon', 'title', 'message', 'value']
+
+ALERT_RULES = [
+    {
+        'id': 'heavy_rain', 'type': 'Critical', 'icon': '🌧️', 'title': 'Heavy Rainfall Alert',
+        'when': [('rainfall', '>', 50)], 'value': 'rainfall',
+        'message': "Expected rainfall: {value:.1f}mm. Protect crops from waterlogging.",
+        'recommendations': [
+            "Ensure proper drainage in fields",
+            "Postpone spraying operations",
+            "Harvest mature crops if possible",
+            "Cover harvested grain properly"
+        ]
+    },
+    {
+        'id': 'high_temperature', 'type': 'Warning', 'icon': '🌡️', 'title': 'High Temperature Alert',
+        'when': [('max_temp', '>', 35)], 'value': 'max_temp',
+        'message': "Maximum temperature expected: {value:.1f}°C",
+        'recommendations': [
+            "Increase irrigation frequency",
+            "Provide shade to sensitive crops",
+            "Avoid field operations during peak hours",
+            "Monitor livestock for heat stress"
+        ]
+    },
+    {
+        'id': 'frost', 'type': 'Critical', 'icon': '❄️', 'title': 'Frost Alert',
+        'when': [('min_temp', '<', 5)], 'value': 'min_temp',
+        'message': "Minimum temperature: {value:.1f}°C. Risk of frost damage.",
+        'recommendations': [
+            "Cover sensitive plants",
+            "Use smoke or water sprinklers",
+            "Harvest tender vegetables",
+            "Protect nursery plants"
+        ]
+    },
+    {
+        'id': 'strong_wind', 'type': 'Warning', 'icon': '💨', 'title': 'Strong Wind Alert',
+        'when': [('wind_speed', '>', 25)], 'value': 'wind_speed',
+        'message': "Wind speed: {value:.1f} km/h",
+        'recommendations': [
+            "Secure greenhouse structures",
+            "Postpone aerial spraying",
+            "Support tall crops with stakes",
+            "Check irrigation pipes"
+        ]
+    },
+    {
+        'id': 'dry_weather', 'type': 'Advisory', 'icon': '🏜️', 'title': 'Dry Weather Advisory',
+        'when': [('humidity', '<', 30), ('rainfall', '==', 0)], 'value': 'humidity',
+        'message': "Low humidity: {value:.0f}%",
+        'recommendations': [
+            "Increase irrigation frequency",
+            "Apply mulch to conserve moisture",
+            "Monitor crop water stress",
+            "Consider foliar feeding"
+        ]
+    },
+    {
+        'id': 'favorable', 'type': 'Favorable', 'icon': '☀️', 'title': 'Favorable Weather',
+        'when': [('max_temp', '>=', 15), ('max_temp', '<=', 30), ('rainfall', '==', 0), ('wind_speed', '<', 15)],
+        'fallback': True,
+        'message': "Good conditions for field operations",
+        'recommendations': [
+            "Ideal for spraying operations",
+            "Good for harvesting",
+            "Suitable for land preparation",
+            "Perfect for sowing operations"
+        ]
+    },
+]
+
+_table_cache = {}  # id(weather_df) -> (weakref to weather_df, rules, alerts table)
+
+
+def compile_rules(rules):
+    """Validate rules and resolve their operators; returns a list of (rule, [(field, ufunc, threshold)])."""
+    compiled = []
+    for rule in rules:
+        if rule['type'] not in SEVERITIES:
+            raise ValueError(f"Rule {rule['id']!r} has unknown severity {rule['type']!r}")
+        clauses = []
+        for field, op, threshold in rule['when']:
+            if op not in OPERATORS:
+                raise ValueError(f"Rule {rule['id']!r} uses unknown operator {op!r}")
+            clauses.append((field, OPERATORS[op], float(threshold)))
+        compiled.append((rule, clauses))
+    return compiled
+
+
+COMPILED_RULES = compile_rules(ALERT_RULES)
+RULES_BY_ID = {rule['id']: rule for rule in ALERT_RULES}
+
+
+def rule_masks(weather_df, compiled=COMPILED_RULES):
+    """Boolean (rules, rows) matrix: which rule fires on which row of weather_df.
+
+    A clause on a missing column, or a missing value, never holds.
+    """
+    columns = {}
+
+    def column(field):
+        if field not in columns:
+            columns[field] = (pd.to_numeric(weather_df[field], errors='coerce').to_numpy(dtype=np.float64)
+                              if field in weather_df.columns else np.full(len(weather_df), np.nan))
+        return columns[field]
+
+    masks = np.ones((len(compiled), len(weather_df)), dtype=bool)
+    for r, (_, clauses) in enumerate(compiled):
+        for field, ufunc, threshold in clauses:
+            masks[r] &= ufunc(column(field), threshold)
+    fallback = np.array([bool(rule.get('fallback')) for rule, _ in compiled])
+    if fallback.any():
+        masks[fallback] &= ~masks[~fallback].any(axis=0)
+    return masks
+
+
+def build_alert_table(weather_df, compiled=COMPILED_RULES):
+    """Tidy alerts table: one row per (weather row, fired rule), in row then rule order.
+
+    Columns: ALERT_COLUMNS; day is the row's position within its location.
+    """
+    masks = rule_masks(weather_df, compiled)
+    row, r = np.nonzero(masks.T)
+    if not len(row):
+        return pd.DataFrame(columns=ALERT_COLUMNS)
+
+    day = weather_df.groupby('location', sort=False).cumcount().to_numpy()
+    value = np.full(len(row), np.nan)
+    message = np.empty(len(row), dtype=object)
+    for k, (rule, _) in enumerate(compiled):
+        hit = r == k
+        if not hit.any():
+            continue
+        if rule.get('value'):
+            value[hit] = pd.to_numeric(weather_df[rule['value']], errors='coerce').to_numpy(dtype=np.float64)[row[hit]]
+        message[hit] = [rule['message'].format(value=v) for v in value[hit]]
+
+    fields = {key: np.array([rule[key] for rule, _ in compiled], dtype=object) for key in ('id', 'type', 'icon', 'title')}
+    return pd.DataFrame({
+        'location': weather_df['location'].to_numpy()[row],
+        'date': weather_df['date'].to_numpy()[row],
+        'day': day[row],
+        'rule': fields['id'][r],
+        'type': fields['type'][r],
+        'icon': fields['icon'][r],
+        'title': fields['title'][r],
+        'message': message,
+        'value': value,
+    }, columns=ALERT_COLUMNS)
+
+
+def weather_alert_table(weather_df, compiled=COMPILED_RULES):
+    """Alerts table of a weather dataset, built once per dataset object and rule set."""
+    key = id(weather_df)
+    entry = _table_cache.get(key)
+    if entry is not None and entry[0]() is weather_df and entry[1] is compiled:
+        return entry[2]
+    table = build_alert_table(weather_df, compiled)
+    _table_cache[key] = (weakref.ref(weather_df, lambda _, key=key: _table_cache.pop(key, None)), compiled, table)
+    return table
@@ -0,0 +1,122 @@
+import hashlib
+import json
+import os
+import threading
+from pathlib import Path
+
+import pandas as pd
+from pandas.api.types import is_numeric_dtype
+
+from modules.columnar_cache import CACHE_DIR_NAME
+
+# Column-name resolution for weather files from different vendors.
+#
+# A header is fingerprinted (blake2b of its column names) and resolved to a
+# rename map onto the canonical weather fields once; the map is kept in memory
+# and persisted in data/.columnar/weather_schema.json, so later loads of any
+# file with the same header (every station export of a vendor) skip the
+# variant matching. The file records the rules version (a digest of
+# FIELD_VARIANTS and RESOLVER_VERSION); maps saved under other rules are
+# ignored and resolved again. dtype coercion then happens in a single astype call;
+# only columns that did not arrive numeric go through pd.to_numeric first.
+
+SCHEMA_FILE_NAME = 'weather_schema.json'
+
+# canonical field -> header variants, in matching priority order
+FIELD_VARIANTS = {
+    'max_temp': ['maxtemp_c', 'maxtemp', 'max_temp', 'max temp', 'temp_max', 'temperature_max'],
+    'min_temp': ['mintemp_c', 'mintemp', 'min_temp', 'min temp', 'temp_min', 'temperature_min'],
+    'rainfall': ['precip_mm', 'precipitation', 'rainfall', 'rain_mm', 'rain', 'rainfall_mm'],
+    'humidity': ['humidity', 'hum'],
+    'wind_speed': ['wind_kph', 'wind_km_h', 'wind_speed', 'wind', 'wind_speed_kmh', 'wind_kmh'],
+    'uv_index': ['uv', 'uv_index', 'uvindex'],
+    'pressure': ['pressure', 'press'],
+    'condition': ['weather_condition', 'condition', 'weather'],
+    'location': ['location', 'city', 'place'],
+    'date': ['date', 'datetime', 'day'],
+}
+RESOLVER_VERSION = 1  # bump when resolve_rename_map's matching logic changes
+NUMERIC_FIELDS = ['max_temp', 'min_temp', 'rainfall', 'humidity', 'wind_speed', 'uv_index', 'pressure']
+
+_schema_memo = {}
+_schema_lock = threading.Lock()
+
+
+def rules_version():
+    """Digest of the matching rules; persisted maps are only valid for the same value."""
+    digest = hashlib.blake2b(digest_size=8)
+    digest.update(json.dumps([RESOLVER_VERSION, FIELD_VARIANTS]).encode('utf-8'))
+    return digest.hexdigest()
+
+
+def header_fingerprint(columns):
+    """Stable digest of a header row (column names in order)."""
+    digest = hashlib.blake2b(digest_size=12)
+    digest.update('\x1f'.join(str(c) for c in columns).encode('utf-8'))
+    return digest.hexdigest()
+
+
+def resolve_rename_map(columns):
+    """Match a header against FIELD_VARIANTS: exact (case-insensitive) names first, then substrings."""
+    cols_lower = {str(c).lower(): c for c in columns}
+    rename_map = {}
+    for field, variants in FIELD_VARIANTS.items():
+        match = next((cols_lower[v] for v in variants if v in cols_lower), None)
+        if match is None:
+            match = next((orig for v in variants for low_c, orig in cols_lower.items() if v in low_c), None)
+        if match is not None:
+            rename_map[match] = field
+    return rename_map
+
+
+def schema_path(data_dir):
+    """Location of the persisted fingerprint -> rename map file for a data directory."""
+    return Path(data_dir) / CACHE_DIR_NAME / SCHEMA_FILE_NAME
+
+
+def _read_schemas(path):
+    """Persisted fingerprint -> rename map entries, or {} if missing or saved under other rules."""
+    try:
+        with open(path, encoding='utf-8') as fh:
+            saved = json.load(fh)
+    except (OSError, ValueError):
+        return {}
+    if not isinstance(saved, dict) or saved.get('version') != rules_version():
+        return {}
+    return dict(saved.get('maps', {}))
+
+
+def _write_schemas(path, schemas):
+    """Atomically persist the schema map; a read-only data directory just skips persistence."""
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(path.name + f'.{os.getpid()}.tmp')
+        with open(tmp, 'w', encoding='utf-8') as fh:
+            json.dump({'version': rules_version(), 'maps': schemas}, fh, indent=1, sort_keys=True)
+        os.replace(tmp, path)
+    except OSError:
+        pass
+
+
+def rename_map_for(columns, data_dir):
+    """Rename map for a header, resolved once per distinct header and persisted under data_dir."""
+    path = schema_path(data_dir)
+    fingerprint = header_fingerprint(columns)
+    with _schema_lock:
+        schemas = _schema_memo.get(path)
+        if schemas is None:
+            schemas = _schema_memo[path] = _read_schemas(path)
+        rename_map = schemas.get(fingerprint)
+        if rename_map is None:
+            rename_map = schemas[fingerprint] = resolve_rename_map(columns)
+            _write_schemas(path, schemas)
+    return dict(rename_map)
+
+
+def coerce_weather_dtypes(df):
+    """Cast the numeric weather fields to float64 in one astype pass (unparseable values become NaN)."""
+    plan = {c: 'float64' for c in NUMERIC_FIELDS if c in df.columns}
+    dirty = {c: pd.to_numeric(df[c], errors='coerce') for c in plan if not is_numeric_dtype(df[c])}
+    if dirty:
+        df = df.assign(**dirty)
+    return df.astype(plan) if plan else df
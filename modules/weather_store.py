@@ -0,0 +1,80 @@
+import weakref
+
+import numpy as np
+import pandas as pd
+
+from modules.temporal import date_bounds
+
+# Per-location partitions of weather tables.
+#
+# The loader sorts the weather frame so each location is one contiguous,
+# date-ordered block (locations keep their first-appearance order) and builds
+# a location -> row-range index once. Views of one location are then a dict
+# lookup plus an iloc slice instead of a boolean scan over every station.
+# The index is cached per frame object, so it is rebuilt only when the data
+# registry loads a new version of the file. Any frame can be indexed (the
+# alerts table too); frames whose locations are not contiguous fall back to
+# gathering rows in a stable order.
+
+_index_cache = {}  # id(frame) -> (weakref to frame, index)
+
+
+def sort_by_location(weather_df):
+    """Weather frame as contiguous date-sorted blocks per location, in first-appearance order."""
+    if weather_df.empty or 'location' not in weather_df.columns:
+        return weather_df
+    codes = pd.factorize(weather_df['location'])[0]
+    keys = [codes] if 'date' not in weather_df.columns else [weather_df['date'].to_numpy(), codes]
+    order = np.lexsort(keys)
+    if np.array_equal(order, np.arange(len(order))):
+        return weather_df
+    return weather_df.iloc[order].reset_index(drop=True)
+
+
+def build_location_index(frame):
+    """Map each location to a slice (contiguous blocks) or an array of row positions."""
+    if frame.empty:
+        return {}
+    codes, labels = pd.factorize(frame['location'])
+    order = None
+    if np.any(codes[1:] < codes[:-1]):
+        order = np.argsort(codes, kind='stable')
+        codes = codes[order]
+    bounds = np.flatnonzero(np.diff(codes)) + 1
+    starts = np.r_[0, bounds]
+    stops = np.r_[bounds, len(codes)]
+    index = {}
+    for code, start, stop in zip(codes[starts], starts, stops):
+        index[labels[code]] = slice(int(start), int(stop)) if order is None else order[start:stop]
+    return index
+
+
+def location_index(frame):
+    """Cached location index of a frame, built once per frame object."""
+    key = id(frame)
+    entry = _index_cache.get(key)
+    if entry is not None and entry[0]() is frame:
+        return entry[1]
+    index = build_location_index(frame)
+    _index_cache[key] = (weakref.ref(frame, lambda _, key=key: _index_cache.pop(key, None)), index)
+    return index
+
+
+def location_frame(frame, location, days=None, start=None, end=None):
+    """Rows of one location (its first `days` rows when given); empty if the location is unknown.
+
+    start/end (inclusive) restrict the date-sorted block with a searchsorted.
+    """
+    rows = location_index(frame).get(location)
+    if rows is None:
+        return frame.iloc[:0]
+    part = frame.iloc[rows]
+    if start is not None or end is not None:
+        lo, hi = date_bounds(part['date'].to_numpy(), start, end)
+        part = part.iloc[lo:hi]
+    return part if days is None else part.head(days)
+
+
+def locations(frame):
+    """Locations of a frame in first-appearance order."""
+    return list(location_index(frame))